@@ -0,0 +1,90 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+from src import blueprint_analyser, blueprint, network, generator
+
+# -----------------------------------------------------------
+# Time and memory per entity of the analysis result of large
+# synthetic blueprints, and of its analysed blueprint
+# dictionary, only built when asked
+#
+# Usage:
+#   python -m benchmarks.bench_analysis_result
+#   python -m benchmarks.bench_analysis_result -n 200000
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+shapes = ["cells", "multi-ingredient", "inserter-chain"]
+
+
+def measure(build, nb_entities):
+    start = time.perf_counter()
+    build()
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    value = build()
+    (memory, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+
+    return {"time_per_entity": duration / nb_entities, "memory_per_entity": memory / nb_entities}
+
+
+def measure_shape(shape, nb_entities):
+    bp = blueprint.Blueprint(generator.generate(shape, nb_entities))
+    bp.network = network.create_network(bp)
+    bp.network.calculate_bottleneck()
+
+    nb_entities = len(bp.blueprint["blueprint"]["entities"])
+    result = bp.get_result()
+
+    return {
+        "result": measure(bp.get_result, nb_entities),
+        "dictionary": measure(result.to_dict, nb_entities),
+    }
+
+
+def display_results(results):
+    print(f"{'shape':<20}{'result us':>11}{'result B':>10}{'dict us':>10}{'dict B':>10}")
+
+    for (shape, result) in results.items():
+        print(f"{shape:<20}"
+              f"{result['result']['time_per_entity'] * 1e6:>11.2f}"
+              f"{result['result']['memory_per_entity']:>10.0f}"
+              f"{result['dictionary']['time_per_entity'] * 1e6:>10.2f}"
+              f"{result['dictionary']['memory_per_entity']:>10.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure the analysis result and its dictionary on large blueprints")
+    parser.add_argument("-n", "--nb-entities", type=int, default=50000,
+                        help="Number of entities of the blueprints (default: 50000)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+
+    results = {}
+    for shape in shapes:
+        print(f"  {shape}       ", end="\r", file=sys.stderr)
+        results[shape] = measure_shape(shape, args.nb_entities)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import statistics
+
+from src import blueprint_analyser, blueprint, network
+
+# -----------------------------------------------------------
+# Time each analysis stage of every blueprint of the test
+# corpus over repeated runs, after some warm-up runs
+# The median and the 95th percentile of each stage are saved
+# in a JSON file so that the results of two commits can be
+# compared
+#
+# Usage:
+#   python -m benchmarks.bench_corpus -o before.json
+#   python -m benchmarks.bench_corpus -o after.json -c before.json
+#   python -m benchmarks.bench_corpus -d before.json after.json
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+results_version = 1
+
+stages = ["decode", "blueprint", "network", "bottleneck", "analysis"]
+
+
+def analyse(blueprint_path):
+    # Analyse the blueprint, returns the duration of each stage
+    durations = {}
+
+    start = time.perf_counter()
+    bp_json = blueprint.read_blueprint_file(blueprint_path)
+    durations["decode"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bp = blueprint.Blueprint(bp_json)
+    durations["blueprint"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bp.network = network.create_network(bp)
+    durations["network"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bp.network.calculate_bottleneck()
+    durations["bottleneck"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bp.get_analysis()
+    durations["analysis"] = time.perf_counter() - start
+
+    durations["total"] = sum(durations.values())
+    return durations
+
+
+def percentile(values, percent):
+    # Nearest rank percentile
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+
+def benchmark_blueprint(blueprint_path, runs, warmup):
+    for _ in range(warmup):
+        analyse(blueprint_path)
+
+    runs_durations = [analyse(blueprint_path) for _ in range(runs)]
+
+    result = {}
+    for stage in stages + ["total"]:
+        durations = [run[stage] for run in runs_durations]
+        result[stage] = {
+            "median": statistics.median(durations),
+            "p95": percentile(durations, 95),
+            "min": min(durations),
+        }
+
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(blueprint_files, runs, warmup):
+    results = {
+        "version": results_version,
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "runs": runs,
+        "warmup": warmup,
+        "blueprints": {},
+    }
+
+    for (i, blueprint_file) in enumerate(blueprint_files):
+        print(f"  {i + 1}/{len(blueprint_files)} {blueprint_file}",
+              end="\r", file=sys.stderr)
+
+        blueprint_path = f"{blueprints_path}/{blueprint_file}"
+        results["blueprints"][blueprint_file] = benchmark_blueprint(
+            blueprint_path, runs, warmup)
+
+    print(file=sys.stderr)
+
+    # Sum of the medians of all the blueprints
+    results["total"] = {
+        stage: sum(bp_result[stage]["median"]
+                   for bp_result in results["blueprints"].values())
+        for stage in stages + ["total"]
+    }
+
+    return results
+
+
+def display_results(results):
+    print(f"Commit {results['commit']}, {results['runs']} runs, "
+          f"{results['warmup']} warm-up runs (times in ms)")
+    print(f"{'blueprint':<28}{'median':>10}{'p95':>10}")
+
+    for (blueprint_file, result) in results["blueprints"].items():
+        print(f"{blueprint_file:<28}"
+              f"{result['total']['median'] * 1000:>10.2f}"
+              f"{result['total']['p95'] * 1000:>10.2f}")
+
+    print()
+    print(f"{'stage':<28}{'median sum':>10}")
+    for stage in stages + ["total"]:
+        print(f"{stage:<28}{results['total'][stage] * 1000:>10.2f}")
+
+
+def compare_results(before, after, threshold=5):
+    # Display the median evolution of each blueprint and stage
+    # The changes under the threshold (in percent) are considered as noise
+    def evolution(before_time, after_time):
+        change = (after_time - before_time) / before_time * 100 if before_time else 0
+        mark = ""
+        if change > threshold:
+            mark = " slower"
+        elif change < -threshold:
+            mark = " faster"
+        return f"{before_time * 1000:>10.2f}{after_time * 1000:>10.2f}{change:>+9.1f}%{mark}"
+
+    print(f"Commit {before['commit']} -> {after['commit']} (median times in ms)")
+    print(f"{'blueprint':<28}{'before':>10}{'after':>10}{'change':>10}")
+
+    for (blueprint_file, result) in after["blueprints"].items():
+        if blueprint_file not in before["blueprints"]:
+            continue
+
+        print(f"{blueprint_file:<28}" + evolution(
+            before["blueprints"][blueprint_file]["total"]["median"],
+            result["total"]["median"]))
+
+    print()
+    print(f"{'stage':<28}{'before':>10}{'after':>10}{'change':>10}")
+
+    # Only the blueprints of both results are compared
+    common_blueprints = [bp for bp in after["blueprints"] if bp in before["blueprints"]]
+    for stage in stages + ["total"]:
+        print(f"{stage:<28}" + evolution(
+            sum(before["blueprints"][bp][stage]["median"] for bp in common_blueprints),
+            sum(after["blueprints"][bp][stage]["median"] for bp in common_blueprints)))
+
+
+def read_results(results_path):
+    with open(results_path, "r") as f:
+        results = json.load(f)
+
+    if results.get("version") != results_version:
+        raise Exception(f"Unsupported benchmark results version in {results_path}")
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analysis of the test blueprints")
+    parser.add_argument("-r", "--runs", type=int, default=10,
+                        help="Number of timed runs per blueprint (default: 10)")
+    parser.add_argument("-w", "--warmup", type=int, default=2,
+                        help="Number of warm-up runs per blueprint (default: 2)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+    parser.add_argument("-c", "--compare", metavar="RESULTS",
+                        help="Compare with a previous results file")
+    parser.add_argument("-d", "--diff", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="Compare two results files without running the benchmark")
+    parser.add_argument("blueprints", nargs="*",
+                        help="Blueprints of the corpus to benchmark (default: all)")
+
+    args = parser.parse_args()
+
+    if args.runs < 1:
+        parser.error("The number of runs must be at least 1")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.diff is not None:
+        compare_results(read_results(args.diff[0]), read_results(args.diff[1]))
+        sys.exit(0)
+
+    blueprint_analyser.init(config_file_path)
+
+    blueprint_files = args.blueprints or sorted(os.listdir(blueprints_path))
+    results = run_benchmark(blueprint_files, args.runs, args.warmup)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.compare is not None:
+        compare_results(read_results(args.compare), results)
+    else:
+        display_results(results)
@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import base64
+import tempfile
+import tracemalloc
+
+from src import blueprint_analyser, utils
+
+# -----------------------------------------------------------
+# Peak memory and time to decode a large exported blueprint
+# string, with the whole string decoding used before and with
+# the chunked decoding of the strings and of the files
+# The peak memory is compared to the memory of the decoded
+# blueprint dictionary
+#
+# Usage: python -m benchmarks.bench_decode [nb entities]
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+default_nb_entities = 300000
+
+
+def create_blueprint_string(nb_entities):
+    # Random positions so that the string does not compress too much
+    entities = []
+    for i in range(nb_entities):
+        entities.append({
+            "entity_number": i + 1,
+            "name": random.choice(["transport-belt", "fast-transport-belt", "inserter"]),
+            "position": {"x": random.randint(-10000, 10000) + 0.5,
+                         "y": random.randint(-10000, 10000) + 0.5},
+            "direction": random.choice([2, 4, 6])
+        })
+
+    return utils.encode({"blueprint": {"entities": entities}})
+
+
+def whole_string_decode(string):
+    # Decoding used before the chunked decoding
+    return json.loads(zlib.decompress(base64.b64decode(string[1:])).decode('utf8'))
+
+
+def decode_file(path):
+    with open(path, "r") as f:
+        return utils.decode_file(f)
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = function(*args)
+    (size, peak_memory) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (result, duration, peak_memory, size)
+
+
+if __name__ == "__main__":
+    blueprint_analyser.init(config_file_path)
+    random.seed(0)
+
+    nb_entities = int(sys.argv[1]) if len(sys.argv) > 1 else default_nb_entities
+    bp_string = create_blueprint_string(nb_entities)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(bp_string)
+        bp_path = f.name
+
+    backend = "orjson" if utils.orjson else "ijson" if utils.ijson else "json"
+    print(f"{nb_entities} entities, string of {len(bp_string) / 1e6:.1f} MB, "
+          f"JSON backend: {backend}")
+    print(f"{'decoding':<16}{'time (s)':>10}{'peak memory (MB)':>20}{'peak / result':>16}")
+
+    try:
+        for (name, function, arg) in [("whole string", whole_string_decode, bp_string),
+                                      ("chunked string", utils.decode, bp_string),
+                                      ("chunked file", decode_file, bp_path)]:
+            (_, duration, peak_memory, size) = measure(function, arg)
+            print(f"{name:<16}{duration:>10.3f}{peak_memory / 1e6:>20.1f}{peak_memory / size:>16.2f}")
+    finally:
+        os.remove(bp_path)
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from src import blueprint_analyser, generator, result_export
+
+# -----------------------------------------------------------
+# Time, peak memory and file size of the export of the
+# analysis of a large synthetic blueprint in each format, and
+# with only the items_output and entities_bottleneck fields
+#
+# Usage:
+#   python -m benchmarks.bench_export
+#   python -m benchmarks.bench_export -n 200000
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+selected_fields = ["items_output", "entities_bottleneck"]
+
+
+def measure(analysis, path, export_format, fields):
+    start = time.perf_counter()
+    result_export.write_analysis(analysis, path, export_format, fields)
+    duration = time.perf_counter() - start
+
+    tracemalloc.start()
+    result_export.write_analysis(analysis, path, export_format, fields)
+    (_, peak_memory) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"duration": duration, "peak_memory": peak_memory, "size": os.path.getsize(path)}
+
+
+def display_results(results):
+    print(f"{'export':<24}{'time ms':>10}{'peak MB':>10}{'file MB':>10}")
+
+    for (name, result) in results.items():
+        print(f"{name:<24}{result['duration'] * 1000:>10.1f}"
+              f"{result['peak_memory'] / 1e6:>10.1f}{result['size'] / 1e6:>10.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the export formats of the analysis of a large blueprint")
+    parser.add_argument("-n", "--nb-entities", type=int, default=50000,
+                        help="Number of entities of the blueprint (default: 50000)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+
+    print("  analysis", end="\r", file=sys.stderr)
+    analysis = blueprint_analyser.analyse_blueprint(generator.generate("cells", args.nb_entities))
+
+    export_formats = [export_format for export_format in result_export.formats
+                      if export_format != "binary" or result_export.msgpack is not None]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for export_format in export_formats:
+            print(f"  {export_format}       ", end="\r", file=sys.stderr)
+            path = os.path.join(directory, "analysis" + result_export.formats[export_format])
+            results[export_format] = measure(analysis, path, export_format, None)
+
+        for export_format in ["json", "compact"]:
+            path = os.path.join(directory, "analysis" + result_export.formats[export_format])
+            results[f"{export_format} 2 fields"] = measure(analysis, path, export_format, selected_fields)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
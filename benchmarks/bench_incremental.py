@@ -0,0 +1,139 @@
+import gc
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import statistics
+
+from src import blueprint_analyser, blueprint, network, generator, incremental
+
+# -----------------------------------------------------------
+# Compare the analysis of an edited blueprint from the start
+# with the analysis of the edited region by a NetworkEditor,
+# on synthetic blueprints of growing sizes
+# Each edit rotates a random entity, then rotates it back, so
+# the blueprint does not drift from its shape during the runs
+# For each blueprint, the median time of an edit and of the full
+# analysis of the same edited blueprint are displayed, with the
+# median part of the nodes created again and the number of edits
+# analysed from the start by the editor
+#
+# Usage:
+#   python -m benchmarks.bench_incremental
+#   python -m benchmarks.bench_incremental -s cells snake -n 1000 10000 -e 200
+#
+# The region of an edit is its connected part of the network:
+# on the snake shape, a single belt, each edit analyses it all
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+default_shapes = ["cells", "multi-ingredient", "inserter-chain", "snake"]
+default_sizes = [1000, 5000]
+
+
+def analyse(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    nw = network.create_network(bp)
+    nw.calculate_bottleneck()
+    return nw
+
+
+def measure(bp_json, nb_edits, seed):
+    rand = random.Random(seed)
+    editor = incremental.NetworkEditor(analyse(bp_json))
+
+    edit_durations = []
+    full_durations = []
+    rebuilt_ratios = []
+    nb_full = 0
+
+    for _ in range(nb_edits):
+        entity_dic = rand.choice(bp_json["blueprint"]["entities"])
+        direction = entity_dic.get("direction", 0)
+
+        for new_direction in [rand.choice([d for d in [0, 2, 4, 6] if d != direction]), direction]:
+            edit = incremental.rotate_entity(entity_dic["entity_number"], new_direction)
+
+            # The replaced nodes are collected out of the timings
+            gc.collect()
+            start = time.perf_counter()
+            nw = editor.apply(edit)
+            edit_durations.append(time.perf_counter() - start)
+
+            if editor.rebuilt_nodes is None:
+                nb_full += 1
+            else:
+                rebuilt_ratios.append(len(editor.rebuilt_nodes) / max(1, len(nw.nodes)))
+
+            edited_json = copy.deepcopy(bp_json)
+            gc.collect()
+            start = time.perf_counter()
+            analyse(edited_json)
+            full_durations.append(time.perf_counter() - start)
+
+    return {
+        "full": statistics.median(full_durations),
+        "edit": statistics.median(edit_durations),
+        "rebuilt": statistics.median(rebuilt_ratios) if len(rebuilt_ratios) > 0 else 1,
+        "full_analyses": nb_full,
+        "edits": len(edit_durations),
+    }
+
+
+def display_results(results):
+    print(f"{'blueprint':<28}{'full ms':>10}{'edit ms':>10}{'speedup':>10}"
+          f"{'rebuilt':>10}{'full analyses':>15}")
+
+    for (name, result) in results.items():
+        print(f"{name:<28}{result['full'] * 1000:>10.1f}{result['edit'] * 1000:>10.1f}"
+              f"{result['full'] / result['edit']:>9.1f}x{result['rebuilt']:>10.1%}"
+              f"{result['full_analyses']:>8}/{result['edits']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the analysis of the edited region with a full analysis")
+    parser.add_argument("-s", "--shapes", nargs="+", default=default_shapes,
+                        choices=sorted(generator.shapes),
+                        help=f"Blueprint shapes (default: {' '.join(default_shapes)})")
+    parser.add_argument("-n", "--nb-entities", nargs="+", type=int, default=default_sizes,
+                        help=f"Blueprint sizes (default: {' '.join(map(str, default_sizes))})")
+    parser.add_argument("-e", "--edits", type=int, default=50,
+                        help="Number of edits per blueprint, each one rotated back (default: 50)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the edited entities (default: 0)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    args = parser.parse_args()
+
+    if args.edits < 1:
+        parser.error("The number of edits must be at least 1")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+
+    results = {}
+    for shape in args.shapes:
+        for nb_entities in args.nb_entities:
+            name = f"{shape} {nb_entities}"
+            print(f"  {name}", end="\r", file=sys.stderr)
+
+            bp_json = generator.generate(shape, nb_entities)
+            results[name] = measure(bp_json, args.edits, args.seed)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+import argparse
+
+from src import blueprint_analyser, blueprint, network, generator
+
+# -----------------------------------------------------------
+# Time per entity of the network creation, the flow calculation
+# and the analysis export of blueprints of growing sizes: half
+# of the entities in a single belt line (one node with many
+# compacted nodes), the other half in separated chests (many
+# nodes). The time per entity must stay about the same
+#
+# Usage:
+#   python -m benchmarks.bench_network_scaling
+#   python -m benchmarks.bench_network_scaling -n 10000 100000 1000000
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+
+def create_blueprint(nb_entities):
+    builder = generator.BlueprintBuilder("Scaling")
+    length = nb_entities // 2
+    builder.add_belt_line("transport-belt", 0, 0, length)
+
+    for i in range(nb_entities - length):
+        builder.add("wooden-chest", 2 * (i % length), 2 * (i // length) + 2)
+
+    return builder.get_blueprint()
+
+
+def measure(nb_entities):
+    bp = blueprint.Blueprint(create_blueprint(nb_entities))
+
+    start = time.perf_counter()
+    bp.network = network.create_network(bp)
+    bp.network.calculate_bottleneck()
+    bp.get_analysis()
+    duration = time.perf_counter() - start
+
+    return {"duration": duration, "time_per_entity": duration / nb_entities}
+
+
+def display_results(results):
+    print(f"{'entities':>10}{'time s':>10}{'us/entity':>12}{'ratio':>8}")
+
+    first = next(iter(results.values()))
+    for (nb_entities, result) in results.items():
+        print(f"{nb_entities:>10}{result['duration']:>10.2f}"
+              f"{result['time_per_entity'] * 1e6:>12.2f}"
+              f"{result['time_per_entity'] / first['time_per_entity']:>8.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure the analysis time per entity of growing blueprints")
+    parser.add_argument("-n", "--nb-entities", type=int, nargs="+", default=[10000, 50000, 100000],
+                        help="Numbers of entities of the blueprints (default: 10000 50000 100000)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+
+    results = {}
+    for nb_entities in args.nb_entities:
+        print(f"  {nb_entities} entities", end="\r", file=sys.stderr)
+        results[nb_entities] = measure(nb_entities)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
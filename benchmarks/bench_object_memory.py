@@ -0,0 +1,62 @@
+import tracemalloc
+
+from src import blueprint_analyser, entity, node
+
+# -----------------------------------------------------------
+# Memory used by each entity and node object, measured on
+# a large number of instances of the most common entities
+#
+# Usage: python -m benchmarks.bench_object_memory
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+nb_objects = 10000
+
+entities_to_measure = [
+    {"name": "transport-belt", "direction": 2},
+    {"name": "inserter", "direction": 2},
+    {"name": "underground-belt", "direction": 2, "type": "input"},
+    {"name": "splitter", "direction": 2},
+    {"name": "wooden-chest"},
+    {"name": "assembling-machine-1", "recipe": "iron-gear-wheel"},
+]
+
+
+def create_entities(entity_dict):
+    # The blueprint dictionaries are created before the measure
+    entity_dicts = [{**entity_dict,
+                     "entity_number": i,
+                     "position": {"x": i, "y": 0}} for i in range(nb_objects)]
+
+    tracemalloc.start()
+    entities = [entity.create_entity(d) for d in entity_dicts]
+    (entities_memory, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (entities, entities_memory)
+
+
+def create_nodes(entities):
+    tracemalloc.start()
+    nodes = [node.create_node(e) for e in entities]
+    (nodes_memory, _) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (nodes, nodes_memory)
+
+
+if __name__ == "__main__":
+    blueprint_analyser.init(config_file_path)
+
+    print(f"{'entity':<24}{'entity (B)':>12}{'node (B)':>12}")
+
+    for entity_dict in entities_to_measure:
+        # The prototypes are created before the measure
+        create_entities(entity_dict)
+
+        (entities, entities_memory) = create_entities(entity_dict)
+        (_, nodes_memory) = create_nodes(entities)
+
+        print(f"{entity_dict['name']:<24}"
+              f"{entities_memory / nb_objects:>12.0f}"
+              f"{nodes_memory / nb_objects:>12.0f}")
@@ -0,0 +1,114 @@
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import statistics
+
+from src import blueprint_analyser, generator, population, config
+
+# -----------------------------------------------------------
+# Compare the evaluation of a population of small synthetic
+# blueprints, as an optimisation loop does, with the analysis
+# of each blueprint: in this process, and with a pool of worker
+# processes kept between the generations
+# The median time of a generation and the number of blueprints
+# evaluated per second are displayed
+#
+# Usage:
+#   python -m benchmarks.bench_population
+#   python -m benchmarks.bench_population -n 2000 -g 10 -j 1 4 8
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+shapes = ["cells", "multi-ingredient", "splitter-tree", "inserter-chain"]
+
+
+def get_population(nb_blueprints, sizes, seed):
+    rand = random.Random(seed)
+    return [generator.generate(rand.choice(shapes), rand.randint(*sizes))
+            for _ in range(nb_blueprints)]
+
+
+def measure(evaluate, bp_jsons, nb_generations):
+    # Median time of a generation, each generation gets a
+    # new copy of the population, as an optimiser creates one
+    durations = []
+    for _ in range(nb_generations):
+        generation = copy.deepcopy(bp_jsons)
+        start = time.perf_counter()
+        evaluate(generation)
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def analyse_population(bp_jsons):
+    return [blueprint_analyser.analyse_blueprint(bp_json) for bp_json in bp_jsons]
+
+
+def display_results(results, nb_blueprints):
+    print(f"{'evaluation':<28}{'generation ms':>16}{'blueprints/s':>14}")
+
+    for (name, duration) in results.items():
+        print(f"{name:<28}{duration * 1000:>16.1f}{nb_blueprints / duration:>14.0f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the evaluation of a population with the analysis of its blueprints")
+    parser.add_argument("-n", "--nb-blueprints", type=int, default=500,
+                        help="Number of blueprints of the population (default: 500)")
+    parser.add_argument("-g", "--generations", type=int, default=5,
+                        help="Number of timed generations (default: 5)")
+    parser.add_argument("-j", "--jobs", nargs="+", type=int, default=[2, 4],
+                        help="Numbers of worker processes of the pools (default: 2 4)")
+    parser.add_argument("--sizes", nargs=2, type=int, default=[15, 60],
+                        metavar=("MIN", "MAX"),
+                        help="Number of entities of the blueprints (default: 15 60)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the blueprints shapes and sizes (default: 0)")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    args = parser.parse_args()
+
+    if args.generations < 1:
+        parser.error("The number of generations must be at least 1")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+    config.config.set_config_value(False, "network", "display")
+
+    bp_jsons = get_population(args.nb_blueprints, args.sizes, args.seed)
+
+    results = {}
+    print("  analyse_blueprint", end="\r", file=sys.stderr)
+    results["analyse_blueprint"] = measure(analyse_population, bp_jsons, args.generations)
+
+    print("  evaluate_population", end="\r", file=sys.stderr)
+    results["evaluate_population"] = measure(
+        population.evaluate_population, bp_jsons, args.generations)
+
+    for jobs in args.jobs:
+        print(f"  {jobs} processes", end="\r", file=sys.stderr)
+        with population.PopulationEvaluator(jobs) as evaluator:
+            # The pool is started before the first generation
+            evaluator.evaluate(bp_jsons[:jobs])
+            results[f"evaluator {jobs} processes"] = measure(
+                evaluator.evaluate, bp_jsons, args.generations)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results, args.nb_blueprints)
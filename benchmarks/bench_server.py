@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+import http.client
+
+from src import blueprint_analyser, generator, server, utils
+
+# -----------------------------------------------------------
+# Compare the latency of the analysis of small blueprints in a
+# new interpreter, as the command line does, which loads the
+# config and the Factorio data each time, with the latency of
+# the analysis server, over TCP and over a Unix socket
+# The percentiles of the latencies are displayed
+#
+# Usage:
+#   python -m benchmarks.bench_server
+#   python -m benchmarks.bench_server -n 500 -j 2 --cli-runs 10
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+
+shapes = ["cells", "multi-ingredient", "splitter-tree", "inserter-chain"]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def get_bodies(nb_blueprints, sizes, seed):
+    # Exported blueprint strings, as uploaded by the users
+    rand = random.Random(seed)
+    return [utils.encode(generator.generate(rand.choice(shapes), rand.randint(*sizes))).encode("ascii")
+            for _ in range(nb_blueprints)]
+
+
+def measure_cli(bodies, directory):
+    # The command line with the benchmark config, which doesn't
+    # display the network
+    script = ("import sys, json\n"
+              "from src import blueprint_analyser, utils\n"
+              f"blueprint_analyser.init({config_file_path!r})\n"
+              "analysis = blueprint_analyser.calculate_blueprint_bottleneck(sys.argv[1])\n"
+              "open(sys.argv[2], 'w').write(json.dumps(analysis, indent=4, default=utils.json_default))\n")
+
+    latencies = []
+    for (i, body) in enumerate(bodies):
+        input_path = os.path.join(directory, f"{i}.txt")
+        with open(input_path, "wb") as f:
+            f.write(body)
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script, input_path, os.path.join(directory, f"{i}.json")],
+                       check=True)
+        latencies.append(time.perf_counter() - start)
+
+    return latencies
+
+
+def measure_server(bodies, connection):
+    latencies = []
+    for body in bodies:
+        start = time.perf_counter()
+        connection.request("POST", "/analyse", body)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+
+        if response.status != 200:
+            raise Exception(f"Analysis failed with the status {response.status}")
+
+    return latencies
+
+
+def run_server(address, jobs, bodies, get_connection):
+    with server.AnalysisServer(address, jobs) as analysis_server:
+        thread = threading.Thread(target=analysis_server.serve_forever)
+        thread.start()
+
+        connection = get_connection(analysis_server.address)
+        try:
+            # The workers import the modules at their first analysis
+            measure_server(bodies[:jobs], connection)
+            return measure_server(bodies, connection)
+        finally:
+            connection.close()
+            analysis_server.shutdown()
+            thread.join()
+
+
+def display_results(results):
+    print(f"{'client':<24}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+
+    for (name, latencies) in results.items():
+        latencies = sorted(latencies)
+        p50 = statistics.median(latencies)
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"{name:<24}{len(latencies):>10}{p50 * 1000:>10.1f}{p95 * 1000:>10.1f}{latencies[-1] * 1000:>10.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the latency of the command line and of the analysis server")
+    parser.add_argument("-n", "--nb-blueprints", type=int, default=200,
+                        help="Number of blueprints sent to the server (default: 200)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes of the server (default: 1)")
+    parser.add_argument("--cli-runs", type=int, default=5,
+                        help="Number of blueprints analysed by the command line (default: 5)")
+    parser.add_argument("--sizes", nargs=2, type=int, default=[15, 60],
+                        metavar=("MIN", "MAX"),
+                        help="Number of entities of the blueprints (default: 15 60)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the blueprints shapes and sizes (default: 0)")
+    parser.add_argument("-o", "--output",
+                        help="Save the latencies in this JSON file")
+
+    args = parser.parse_args()
+
+    if args.nb_blueprints < 1 or args.cli_runs < 0:
+        parser.error("At least one blueprint must be sent to the server")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+    bodies = get_bodies(args.nb_blueprints, args.sizes, args.seed)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.cli_runs > 0:
+            print("  command line", end="\r", file=sys.stderr)
+            results["command line"] = measure_cli(bodies[:args.cli_runs], directory)
+
+        print("  server over TCP", end="\r", file=sys.stderr)
+        results["server over TCP"] = run_server(
+            ("127.0.0.1", 0), args.jobs, bodies,
+            lambda address: http.client.HTTPConnection(*address))
+
+        print("  server over Unix socket", end="\r", file=sys.stderr)
+        results["server over Unix socket"] = run_server(
+            os.path.join(directory, "analyser.sock"), args.jobs, bodies, UnixHTTPConnection)
+
+    print(file=sys.stderr)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
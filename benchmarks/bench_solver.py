@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from src import blueprint_analyser, blueprint, network, generator, config
+
+# -----------------------------------------------------------
+# Compare the flow solvers, the negotiation of the nodes and
+# the max flow solver, on the test corpus and on synthetic
+# blueprints of growing sizes
+# For each blueprint and solver, the median time of the flow
+# calculation, the items per second leaving the network and the
+# number of bottleneck entities are displayed
+#
+# Usage:
+#   python -m benchmarks.bench_solver
+#   python -m benchmarks.bench_solver -s cells splitter-tree -n 1000 10000
+#
+# The negotiation explores every path between the entities, its
+# time doubles with each splitter of the splitter-chain shape
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+solvers = ["negotiation", "maxflow"]
+
+default_sizes = [100, 1000, 5000]
+
+# The negotiation is exponential on these shapes, they get smaller sizes
+# Format: {shape: [nb_entities]}
+default_shape_sizes = {
+    "splitter-chain": [20, 26, 32],
+}
+
+
+def create_network(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    bp.network = network.create_network(bp)
+    bp.network.estimate_purpose()
+    return bp
+
+
+def measure(bp_json, solver, runs):
+    # Returns the median flow calculation time and the analysis
+    # of the last run
+    config.config.set_config_value(solver, "bottleneck", "solver")
+
+    durations = []
+    for _ in range(runs):
+        # The flow calculation changes the nodes, each run
+        # needs a new network
+        bp = create_network(bp_json)
+
+        start = time.perf_counter()
+        bp.network.calculate_flow()
+        durations.append(time.perf_counter() - start)
+
+    analysis = bp.get_analysis()
+    total_output = sum(sum(items.values()) for items in analysis["items_output"])
+
+    return {
+        "median": statistics.median(durations),
+        "output": total_output,
+        "bottlenecks": len(analysis["entities_bottleneck"]),
+    }
+
+
+def benchmark(blueprints, runs):
+    results = {}
+
+    for (name, bp_json) in blueprints:
+        print(f"  {name}", end="\r", file=sys.stderr)
+        results[name] = {solver: measure(bp_json, solver, runs) for solver in solvers}
+
+    print(file=sys.stderr)
+    return results
+
+
+def get_corpus_blueprints(blueprint_files):
+    for blueprint_file in blueprint_files:
+        yield (blueprint_file,
+               blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+
+
+def get_generated_blueprints(shapes, sizes):
+    for shape in shapes:
+        shape_sizes = sizes
+        if shape_sizes is None:
+            shape_sizes = default_shape_sizes.get(shape, default_sizes)
+
+        for size in shape_sizes:
+            yield (f"{shape} {size}", generator.generate(shape, size))
+
+
+def display_results(results):
+    print(f"{'blueprint':<28}" + "".join(
+        f"{solver + ' ms':>16}{'output':>10}{'bottlenecks':>12}" for solver in solvers))
+
+    for (name, result) in results.items():
+        print(f"{name:<28}" + "".join(
+            f"{result[solver]['median'] * 1000:>16.2f}"
+            f"{result[solver]['output']:>10.2f}"
+            f"{result[solver]['bottlenecks']:>12}" for solver in solvers))
+
+    print()
+    for solver in solvers:
+        total = sum(result[solver]["median"] for result in results.values())
+        print(f"{solver:<28}{total * 1000:>16.2f} ms")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compare the flow solvers")
+    parser.add_argument("-r", "--runs", type=int, default=5,
+                        help="Number of timed runs per blueprint and solver (default: 5)")
+    parser.add_argument("-s", "--shapes", nargs="*", default=["cells", "splitter-tree", "splitter-chain"],
+                        help="Synthetic blueprints shapes "
+                             "(default: cells splitter-tree splitter-chain)")
+    parser.add_argument("-n", "--sizes", nargs="*", type=int,
+                        help="Synthetic blueprints number of entities "
+                             "(default: 100 1000 5000, 20 26 32 for splitter-chain)")
+    parser.add_argument("--no-corpus", action="store_true",
+                        help="Only benchmark the synthetic blueprints")
+    parser.add_argument("-o", "--output",
+                        help="Save the results in this JSON file")
+
+    args = parser.parse_args()
+
+    if args.runs < 1:
+        parser.error("The number of runs must be at least 1")
+
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    blueprint_analyser.init(config_file_path)
+
+    blueprints = []
+    if not args.no_corpus:
+        blueprints += get_corpus_blueprints(sorted(os.listdir(blueprints_path)))
+    blueprints += get_generated_blueprints(args.shapes, args.sizes)
+
+    results = benchmark(blueprints, args.runs)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    display_results(results)
@@ -0,0 +1,95 @@
+import copy
+import time
+import tracemalloc
+
+from src import blueprint_analyser, blueprint, network, spatial
+
+# -----------------------------------------------------------
+# Memory and time used to place the entities and the nodes
+# of a sparse blueprint in the sparse chunked grid, compared
+# to the dense grid of the whole blueprint area
+# The sparse blueprint is made of two copies of the same
+# factory placed far apart
+#
+# Usage: python -m benchmarks.bench_sparse_grid
+# -----------------------------------------------------------
+
+config_file_path = "config/config_tests.yaml"
+outpost_path = "tests/blueprints/beltFac1.json"
+outposts_distance = 2000
+
+
+class DenseGrid:
+    # Reference implementation: one cell per tile of the blueprint area
+    def __init__(self, width, heigth):
+        self.width = width
+        self.heigth = heigth
+        self.rows = [[None] * width for _ in range(heigth)]
+
+    def get(self, x, y):
+        if x < 0 or x >= self.width or y < 0 or y >= self.heigth:
+            return None
+        return self.rows[y][x]
+
+    def set(self, x, y, value):
+        self.rows[y][x] = value
+
+    def cells(self):
+        for (y, row) in enumerate(self.rows):
+            for (x, cell) in enumerate(row):
+                if cell is not None:
+                    yield (x, y, cell)
+
+
+def create_sparse_blueprint():
+    outpost = blueprint.read_blueprint_file(outpost_path)
+    entities = outpost["blueprint"]["entities"]
+
+    far_entities = copy.deepcopy(entities)
+    for (i, entity) in enumerate(far_entities):
+        entity["entity_number"] = len(entities) + i + 1
+        entity["position"]["x"] += outposts_distance
+        entity["position"]["y"] += outposts_distance
+
+    outpost["blueprint"]["entities"] = entities + far_entities
+    return outpost
+
+
+def build_network(bp_json):
+    bp = blueprint.Blueprint(copy.deepcopy(bp_json))
+    network.create_network(bp)
+    return bp
+
+
+def measure(grid_class, bp_json):
+    spatial_grid_class = spatial.ChunkedGrid
+    spatial.ChunkedGrid = grid_class
+
+    try:
+        start = time.perf_counter()
+        bp = build_network(bp_json)
+        duration = time.perf_counter() - start
+
+        tracemalloc.start()
+        build_network(bp_json)
+        (_, peak_memory) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        spatial.ChunkedGrid = spatial_grid_class
+
+    return (bp, duration, peak_memory)
+
+
+if __name__ == "__main__":
+    blueprint_analyser.init(config_file_path)
+
+    bp_json = create_sparse_blueprint()
+
+    (bp, dense_duration, dense_memory) = measure(DenseGrid, bp_json)
+    (_, sparse_duration, sparse_memory) = measure(spatial.ChunkedGrid, bp_json)
+
+    print(
+        f"Sparse blueprint: {len(bp.entities)} entities, {bp.width}x{bp.heigth} tiles")
+    print(f"{'grid':<10}{'time (s)':>12}{'peak memory (MB)':>20}")
+    print(f"{'dense':<10}{dense_duration:>12.3f}{dense_memory / 1e6:>20.2f}")
+    print(f"{'chunked':<10}{sparse_duration:>12.3f}{sparse_memory / 1e6:>20.2f}")
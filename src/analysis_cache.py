@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+
+from src import config, factorio, utils
+
+# -----------------------------------------------------------
+# Persistent cache of the blueprint analyses
+# The analyses are stored in a SQLite file, compressed, under
+# a key hashing the decoded blueprint, the config values the
+# analysis depends on and the Factorio data. When the cache is
+# bigger than its maximum size, the least recently used
+# analyses are removed. The database can be shared by several
+# processes, like the batch workers, and each thread has its own
+# connection, like the threads of the async analyser
+#
+# Usage:
+#   analysis_cache = AnalysisCache("analyses.sqlite")
+#   key = get_key(bp_json)
+#   analysis = analysis_cache.get(key)
+#   if analysis is None:
+#       analysis = ...
+#       analysis_cache.put(key, analysis)
+# -----------------------------------------------------------
+
+# Changed when the analysis format changes, the older analyses
+# are not used anymore
+cache_version = 1
+
+default_max_size = 256 * 1024 * 1024
+
+# Opened cache of the config, see get_cache
+# Format: (path, max_size, AnalysisCache)
+opened_cache = None
+opened_cache_lock = threading.Lock()
+
+
+def get_key(bp_json):
+    # Hash of the decoded blueprint and of the analysis settings
+    # The settings are read from the current context and data
+    settings = config.get_settings()
+    key_settings = {
+        "version": cache_version,
+        "data": factorio.data_hash,
+        "inserter_capacity_bonus": settings.inserter_capacity_bonus,
+        "difficulty": settings.difficulty,
+        "solver": settings.flow_solver,
+    }
+
+    key = hashlib.sha256()
+    key.update(json.dumps(key_settings, sort_keys=True).encode("utf8"))
+    key.update(json.dumps(bp_json, sort_keys=True, separators=(",", ":")).encode("utf8"))
+    return key.hexdigest()
+
+
+def get_cache():
+    # AnalysisCache of the config, None if the cache is disabled
+    # The cache is opened once per process
+    global opened_cache
+
+    settings = config.get_settings()
+    path = settings.cache_path
+    if path is None:
+        return None
+
+    path = os.path.expanduser(path)
+    max_size = settings.cache_max_size
+
+    with opened_cache_lock:
+        if opened_cache is None or opened_cache[:2] != (path, max_size):
+            if opened_cache is not None:
+                opened_cache[2].close()
+            opened_cache = (path, max_size, AnalysisCache(path, max_size))
+
+        return opened_cache[2]
+
+
+class AnalysisCache:
+    # path: SQLite database file, created if needed
+    # max_size: maximum size of the compressed analyses, in bytes
+
+    def __init__(self, path, max_size=default_max_size):
+        self.path = path
+        self.max_size = max_size
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # A SQLite connection can't be used by several threads at
+        # once, each thread opens its own on its first use
+        self.local = threading.local()
+        self.connections = []
+        self.connections_lock = threading.Lock()
+
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            "key TEXT PRIMARY KEY, analysis BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS analyses_last_used ON analyses (last_used)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS statistics (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @property
+    def connection(self):
+        # Connection of the current thread
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+
+        return connection
+
+    def _connect(self):
+        # The processes and threads wait for each other writes
+        # The connection is only used by its thread, but it can be
+        # closed by another one, see close
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        self.local.connection = connection
+        with self.connections_lock:
+            self.connections.append(connection)
+
+        return connection
+
+    def get(self, key):
+        # Returns the analysis of the key, None if it is not in the cache
+        row = self.connection.execute(
+            "SELECT analysis FROM analyses WHERE key = ?", (key,)).fetchone()
+
+        if row is None:
+            self._count("misses")
+            return None
+
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(
+                "UPDATE analyses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._count("hits")
+
+        return utils.loads_json(zlib.decompress(row[0]))
+
+    def put(self, key, analysis):
+        # Store the analysis, the least recently used analyses are
+        # removed to keep the cache under its maximum size
+        data = zlib.compress(json.dumps(analysis, separators=(",", ":"), default=utils.json_default).encode("utf8"), 1)
+        if len(data) > self.max_size:
+            return
+
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO analyses (key, analysis, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()))
+            self._evict()
+
+    def _evict(self):
+        (size,) = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()
+        if size <= self.max_size:
+            return
+
+        evicted_keys = []
+        for (key, entry_size) in self.connection.execute(
+                "SELECT key, size FROM analyses ORDER BY last_used"):
+            if size <= self.max_size:
+                break
+            evicted_keys.append((key,))
+            size -= entry_size
+
+        self.connection.executemany("DELETE FROM analyses WHERE key = ?", evicted_keys)
+        self._count("evictions", len(evicted_keys))
+
+    def _count(self, name, value=1):
+        self.connection.execute(
+            "INSERT INTO statistics (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value", (name, value))
+
+    def statistics(self):
+        # Format: {
+        #     "entries": 12,
+        #     "size": 48211,        compressed analyses, in bytes
+        #     "max_size": 268435456,
+        #     "hits": 30,
+        #     "misses": 12,
+        #     "evictions": 0,
+        #     "hit_rate": 0.71,
+        # }
+        (entries, size) = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses").fetchone()
+        counts = dict(self.connection.execute("SELECT name, value FROM statistics"))
+
+        hits = counts.get("hits", 0)
+        misses = counts.get("misses", 0)
+
+        return {
+            "entries": entries,
+            "size": size,
+            "max_size": self.max_size,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counts.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0,
+        }
+
+    def clear(self):
+        # Remove the analyses and reset the statistics
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute("DELETE FROM analyses")
+            self.connection.execute("DELETE FROM statistics")
+
+    def close(self):
+        # Close the connections of all the threads
+        with self.connections_lock:
+            for connection in self.connections:
+                connection.close()
+
+            self.connections = []
+            self.local = threading.local()
@@ -0,0 +1,363 @@
+from array import array
+from collections.abc import MutableMapping
+
+from src import utils
+
+# -----------------------------------------------------------
+# Result of the analysis of a blueprint
+# The values of the blueprint entities are stored in parallel
+# arrays, in the order of the blueprint entities: flags, usage
+# rate and transported items. The transported items of each
+# node are stored once, as item ids and rates, and shared by
+# the entities of the node. The result is built in one pass
+# over the network and does not change the blueprint, nor
+# keeps a reference to the network or its flows
+#
+# The blueprint fields and entities are copied in compact JSON
+# bytes, the result does not depend on the blueprint dictionary
+# once built and its values can't be changed by the reader
+#
+# The result is also a mapping of the analysed blueprint fields,
+# like the dictionary of Blueprint.get_analysis, whose values are
+# built when they are read: reading the items_output does not
+# build the blueprint entities dictionaries. to_dict builds the
+# whole dictionary, for example to write it in JSON
+#
+# Usage:
+#   result = AnalysisResult(bp, nw)
+#   result.usage_rate(result.index(12))
+#   result["items_output"]
+#   analysed_blueprint = result.to_dict()
+#   result = AnalysisResult.from_dict(analysed_blueprint)
+# -----------------------------------------------------------
+
+# Entity flags
+flag_analysed = 1     # the entity has a node, its transported items are known
+flag_usage = 2        # the entity has a usage rate
+flag_input = 4
+flag_output = 8
+flag_bottleneck = 16
+
+# Fields of the analysed blueprint built from the arrays when they are read
+computed_fields = ["blueprint", "items_input", "items_output",
+                   "entities_input", "entities_output", "entities_bottleneck"]
+
+# Number of entities decoded at once when they are read
+entities_chunk_size = 1024
+
+# Values added to the analysed blueprint entities
+entity_fields = ["usage_rate", "input", "output", "transpoted_items"]
+
+
+class AnalysisResult(MutableMapping):
+    __slots__ = ("fields", "computed", "blueprint_json", "entities_json", "entity_starts",
+                 "entity_numbers", "entities_index", "flags", "usage_rates",
+                 "flow_ids", "flow_starts", "item_ids", "item_rates", "item_names", "item_index",
+                 "items_input", "items_output", "entities_input", "entities_output",
+                 "entities_bottleneck")
+
+    def __init__(self, bp, nw):
+        # bp: Blueprint of the network, nw: calculated network
+        self._read_blueprint(bp.blueprint, bp.blueprint["blueprint"]["entities"])
+        self._read_network(nw)
+
+    @classmethod
+    def from_dict(cls, analysis):
+        # Result of an analysed blueprint dictionary, see to_dict
+        # The nodes are not known, the entities with the same
+        # transported items share their flow
+        result = cls.__new__(cls)
+
+        entities = [{key: value for (key, value) in entity_dic.items() if key not in entity_fields}
+                    for entity_dic in analysis["blueprint"]["entities"]]
+        result._read_blueprint(analysis, entities)
+        result._read_analysis(analysis)
+
+        return result
+
+    def _read_blueprint(self, bp_json, entities):
+        # Copy the blueprint fields and entities, without the analysis values
+        # Fields of the analysed blueprint, in the order of the dictionary
+        # of get_analysis, the computed ones have no value
+        # Format: {"blueprint": None, "index": b"2", "items_input": None, ...}
+        self.fields = {key: None if key in computed_fields else utils.dumps_json(value)
+                       for (key, value) in bp_json.items()}
+        self.fields.update(dict.fromkeys(computed_fields))
+        self.computed = set(computed_fields)
+
+        # The entities list is set when the blueprint is read
+        self.blueprint_json = utils.dumps_json({**bp_json["blueprint"], "entities": []})
+
+        # The entities JSON are separated by commas, the JSON of the
+        # entities i to j - 1 is entities_json[entity_starts[i]:entity_starts[j] - 1]
+        entities_json = [utils.dumps_json(entity_dic) for entity_dic in entities]
+        self.entities_json = b",".join(entities_json)
+        self.entity_starts = array("l", [0])
+        for entity_json in entities_json:
+            self.entity_starts.append(self.entity_starts[-1] + len(entity_json) + 1)
+
+        nb_entities = len(entities)
+        self.entity_numbers = [entity_dic["entity_number"] for entity_dic in entities]
+
+        # Index of the first entity of each number
+        # Format: {entity_number: index}
+        self.entities_index = {}
+        for (i, entity_number) in enumerate(self.entity_numbers):
+            self.entities_index.setdefault(entity_number, i)
+
+        self.flags = bytearray(nb_entities)
+        self.usage_rates = array("d", bytes(8 * nb_entities))
+
+        # Flow of the entity node, -1 without node
+        self.flow_ids = array("l", [-1]) * nb_entities
+
+        # Transported items of the flows, the items of the flow i are
+        # item_ids[flow_starts[i]:flow_starts[i + 1]], in the flow order
+        # The rates keep the int values, they are written as int in JSON
+        self.flow_starts = array("l", [0])
+        self.item_ids = array("l")
+        self.item_rates = []
+        self.item_names = []
+
+        # Format: {item_name: item_id}
+        self.item_index = {}
+
+        # Flow ids of the input and output nodes
+        self.items_input = []
+        self.items_output = []
+
+        self.entities_input = []
+        self.entities_output = []
+        self.entities_bottleneck = []
+
+    def _add_flow(self, items):
+        # Add the transported items of a flow, returns its id
+        # Format: {item_name: 0.8}
+        for (item_name, rate) in items.items():
+            item_id = self.item_index.get(item_name)
+            if item_id is None:
+                item_id = self.item_index[item_name] = len(self.item_names)
+                self.item_names.append(item_name)
+
+            self.item_ids.append(item_id)
+            self.item_rates.append(rate)
+
+        self.flow_starts.append(len(self.item_ids))
+        return len(self.flow_starts) - 2
+
+    def _read_network(self, nw):
+        # Format: {node: flow_id}
+        node_flows = {}
+
+        # Entity numbers of the input and output nodes
+        input_numbers = set()
+        output_numbers = set()
+
+        for node in nw.nodes:
+            flow_id = node_flows[node] = self._add_flow(node.flow.items)
+
+            if len(node.parents) == 0:
+                input_numbers.add(node.entity.number)
+                self.items_input.append(flow_id)
+                self.entities_input.append(node.entity.number)
+
+            if len(node.childs) == 0:
+                output_numbers.add(node.entity.number)
+                self.items_output.append(flow_id)
+                self.entities_output.append(node.entity.number)
+
+        # The compacted entities get the values of their node
+        for (i, entity_number) in enumerate(self.entity_numbers):
+            node = nw.get_node(entity_number)
+            if node is None:
+                continue
+
+            indexes = [i]
+            for compacted_node in node.compacted_nodes:
+                compacted_index = self.entities_index.get(compacted_node.entity.number)
+                if compacted_index is not None:
+                    indexes.append(compacted_index)
+
+            usage_ratio = node.usage_ratio
+            if usage_ratio is not None:
+                is_bottleneck = nw.is_bottleneck(node)
+
+                for index in indexes:
+                    self.usage_rates[index] = usage_ratio
+                    self.flags[index] |= flag_usage
+                    if is_bottleneck:
+                        self.flags[index] |= flag_bottleneck
+
+                # The entity is given after its compacted entities
+                if is_bottleneck:
+                    self.entities_bottleneck += [self.entity_numbers[index] for index in indexes[1:]]
+                    self.entities_bottleneck.append(entity_number)
+
+            flags = flag_analysed
+            if node.entity.number in input_numbers:
+                flags |= flag_input
+            if node.entity.number in output_numbers:
+                flags |= flag_output
+
+            flow_id = node_flows[node]
+            for index in indexes:
+                self.flags[index] |= flags
+                self.flow_ids[index] = flow_id
+
+    def _read_analysis(self, analysis):
+        # Format: {((item_name, rate), ...): flow_id}
+        flow_index = {}
+
+        def get_flow_id(items):
+            key = tuple(items.items())
+            flow_id = flow_index.get(key)
+            if flow_id is None:
+                flow_id = flow_index[key] = self._add_flow(items)
+            return flow_id
+
+        self.items_input = [get_flow_id(items) for items in analysis["items_input"]]
+        self.items_output = [get_flow_id(items) for items in analysis["items_output"]]
+        self.entities_input = list(analysis["entities_input"])
+        self.entities_output = list(analysis["entities_output"])
+        self.entities_bottleneck = list(analysis["entities_bottleneck"])
+
+        bottleneck_numbers = set(self.entities_bottleneck)
+        for (i, entity_dic) in enumerate(analysis["blueprint"]["entities"]):
+            flags = 0
+            if "usage_rate" in entity_dic:
+                flags |= flag_usage
+                self.usage_rates[i] = entity_dic["usage_rate"]
+                if entity_dic["entity_number"] in bottleneck_numbers:
+                    flags |= flag_bottleneck
+            if entity_dic.get("input"):
+                flags |= flag_input
+            if entity_dic.get("output"):
+                flags |= flag_output
+            if "transpoted_items" in entity_dic:
+                flags |= flag_analysed
+                self.flow_ids[i] = get_flow_id(entity_dic["transpoted_items"])
+
+            self.flags[i] = flags
+
+    # Mapping of the analysed blueprint fields, the values read are new
+    # The fields set or removed are not computed anymore
+    def __getitem__(self, key):
+        if key in self.computed:
+            return self._compute(key)
+
+        return utils.loads_json(self.fields[key])
+
+    def __setitem__(self, key, value):
+        self.fields[key] = utils.dumps_json(value)
+        self.computed.discard(key)
+
+    def __delitem__(self, key):
+        del self.fields[key]
+        self.computed.discard(key)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __repr__(self):
+        return f"<AnalysisResult of {self.nb_entities} entities>"
+
+    def _compute(self, key, flows=None):
+        # Value of a computed field, the lists are new
+        # flows: see get_flows, computed if needed
+        if key == "blueprint":
+            return self.get_blueprint(flows=flows)
+
+        if key in ["items_input", "items_output"]:
+            get_flow = self.get_flow if flows is None else flows.__getitem__
+            return [get_flow(flow_id) for flow_id in getattr(self, key)]
+
+        return list(getattr(self, key))
+
+    @property
+    def nb_entities(self):
+        return len(self.entity_numbers)
+
+    def index(self, entity_number):
+        # Index of the first blueprint entity of the number, None if not found
+        return self.entities_index.get(entity_number)
+
+    def usage_rate(self, i):
+        # Usage rate of the entity i, None if it has none
+        if not self.flags[i] & flag_usage:
+            return None
+        return self.usage_rates[i]
+
+    def is_input(self, i):
+        return bool(self.flags[i] & flag_input)
+
+    def is_output(self, i):
+        return bool(self.flags[i] & flag_output)
+
+    def is_bottleneck(self, i):
+        return bool(self.flags[i] & flag_bottleneck)
+
+    def transported_items(self, i):
+        # Items per second transported by the entity i, None without node
+        # Format: {item_name: 0.8}
+        if self.flow_ids[i] < 0:
+            return None
+        return self.get_flow(self.flow_ids[i])
+
+    def get_flow(self, flow_id):
+        start = self.flow_starts[flow_id]
+        end = self.flow_starts[flow_id + 1]
+        return {self.item_names[item_id]: rate
+                for (item_id, rate) in zip(self.item_ids[start:end], self.item_rates[start:end])}
+
+    def get_flows(self):
+        # Transported items of all the flows, by flow id
+        return [self.get_flow(flow_id) for flow_id in range(len(self.flow_starts) - 1)]
+
+    def iter_entities(self, flows=None):
+        # Analysed blueprint entities, new dictionaries with the values
+        # of the analysis after the blueprint entity values
+        # flows: see get_flows, the entities of a node share its items
+        if flows is None:
+            flows = self.get_flows()
+
+        for (i, entity_dic) in enumerate(self._iter_blueprint_entities()):
+            flags = self.flags[i]
+
+            if flags & flag_usage:
+                entity_dic["usage_rate"] = self.usage_rates[i]
+            if flags & flag_input:
+                entity_dic["input"] = True
+            if flags & flag_output:
+                entity_dic["output"] = True
+            if flags & flag_analysed:
+                entity_dic["transpoted_items"] = flows[self.flow_ids[i]]
+
+            yield entity_dic
+
+    def _iter_blueprint_entities(self):
+        # Blueprint entities, decoded by chunks
+        for start in range(0, self.nb_entities, entities_chunk_size):
+            end = min(start + entities_chunk_size, self.nb_entities)
+            yield from utils.loads_json(
+                b"[" + self.entities_json[self.entity_starts[start]:self.entity_starts[end] - 1] + b"]")
+
+    def get_blueprint(self, entities=None, flows=None):
+        # Analysed blueprint dictionary, with the analysed entities
+        # or the given entities list
+        blueprint = utils.loads_json(self.blueprint_json)
+        if entities is None:
+            entities = list(self.iter_entities(flows))
+
+        blueprint["entities"] = entities
+        return blueprint
+
+    def to_dict(self):
+        # Analysed blueprint dictionary, see Blueprint.get_analysis
+        # The computed fields share the flows dictionaries
+        flows = self.get_flows()
+
+        return {key: self._compute(key, flows) if key in self.computed else utils.loads_json(value)
+                for (key, value) in self.fields.items()}
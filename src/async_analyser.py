@@ -0,0 +1,160 @@
+import os
+import asyncio
+import concurrent.futures
+
+from src import blueprint_analyser, config
+
+# -----------------------------------------------------------
+# Analyse blueprints from asyncio code without blocking the
+# event loop
+# The analyses are submitted to a pool of worker processes or
+# threads. A semaphore bounds the number of analyses submitted
+# at once, a cancelled analysis is removed from the pool if it
+# did not start yet
+#
+# Usage:
+#   async with AsyncAnalyser(jobs=4) as analyser:
+#       analysis = await analyser.analyse(bp_json)
+#       analysis = await analyser.analyse_file("blueprints/beltFac1.json")
+#
+#       async for (index, analysis) in analyser.as_completed(paths):
+#           ...
+# -----------------------------------------------------------
+
+executors = config.async_executors
+
+
+class AsyncAnalyser:
+    # executor: "process" or "thread", from the config if None
+    # jobs: number of workers, all the cores are used if None
+    # max_in_flight: analyses submitted to the pool at once, twice
+    # the number of workers if None
+    # The config values are used for the arguments not given
+
+    def __init__(self, executor=None, jobs=None, max_in_flight=None):
+        settings = config.get_settings()
+        executor = executor or settings.async_executor
+        jobs = jobs or settings.async_jobs or os.cpu_count()
+        max_in_flight = max_in_flight or settings.async_max_in_flight or 2 * jobs
+
+        if executor not in executors:
+            raise ValueError(f"Unknown executor '{executor}', expected one of {', '.join(executors)}")
+
+        self.jobs = jobs
+        self.max_in_flight = max_in_flight
+
+        if executor == "process":
+            # The workers load the config and the Factorio data once
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=blueprint_analyser.init_worker,
+                initargs=(config.config.config_path, config.config.cache_path))
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs)
+
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def analyse(self, bp_json, settings=None):
+        # Analysis of a decoded blueprint or blueprint book
+        # The pages of a book are analysed in the same worker
+        # settings: settings overridden for this analysis, added to
+        # the ones overridden in the current context
+        return await self._submit(blueprint_analyser.analyse_blueprint,
+                                  bp_json, None, 1, _get_overrides(settings))
+
+    async def analyse_file(self, path, settings=None):
+        # Analysis of a blueprint file, read and decoded by the worker
+        return await self._submit(blueprint_analyser.calculate_blueprint_bottleneck,
+                                  path, 1, None, _get_overrides(settings))
+
+    async def as_completed(self, items):
+        # Yields the (index, analysis) of the items as their analyses end
+        # items: iterable or async iterable of decoded blueprints or of
+        # file paths, the files are read and decoded by the workers
+        # A failed analysis gives {"error": "ValueError: ..."}
+        tasks = set()
+
+        try:
+            async for (index, item) in _enumerate(items):
+                # Only the items about to be submitted are read
+                while len(tasks) >= self.max_in_flight:
+                    (done, tasks) = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+
+                tasks.add(asyncio.ensure_future(self._analyse_item(index, item)))
+
+            while len(tasks) > 0:
+                (done, tasks) = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+
+        finally:
+            # The iteration was stopped or cancelled
+            for task in tasks:
+                task.cancel()
+
+    async def _analyse_item(self, index, item):
+        try:
+            if isinstance(item, (str, os.PathLike)):
+                analysis = await self.analyse_file(os.fspath(item))
+            else:
+                analysis = await self.analyse(item)
+        except Exception as e:
+            analysis = {"error": f"{type(e).__name__}: {e}"}
+
+        return (index, analysis)
+
+    async def _submit(self, function, *args):
+        # The slot of an analysis is released when it ends in the pool:
+        # a cancelled analysis that already started keeps its slot
+        await self.semaphore.acquire()
+        loop = asyncio.get_running_loop()
+
+        try:
+            future = self.executor.submit(function, *args)
+        except BaseException:
+            self.semaphore.release()
+            raise
+
+        future.add_done_callback(lambda _: _call_soon(loop, self.semaphore.release))
+
+        # Cancelling the awaited future cancels the pool future
+        return await asyncio.wrap_future(future)
+
+    async def close(self):
+        # Wait for the started analyses, the others are cancelled
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.executor.shutdown(wait=True, cancel_futures=True))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+
+def _get_overrides(settings):
+    # The workers don't run in the context of the caller,
+    # its overridden settings are given with the analysis
+    return {**config.get_overrides(), **(settings or {})}
+
+
+async def _enumerate(items):
+    if hasattr(items, "__aiter__"):
+        index = 0
+        async for item in items:
+            yield (index, item)
+            index += 1
+    else:
+        for (index, item) in enumerate(items):
+            yield (index, item)
+
+
+def _call_soon(loop, callback):
+    # Run the callback in the event loop, from a pool thread
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # The event loop is closed
+        pass
@@ -0,0 +1,186 @@
+import os
+import glob
+import json
+import time
+
+from src import blueprint_analyser, result_export, config, utils
+
+# -----------------------------------------------------------
+# Analyse many blueprints in a pool of worker processes
+# The blueprints are read from a directory, a glob pattern
+# or a manifest file (one blueprint path per line)
+# Each worker loads the config and the Factorio data once,
+# writes one analysis file per blueprint and a summary
+# file is written at the end
+# -----------------------------------------------------------
+
+summary_file_name = "summary.json"
+
+
+def find_blueprints(source):
+    # Returns the list of the blueprint paths described by the source
+
+    if os.path.isdir(source):
+        # Every file of the directory
+        paths = [os.path.join(source, file_name)
+                 for file_name in sorted(os.listdir(source))]
+        return [path for path in paths if os.path.isfile(path)]
+
+    if os.path.isfile(source):
+        return read_manifest(source)
+
+    # Glob pattern, "**" can be used to search the sub directories
+    return sorted(path for path in glob.glob(source, recursive=True)
+                  if os.path.isfile(path))
+
+
+def read_manifest(manifest_path):
+    # Manifest format:
+    #   # Comment
+    #   blueprints/beltFac1.json
+    #   /home/user/blueprints/furFac1
+    # The relative paths are relative to the manifest directory
+
+    manifest_dir = os.path.dirname(manifest_path)
+    paths = []
+
+    with open(manifest_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+
+            paths.append(os.path.join(manifest_dir, line))
+
+    return paths
+
+
+def analyse_batch(source, output_dir, jobs=None, export_format=result_export.default_format, fields=None,
+                  settings=None):
+    # Analyse all the blueprints of the source in parallel
+    # source: directory, glob pattern, manifest file or list of paths
+    # jobs: number of worker processes, all the cores are used if None
+    # export_format, fields: format and fields of the analysis files,
+    # see result_export.write_analysis
+    # settings: settings overridden for the analyses, added to the
+    # ones overridden in the current context, see config.Settings
+    # Returns the summary of the batch
+    result_export.check_format(export_format)
+
+    if isinstance(source, str):
+        blueprint_paths = find_blueprints(source)
+    else:
+        blueprint_paths = list(source)
+
+    if len(blueprint_paths) == 0:
+        utils.warning(f"No blueprint found in {source}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    output_paths = _output_paths(blueprint_paths, output_dir, result_export.formats[export_format])
+    # The workers don't run in the current context
+    settings = {**config.get_overrides(), **(settings or {})}
+    tasks = [(i, path, output_path, export_format, fields, settings) for (i, (path, output_path))
+             in enumerate(zip(blueprint_paths, output_paths))]
+
+    records = [None] * len(tasks)
+    nb_processes = jobs if jobs is not None else os.cpu_count()
+    start = time.perf_counter()
+
+    with blueprint_analyser.create_pool(nb_processes) as pool:
+        # Sending the blueprints by chunks reduces the inter process
+        # communication cost for the large batches of small blueprints
+        chunksize = max(1, min(64, len(tasks) // (nb_processes * 4)))
+
+        for (i, record) in pool.imap_unordered(_analyse_blueprint, tasks, chunksize):
+            records[i] = record
+
+            if record["status"] != "ok":
+                utils.warning(
+                    f"Analysis of {record['input']} failed: {record['error']}")
+
+    duration = time.perf_counter() - start
+    nb_failed = sum(1 for record in records if record["status"] != "ok")
+
+    summary = {
+        "nb_blueprints": len(records),
+        "nb_analysed": len(records) - nb_failed,
+        "nb_failed": nb_failed,
+        "jobs": nb_processes,
+        "duration": duration,
+        "blueprints_per_second": len(records) / duration if duration > 0 else 0,
+        "blueprints": records,
+    }
+
+    with open(os.path.join(output_dir, summary_file_name), "w") as f:
+        f.write(json.dumps(summary, indent=4))
+
+    utils.success(
+        f"{summary['nb_analysed']}/{len(records)} blueprints analysed in {duration:.2f}s with {nb_processes} processes")
+
+    return summary
+
+
+def _output_paths(blueprint_paths, output_dir, extension=".json"):
+    # One result file per blueprint, named after the blueprint file
+    # A suffix is added when two blueprints have the same file name
+    output_paths = []
+    used_names = set([summary_file_name])
+
+    for path in blueprint_paths:
+        base_name = os.path.basename(path)
+        if base_name.endswith(".json"):
+            base_name = base_name[:-len(".json")]
+
+        name = base_name + extension
+        suffix = 1
+        while name in used_names:
+            name = f"{base_name}-{suffix}{extension}"
+            suffix += 1
+
+        used_names.add(name)
+        output_paths.append(os.path.join(output_dir, name))
+
+    return output_paths
+
+
+def _analyse_blueprint(task):
+    # Executed in a worker process
+    # The analysis is written by the worker so that
+    # only the summary record is sent back to the main process
+    (i, blueprint_path, output_path, export_format, fields, settings) = task
+
+    record = {"input": blueprint_path, "output": output_path}
+    start = time.perf_counter()
+
+    try:
+        analysed_blueprint = blueprint_analyser.calculate_blueprint_bottleneck(
+            blueprint_path, settings=settings)
+
+        result_export.write_analysis(analysed_blueprint, output_path, export_format, fields)
+
+        record["status"] = "ok"
+
+        if "pages" in analysed_blueprint:
+            # Blueprint book, the pages are analysed by this worker
+            pages_analysis = [page["analysis"] for page in analysed_blueprint["pages"].values()
+                              if "analysis" in page]
+
+            record["nb_pages"] = analysed_blueprint["nb_pages"]
+            record["nb_failed_pages"] = analysed_blueprint["nb_failed_pages"]
+            record["items_output"] = [items for page_analysis in pages_analysis
+                                      for items in page_analysis["items_output"]]
+            record["nb_bottlenecks"] = sum(len(page_analysis["entities_bottleneck"])
+                                           for page_analysis in pages_analysis)
+        else:
+            record["items_output"] = analysed_blueprint["items_output"]
+            record["nb_bottlenecks"] = len(
+                analysed_blueprint["entities_bottleneck"])
+
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+
+    record["duration"] = time.perf_counter() - start
+
+    return (i, record)
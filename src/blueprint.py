@@ -1,12 +1,10 @@
-import json
-
-from src import utils, entity, config
+from src import utils, entity, config, spatial, instrumentation, terminal_map, analysis_result
 
 # -----------------------------------------------------------
 # Read the blueprint from the given file
 # Decode the file is encoded
 # Create an entity list from the blueprint items
-# Place the entities in a 2D array according to their position
+# Place the entities in a sparse 2D grid according to their position
 # -----------------------------------------------------------
 
 
@@ -15,13 +13,26 @@ class Blueprint:
     label = ""
     heigth = 0
     width = 0
-    array = []
+    grid = None
     blueprint = None
 
     def __init__(self, bp_json):
         self.blueprint = bp_json
+        self.network = None
+        self.grid = spatial.ChunkedGrid(0, 0)
+
+        # Blueprint coordinates of the grid origin, set with the entities
+        self.origin = None
+
+        # The entities list is not shared between blueprints
+        # so that several blueprints can be analysed in the same process
+        self.entities = []
 
         # Check if the json is valid
+        if "blueprint_book" in bp_json:
+            raise Exception(
+                "Invalid blueprint, blueprint books pages must be loaded separately")
+
         if "blueprint" not in bp_json:
             raise Exception("Invalid blueprint, no 'blueprint' key found")
 
@@ -34,9 +45,13 @@ class Blueprint:
             self.label = bp_json["blueprint"]["label"]
 
         entities = bp_json["blueprint"]["entities"]
+        self.index_entities()
 
         # === Blueprint pre process ===
 
+        # The entities prototypes of the current data and config
+        prototypes = entity.get_prototypes()
+
         # entities creation
         for entity_dic in entities:
 
@@ -45,7 +60,7 @@ class Blueprint:
                 entity_dic["name"] = "iron-chest"
 
             # Creation of the entity from the blueprint entity dictionary
-            new_entity = entity.create_entity(entity_dic)
+            new_entity = entity.create_entity(entity_dic, prototypes=prototypes)
 
             if new_entity is not None:
                 self.entities.append(new_entity)
@@ -62,102 +77,138 @@ class Blueprint:
             entity_obj.position[0] -= lowest_x
             entity_obj.position[1] -= lowest_y
 
+        self.origin = (lowest_x, lowest_y)
+
         self.width = max(e.position[0] for e in self.entities) + 1
         self.heigth = max(e.position[1] for e in self.entities) + 1
 
-        # === Convertion of the blueprint into a 2D array ===
-        self.array = []
-
-        for _ in range(self.heigth):
-            self.array.append([None] * self.width)
+        # === Convertion of the blueprint into a 2D grid ===
+        # Only the parts of the grid containing entities are allocated
+        self.grid = spatial.ChunkedGrid(self.width, self.heigth)
 
         for created_entity in self.entities:
-            if created_entity.large:
-                # Because entites like the assembling machine is a 3x3 block,
-                # we need to store it in the array 9 times
-                for offset in created_entity.offsets:
-                    offset_coord_x = offset[0] + created_entity.position[0]
-                    offset_coord_y = offset[1] + created_entity.position[1]
-
-                    # check that the offset is in the bondaries
-                    if offset_coord_x >= self.width or offset_coord_x < 0:
-                        continue
-
-                    if offset_coord_y >= self.heigth or offset_coord_y < 0:
-                        continue
-
-                    self.array[offset_coord_y][offset_coord_x] = created_entity
-
-            else:
-                self.array[created_entity.position[1]
-                           ][created_entity.position[0]] = created_entity
+            for (x, y) in self.get_entity_tiles(created_entity):
+                self.grid.set(x, y, created_entity)
 
         # === Post process ===
 
-        # Adding a temporary entity to the array where arms pickup or drop items
+        # Adding a temporary entity to the grid where arms pickup or drop items
         # on an empty tile
+        with instrumentation.phase("virtual_chests"):
+            nb_virtual_chests = self.add_virtual_chests(prototypes)
 
-        for y in range(self.heigth):
-            for x in range(self.width):
-                e = self.array[y][x]
-                if e is not None and e.data["type"] == "inserter":
-                    # Check drop tile
-                    # If the drop tile is empty, add a virtual chest
-                    # No need to check the pickup tile because the inserter
-                    # will pickup the item from the virtual chest
-                    # created by the other arm
-                    drop_coord = e.get_drop_tile_coord()
-                    if self.is_coord_in_boundaries(drop_coord):
-                        drop_tile = self.array[drop_coord[1]][drop_coord[0]]
-                        if drop_tile is None:
-                            # The drop tile is empty, we add a temporary entity
-                            container = entity.create_entity(
-                                {
-                                    'entity_number': str(e.number) + "_virtual\n(empty tile)",
-                                    'name': 'wooden-chest',
-                                    'position': {'x': drop_coord[0], 'y': drop_coord[1]}
-                                }, virtual=True)
-
-                            utils.verbose(f"Adding temporary entity {container}")
-                            self.array[drop_coord[1]
-                                       ][drop_coord[0]] = container
+        instrumentation.count("entities", len(self.entities))
+        instrumentation.count("virtual_chests", nb_virtual_chests)
 
         utils.success(f"Blueprint {self.label} loaded successfully")
 
+    def index_entities(self):
+        # Index of the blueprint entities dictionaries by entity number
+        # The first entity is kept if a number is used twice
+        self.entities_by_number = {}
+        for entity_dic in self.blueprint["blueprint"]["entities"]:
+            self.entities_by_number.setdefault(entity_dic["entity_number"], entity_dic)
+
+    def get_entity_tiles(self, entity_obj):
+        # Returns the grid tiles covered by the entity
+        if not entity_obj.large:
+            return [(entity_obj.position[0], entity_obj.position[1])]
+
+        # Because entites like the assembling machine is a 3x3 block,
+        # we need to store it in the grid 9 times
+        tiles = []
+        for offset in entity_obj.offsets:
+            offset_coord_x = offset[0] + entity_obj.position[0]
+            offset_coord_y = offset[1] + entity_obj.position[1]
+
+            # check that the offset is in the bondaries
+            if offset_coord_x >= self.width or offset_coord_x < 0:
+                continue
+
+            if offset_coord_y >= self.heigth or offset_coord_y < 0:
+                continue
+
+            tiles.append((offset_coord_x, offset_coord_y))
+
+        return tiles
+
+    def add_virtual_chests(self, prototypes):
+        # Add a virtual chest on the empty tiles where inserters drop items
+        # Returns the number of added chests
+        nb_virtual_chests = 0
+
+        for (x, y, e) in self.grid.cells():
+            if e.data["type"] == "inserter":
+                if self.add_virtual_chest(e, prototypes) is not None:
+                    nb_virtual_chests += 1
+
+        return nb_virtual_chests
+
+    def add_virtual_chest(self, inserter, prototypes):
+        # Returns the chest added on the inserter drop tile, None if
+        # the tile is not empty
+        # No need to check the pickup tile because the inserter
+        # will pickup the item from the virtual chest
+        # created by the other arm
+        drop_coord = inserter.get_drop_tile_coord()
+        if not self.is_coord_in_boundaries(drop_coord) or\
+                self.grid.get(drop_coord[0], drop_coord[1]) is not None:
+            return None
+
+        # The drop tile is empty, we add a temporary entity
+        container = entity.create_entity(
+            {
+                'entity_number': str(inserter.number) + "_virtual\n(empty tile)",
+                'name': 'wooden-chest',
+                'position': {'x': drop_coord[0], 'y': drop_coord[1]}
+            }, virtual=True, prototypes=prototypes)
+
+        utils.verbose(f"Adding temporary entity {container}")
+        self.grid.set(drop_coord[0], drop_coord[1], container)
+        return container
+
     def is_coord_in_boundaries(self, coord):
         return coord[0] >= 0 and coord[0] < self.width and\
             coord[1] >= 0 and coord[1] < self.heigth
 
-    def display(self):
-        if config.config.verbose_level < 3:
+    def display(self, viewport=None, max_size=None):
+        # Display the entities and the map of the blueprint
+        # viewport: (x, y, width, heigth) part of the map, from the config if None
+        # max_size: (columns, rows) of the map, from the config if None
+        settings = config.get_settings()
+        if settings.verbose_level < 3:
             return
 
-        utils.verbose(
-            f"\n{self.label}, width: {self.width}, heigth: {self.heigth}, {len(self.entities)} entities:")
-        for entity in self.entities:
-            utils.verbose("  " + str(entity))
-
-        utils.verbose("")
-        for (y, row) in enumerate(self.array):
-            utils.verbose("   ", end=" ")
-            for (x, entity) in enumerate(row):
-                if entity is None:
-                    utils.verbose(" ", end=" ")
-                else:
-                    if entity.large:
-                        utils.verbose(entity.to_char([x, y]), end=" ")
-                    else:
-                        utils.verbose(entity.to_char(), end=" ")
-            utils.verbose("")
-        utils.verbose("")
+        if viewport is None:
+            viewport = settings.map_viewport
+        if max_size is None:
+            max_size = settings.map_max_size
 
-    def get_analysis(self):
-        # Read the blueprint network if it exists
-        # Then fill the information in a new dictionary
+        lines = [f"\n{self.label}, width: {self.width}, heigth: {self.heigth}, {len(self.entities)} entities:"]
+        lines += ["  " + str(entity) for entity in self.entities]
+        lines.append("")
+
+        grid_map = terminal_map.render_map(self, viewport, max_size)
+        if grid_map != "":
+            lines.append(grid_map)
+        lines.append("")
 
+        # Written at once
+        utils.verbose("\n".join(lines))
+
+    def get_result(self):
+        # Analysis of the blueprint network, it does not change the
+        # blueprint dictionary, see AnalysisResult
         if self.network is None:
             raise Exception("No network found")
 
+        return analysis_result.AnalysisResult(self, self.network)
+
+    def get_analysis(self):
+        # Read the blueprint network if it exists
+        # Then fill the information in a new dictionary,
+        # the blueprint entities dictionaries are copied
+
         # Base blueprint format :
         # "blueprint": {
         #     "icons": [...],
@@ -228,108 +279,70 @@ class Blueprint:
         #     "entities_bottleneck": [18, 23],
         # }
 
-        analysed_bp = self.blueprint.copy()
-
-        # Pre load network input and output
+        return self.get_result().to_dict()
 
-        root_entities_number = [
-            node.entity.number for node in self.network.root_nodes()]
-        leaf_entities_number = [
-            node.entity.number for node in self.network.leaf_nodes()]
 
-        entities_bottleneck = []
-
-        for entity in analysed_bp["blueprint"]["entities"]:
-            node = self.network.get_node(entity["entity_number"])
-
-            if node is None:
-                continue
-
-            # Adding usage_rate
-            usage_rate = node.usage_ratio
-            if usage_rate is not None:
-                entity["usage_rate"] = usage_rate
-
-                # If the node as been "compacted" with other entities
-                # due to optimization, we need to update the oser entites
-                for compacted_node in node.compacted_nodes:
-                    compacted_entity = self._get_entity(
-                        compacted_node.entity.number, analysed_bp["blueprint"]["entities"])
-                    compacted_entity["usage_rate"] = usage_rate
-
-                    # Adding bottleneck entities number
-                    if usage_rate >= 1:
-                        entities_bottleneck.append(
-                            compacted_entity["entity_number"])
-
-                # Adding bottleneck entities number
-                if usage_rate >= 1:
-                    entities_bottleneck.append(entity["entity_number"])
-
-            # Adding input/output
-            if node.entity.number in root_entities_number:
-                entity["input"] = True
+def read_blueprint_file(file):
+    # Returns the decoded content of the file,
+    # a blueprint or a blueprint book dictionary
+    # The files are read and parsed by chunks
+    if file.endswith(".json"):
+        # No need to decode the json
+        with open(file, 'rb') as f:
+            bp_json = utils.load_json(f)
 
-                for compacted_node in node.compacted_nodes:
-                    compacted_entity = self._get_entity(
-                        compacted_node.entity.number, analysed_bp["blueprint"]["entities"])
-                    compacted_entity["input"] = True
+    else:
+        with open(file, 'r') as f:
+            bp_json = utils.decode_file(f)
 
-            if node.entity.number in leaf_entities_number:
-                entity["output"] = True
+    return bp_json
 
-                for compacted_node in node.compacted_nodes:
-                    compacted_entity = self._get_entity(
-                        compacted_node.entity.number, analysed_bp["blueprint"]["entities"])
-                    compacted_entity["output"] = True
 
-            # Adding transpoted_items
-            entity["transpoted_items"] = node.flow.items
-            for compacted_node in node.compacted_nodes:
-                compacted_entity = self._get_entity(
-                    compacted_node.entity.number, analysed_bp["blueprint"]["entities"])
-                compacted_entity["transpoted_items"] = node.flow.items
+def load_blueprint(file):
+    # Read the file
+    bp_json = read_blueprint_file(file)
 
-        # Adding the total in and out flow
-        items_input = []
-        for root_node in self.network.root_nodes():
-            items_input.append(root_node.flow.items)
+    # Return the blueprint
+    return Blueprint(bp_json)
 
-        items_output = []
-        for leaf_node in self.network.leaf_nodes():
-            items_output.append(leaf_node.flow.items)
 
-        analysed_bp["items_input"] = items_input
-        analysed_bp["items_output"] = items_output
+def is_blueprint_book(bp_json):
+    return "blueprint_book" in bp_json
 
-        # Adding the entities input and output
-        analysed_bp["entities_input"] = root_entities_number
-        analysed_bp["entities_output"] = leaf_entities_number
 
-        # Adding the entities bottleneck
-        analysed_bp["entities_bottleneck"] = entities_bottleneck
+def get_book_pages(book_json, key_prefix=""):
+    # Returns the list of the blueprints of a blueprint book
+    # as (key, label, blueprint json) tuples
+    # The nested books are flattened, the key is the index path
+    # of the page in the book, for example "2.0" for the first
+    # page of the book placed at index 2
 
-        return analysed_bp
+    # Book format:
+    # "blueprint_book": {
+    #     "blueprints": [
+    #         {"index": 0, "blueprint": {...}},
+    #         {"index": 1, "blueprint_book": {...}},
+    #         {"index": 2, "upgrade_planner": {...}}
+    #     ],
+    #     "item": "blueprint-book",
+    #     "label": "Production",
+    #     "active_index": 0,
+    #     "version": 281479275544576
+    # }
 
-    def _get_entity(self, entity_number, entites):
-        for entity in entites:
-            if entity["entity_number"] == entity_number:
-                return entity
+    pages = []
+    book_pages = book_json["blueprint_book"].get("blueprints", [])
 
-        return {}
+    for (i, page) in enumerate(book_pages):
+        key = key_prefix + str(page.get("index", i))
 
+        if "blueprint" in page:
+            label = page["blueprint"].get("label", "No label")
+            pages.append((key, label, {"blueprint": page["blueprint"]}))
 
-def load_blueprint(file):
-    # Read the file
-    if file.endswith(".json"):
-        # No need to decode the json
-        with open(file, 'r') as f:
-            bp_json = json.load(f)
+        elif "blueprint_book" in page:
+            pages += get_book_pages(page, key + ".")
 
-    else:
-        with open(file, 'r') as f:
-            bp_encoded = f.read()
-        bp_json = utils.decode(bp_encoded)
+        # The deconstruction and upgrade planners are ignored
 
-    # Return the blueprint
-    return Blueprint(bp_json)
+    return pages
@@ -1,9 +1,18 @@
+import sqlite3
+import multiprocessing
+from functools import partial
+from contextlib import nullcontext
 
 from src import (
     factorio,
     blueprint,
     network,
-    config
+    graph_export,
+    analysis_cache,
+    analysis_result,
+    config,
+    utils,
+    instrumentation as instrumentation_service
 )
 
 
@@ -15,20 +24,236 @@ def init(config_path=None):
     factorio.load_data()
 
 
-def calculate_blueprint_bottleneck(blueprint_path):
-    # Read the input blueprint
-    bp = blueprint.load_blueprint(blueprint_path)
-    bp.display()
+def init_worker(config_path=None, cache_path=None):
+    # Init a worker process of an analysis pool
+    # The config and the Factorio data are loaded once per process
+    # cache_path: analysis cache of the parent process, it can be
+    # set outside of the config file
+    init(config_path)
+    config.config.set_config_value(cache_path, "cache", "path")
+
+    # A forked worker starts with the settings overridden in the
+    # parent, the overrides are given with each analysis instead
+    config.context_settings.set(None)
+
+    # The workers don't open the network web page
+    # and only display the errors and warnings
+    config.config.set_config_value(False, "network", "display")
+    config.config.set_config_value(
+        min(config.config.verbose_level, 2), "verbose_level")
+
+
+def create_pool(jobs=None):
+    # Create a pool of worker processes ready to analyse blueprints
+    # with the same config as the current process
+    # jobs: number of processes, all the cores are used if None
+    return multiprocessing.Pool(processes=jobs,
+                                initializer=init_worker,
+                                initargs=(config.config.config_path, config.config.cache_path))
+
+
+def calculate_blueprint_bottleneck(blueprint_path, jobs=None, instrumentation=None, settings=None):
+    # instrumentation: Instrumentation object recording the analysis phases,
+    # one is created if the instrumentation is enabled in the config
+    # settings: settings overridden for this analysis, see config.Settings
+    # Format: {"inserter_capacity_bonus": 2}
+    with config.use_settings(**(settings or {})):
+        return _calculate_blueprint_bottleneck(blueprint_path, jobs, instrumentation)
+
+
+def _calculate_blueprint_bottleneck(blueprint_path, jobs, instrumentation):
+    instrumentation = _get_instrumentation(instrumentation)
+
+    with instrumentation or nullcontext():
+        # Read the input blueprint or blueprint book
+        with instrumentation_service.phase("decode"):
+            bp_json = blueprint.read_blueprint_file(blueprint_path)
+
+        analysis_result = _analyse_json(bp_json, jobs)
+
+    if instrumentation is not None:
+        analysis_result["instrumentation"] = instrumentation.to_dict()
+
+    return analysis_result
+
+
+def analyse_blueprint(bp_json, instrumentation=None, jobs=None, settings=None):
+    # Analyse a decoded blueprint or blueprint book
+    # jobs: number of processes analysing the pages of a book
+    # settings: settings overridden for this analysis, see config.Settings
+    with config.use_settings(**(settings or {})):
+        return _analyse_blueprint_json(bp_json, instrumentation, jobs)
+
+
+def _analyse_blueprint_json(bp_json, instrumentation, jobs):
+    instrumentation = _get_instrumentation(instrumentation)
+
+    with instrumentation or nullcontext():
+        analysis_result = _analyse_json(bp_json, jobs)
+
+    if instrumentation is not None:
+        analysis_result["instrumentation"] = instrumentation.to_dict()
+
+    return analysis_result
+
+
+def _analyse_json(bp_json, jobs):
+    if blueprint.is_blueprint_book(bp_json):
+        return _get_analysis(bp_json, partial(calculate_book_bottleneck, jobs=jobs))
+
+    return _get_analysis(bp_json, _analyse_blueprint)
+
+
+def _get_analysis(bp_json, analyse):
+    # Returns the cached analysis of the decoded blueprint, or
+    # analyses it with the analyse function and caches the result
+    try:
+        cache = analysis_cache.get_cache()
+    except sqlite3.Error as e:
+        utils.warning(f"Analysis cache not available: {e}")
+        cache = None
+
+    if cache is None:
+        return analyse(bp_json)
+
+    # The network is needed to display or export it
+    with instrumentation_service.phase("cache"):
+        key = analysis_cache.get_key(bp_json)
+        analysis_result = None
+        settings = config.get_settings()
+        if not settings.display_network and settings.network_export is None:
+            analysis_result = _read_cache(cache, key)
+
+    instrumentation_service.count("cache_hit", int(analysis_result is not None))
+    if analysis_result is not None:
+        return analysis_result
+
+    analysis_result = analyse(bp_json)
+
+    with instrumentation_service.phase("cache"):
+        try:
+            cache.put(key, analysis_result)
+        except sqlite3.Error as e:
+            utils.warning(f"Analysis not cached: {e}")
+
+    return analysis_result
+
+
+def _read_cache(cache, key):
+    # The cached blueprint analyses are read as analysis results,
+    # the same as the analyses of the blueprints
+    try:
+        analysis = cache.get(key)
+    except sqlite3.Error as e:
+        utils.warning(f"Analysis cache not readable: {e}")
+        return None
+
+    if analysis is None:
+        return None
+
+    if "pages" not in analysis:
+        return analysis_result.AnalysisResult.from_dict(analysis)
+
+    for page in analysis["pages"].values():
+        if "analysis" in page:
+            page["analysis"] = analysis_result.AnalysisResult.from_dict(page["analysis"])
+
+    return analysis
+
+
+def _analyse_blueprint(bp_json):
+    with instrumentation_service.phase("blueprint"):
+        bp = blueprint.Blueprint(bp_json)
+
+    with instrumentation_service.phase("display"):
+        bp.display()
 
     # Creade a node network from the blueprint
-    nw = network.create_network(bp)
+    with instrumentation_service.phase("create_network"):
+        nw = network.create_network(bp)
 
     # Calculate bottleneck
     nw.calculate_bottleneck()
-    if config.config.display_network:
-        nw.display()
+    settings = config.get_settings()
+    if settings.display_network:
+        with instrumentation_service.phase("display"):
+            nw.display()
 
-    # Export the analysis
-    analysis_result = bp.get_analysis()
+    if settings.network_export is not None:
+        with instrumentation_service.phase("export"):
+            graph_path = f"{bp.label.replace('/', '-')}.graph.{settings.network_export}"
+            graph_export.export_network(nw, graph_path, settings.network_export,
+                                        settings.network_icons_dir)
+
+    # Read the analysis, its dictionary is built when it is exported
+    with instrumentation_service.phase("analysis"):
+        analysis_result = bp.get_result()
 
     return analysis_result
+
+
+def _get_instrumentation(instrumentation):
+    # Returns the Instrumentation object of the analysis or None
+    if instrumentation is None and config.get_settings().instrumentation:
+        return instrumentation_service.Instrumentation()
+
+    return instrumentation
+
+
+def calculate_book_bottleneck(book_json, jobs=None):
+    # Analyse each page of a decoded blueprint book
+    # The pages are analysed in a pool of worker processes
+    # jobs: number of processes, all the cores are used if None
+
+    # Book analysis format:
+    # {
+    #     "blueprint_book": {"label": "Production", ...},
+    #     "pages": {
+    #         "0": {"label": "Gears", "analysis": {"blueprint": {...}, ...}},
+    #         "1.0": {"label": "Plates", "error": "..."},
+    #     },
+    #     "nb_pages": 2,
+    #     "nb_analysed_pages": 1,
+    #     "nb_failed_pages": 1
+    # }
+
+    pages = blueprint.get_book_pages(book_json)
+
+    if jobs is None:
+        jobs = min(len(pages), multiprocessing.cpu_count())
+
+    with instrumentation_service.phase("pages"):
+        if jobs <= 1 or multiprocessing.current_process().daemon:
+            # Not worth starting processes, or we already are
+            # a pool worker and can't have child processes
+            pages_analysis = [_analyse_page(page) for page in pages]
+        else:
+            # The workers analyse the pages with the overridden settings
+            with create_pool(jobs) as pool:
+                pages_analysis = pool.map(partial(_analyse_page, settings=config.get_overrides()), pages)
+
+    # The book is reported without its pages
+    book_info = {key: value for (key, value) in book_json["blueprint_book"].items()
+                 if key != "blueprints"}
+
+    nb_failed_pages = sum(1 for page in pages_analysis if "error" in page)
+
+    return {
+        "blueprint_book": book_info,
+        "pages": {key: page for (key, _, _), page in zip(pages, pages_analysis)},
+        "nb_pages": len(pages),
+        "nb_analysed_pages": len(pages) - nb_failed_pages,
+        "nb_failed_pages": nb_failed_pages
+    }
+
+
+def _analyse_page(page, settings=None):
+    (key, label, bp_json) = page
+    page_analysis = {"label": label}
+
+    try:
+        page_analysis["analysis"] = analyse_blueprint(bp_json, settings=settings)
+    except Exception as e:
+        page_analysis["error"] = f"{type(e).__name__}: {e}"
+
+    return page_analysis
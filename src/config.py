@@ -1,5 +1,9 @@
 import yaml
 import os
+import typing
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, fields, replace
 
 # Default config YAML format:
 #
@@ -10,16 +14,164 @@ import os
 #   verbose_level: 3
 #   network:
 #     display: true
+#     export: null
+#     icons_dir: null
+#   map:
+#     viewport: null
+#     max_size: null
+#   cache:
+#     path: null
+#     max_size: 256
+#   server:
+#     timeout: 30
+#     max_pending: 64
+#   async:
+#     executor: process
+#     jobs: null
+#     max_in_flight: null
+#   bottleneck:
+#     solver: negotiation
+#   instrumentation: false
+
+# -----------------------------------------------------------
+# The YAML config is resolved once, when it is loaded or changed,
+# in a frozen Settings snapshot read by the analysis. Settings
+# can be overridden for the analyses of the current thread or
+# asyncio task, without changing the loaded config
+#
+# Usage:
+#   config.get_settings().inserter_capacity_bonus
+#   with config.use_settings(inserter_capacity_bonus=2):
+#       analysis = blueprint_analyser.analyse_blueprint(bp_json)
+# -----------------------------------------------------------
 
 default_config_path = "config/config_default.yaml"
 config = None
 
+# Settings overridden in the current context, None for the config settings
+context_settings = contextvars.ContextVar("settings", default=None)
+
+flow_solvers = ["negotiation", "maxflow"]
+async_executors = ["process", "thread"]
+
+# Settings used once per process, to load the Factorio data and open the
+# analysis cache, they can't be overridden in a context
+process_settings = ["data_file_path", "cache_path", "cache_max_size"]
+
+
+@dataclass(frozen=True)
+class Settings:
+    # Factorio
+    inserter_capacity_bonus: int
+    difficulty: typing.Optional[str]
+    data_file_path: str
+
+    verbose_level: int
+
+    # Network
+    display_network: bool
+    network_export: typing.Optional[str]
+    network_icons_dir: typing.Optional[str]
+
+    # Map, (x, y, width, heigth) and (columns, rows)
+    map_viewport: typing.Optional[tuple]
+    map_max_size: typing.Optional[tuple]
+
+    # Cache, the maximum size is in bytes
+    cache_path: typing.Optional[str]
+    cache_max_size: int
+
+    # Server
+    server_timeout: float
+    server_max_pending: int
+
+    # Async
+    async_executor: str
+    async_jobs: typing.Optional[int]
+    async_max_in_flight: typing.Optional[int]
+
+    flow_solver: str
+    instrumentation: bool
+
+    def __post_init__(self):
+        for field in fields(self):
+            value = getattr(self, field.name)
+
+            # The YAML lists are stored as tuples
+            if isinstance(value, list):
+                value = tuple(value)
+                object.__setattr__(self, field.name, value)
+
+            types = typing.get_args(field.type) or (field.type,)
+            if float in types:
+                types += (int,)
+
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise ValueError(f"Invalid setting {field.name}: {value!r}")
+
+        if not 0 <= self.verbose_level <= 3:
+            raise ValueError(f"Invalid setting verbose_level: {self.verbose_level}, expected 0 to 3")
+
+        if self.inserter_capacity_bonus < 0:
+            raise ValueError(f"Invalid setting inserter_capacity_bonus: {self.inserter_capacity_bonus}")
+
+        if self.flow_solver not in flow_solvers:
+            raise ValueError(f"Invalid setting flow_solver: {self.flow_solver!r}, "
+                             f"expected one of {', '.join(flow_solvers)}")
+
+        if self.async_executor not in async_executors:
+            raise ValueError(f"Invalid setting async_executor: {self.async_executor!r}, "
+                             f"expected one of {', '.join(async_executors)}")
+
+
+def get_settings():
+    # Settings of the current context, the loaded config settings
+    # if they are not overridden
+    settings = context_settings.get()
+    if settings is None:
+        return config.settings
+
+    return settings
+
+
+def get_overrides():
+    # Settings overridden in the current context
+    # Format: {"inserter_capacity_bonus": 2}
+    settings = context_settings.get()
+    if settings is None:
+        return {}
+
+    return {field.name: getattr(settings, field.name) for field in fields(settings)
+            if getattr(settings, field.name) != getattr(config.settings, field.name)}
+
+
+@contextmanager
+def use_settings(**overrides):
+    # Override settings of the current context, the threads and
+    # asyncio tasks started outside of it use their own settings
+    # Usage:
+    #   with use_settings(flow_solver="maxflow") as settings:
+    for name in overrides:
+        if name in process_settings:
+            raise ValueError(f"The setting {name} can't be overridden, it is set in the config")
+
+    settings = replace(get_settings(), **overrides)
+    token = context_settings.set(settings)
+    try:
+        yield settings
+    finally:
+        context_settings.reset(token)
+
 
 class Config:
     config = None
+    config_path = None
+    settings = None
 
     def __init__(self, config_path=None):
+        self.config_path = config_path
         self.config = self.load_config(config_path)
+        self.settings = self.resolve_settings()
 
     def load_config(self, config_path):
         # Check if the default config file exists
@@ -28,7 +180,7 @@ class Config:
                 f"The default config file '{default_config_path}' does not exist")
 
         with open(default_config_path, "r") as ymlfile:
-            default_config = yaml.load(ymlfile)
+            default_config = yaml.safe_load(ymlfile)
 
         if config_path is None:
             return default_config
@@ -39,7 +191,7 @@ class Config:
                 f"The config file '{config_path}' does not exist")
 
         with open(config_path, "r") as ymlfile:
-            cfg = yaml.load(ymlfile)
+            cfg = yaml.safe_load(ymlfile)
 
         # Merge the default config with the user config
         for key in cfg:
@@ -56,34 +208,142 @@ class Config:
         for arg in args:
             if arg not in conf:
                 raise KeyError(
-                    f"Couldn't find the config key: {args.join('.')}")
+                    f"Couldn't find the config key: {'.'.join(args)}")
 
             conf = conf[arg]
 
         return conf
 
+    def set_config_value(self, value, *args):
+        conf = self.config
+
+        for arg in args[:-1]:
+            if arg not in conf:
+                raise KeyError(
+                    f"Couldn't find the config key: {'.'.join(args)}")
+
+            conf = conf[arg]
+
+        # The previous value is kept if the settings are not valid
+        previous_conf = conf.copy()
+        conf[args[-1]] = value
+        try:
+            self.settings = self.resolve_settings()
+        except ValueError:
+            conf.clear()
+            conf.update(previous_conf)
+            raise
+
+    def resolve_settings(self):
+        # Frozen Settings of the config values
+        # The configs written before some options have no value
+        factorio = self.get_config_value("factorio")
+        network = self.get_config_value("network")
+
+        return Settings(
+            inserter_capacity_bonus=factorio["inserter_capacity_bonus"],
+            difficulty=factorio.get("difficulty"),
+            data_file_path=factorio["data_file_path"],
+            verbose_level=self.get_config_value("verbose_level"),
+            display_network=network["display"],
+            network_export=network.get("export"),
+            network_icons_dir=network.get("icons_dir"),
+            map_viewport=self.get_config_value("map", "viewport"),
+            map_max_size=self.get_config_value("map", "max_size"),
+            cache_path=self.get_config_value("cache", "path"),
+            cache_max_size=int(self.get_config_value("cache", "max_size") * 1024 * 1024),
+            server_timeout=self.get_config_value("server", "timeout"),
+            server_max_pending=self.get_config_value("server", "max_pending"),
+            async_executor=self.get_config_value("async", "executor"),
+            async_jobs=self.get_config_value("async", "jobs"),
+            async_max_in_flight=self.get_config_value("async", "max_in_flight"),
+            flow_solver=self.get_config_value("bottleneck", "solver"),
+            instrumentation=self.get_config_value("instrumentation"),
+        )
+
+    # The properties give the loaded config settings,
+    # see get_settings for the settings of the current context
     # Factorio
     @property
     def inserter_capacity_bonus(self):
-        return self.get_config_value("factorio", "inserter_capacity_bonus")
+        return self.settings.inserter_capacity_bonus
 
     @property
     def difficulty(self):
-        return self.get_config_value("factorio", "difficulty")
+        return self.settings.difficulty
 
     @property
     def data_file_path(self):
-        return self.get_config_value("factorio", "data_file_path")
+        return self.settings.data_file_path
 
     # Verbose level
     @property
     def verbose_level(self):
-        return self.get_config_value("verbose_level")
+        return self.settings.verbose_level
 
     # Network
     @property
     def display_network(self):
-        return self.get_config_value("network", "display")
+        return self.settings.display_network
+
+    @property
+    def network_export(self):
+        return self.settings.network_export
+
+    @property
+    def network_icons_dir(self):
+        return self.settings.network_icons_dir
+
+    # Map
+    @property
+    def map_viewport(self):
+        return self.settings.map_viewport
+
+    @property
+    def map_max_size(self):
+        return self.settings.map_max_size
+
+    # Cache
+    @property
+    def cache_path(self):
+        return self.settings.cache_path
+
+    @property
+    def cache_max_size(self):
+        # In bytes
+        return self.settings.cache_max_size
+
+    # Server
+    @property
+    def server_timeout(self):
+        return self.settings.server_timeout
+
+    @property
+    def server_max_pending(self):
+        return self.settings.server_max_pending
+
+    # Async
+    @property
+    def async_executor(self):
+        return self.settings.async_executor
+
+    @property
+    def async_jobs(self):
+        return self.settings.async_jobs
+
+    @property
+    def async_max_in_flight(self):
+        return self.settings.async_max_in_flight
+
+    # Bottleneck
+    @property
+    def flow_solver(self):
+        return self.settings.flow_solver
+
+    # Instrumentation
+    @property
+    def instrumentation(self):
+        return self.settings.instrumentation
 
 
 def load_config(config_path=None):
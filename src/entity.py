@@ -10,7 +10,7 @@ from src import factorio, recipe, utils, config
 # -----------------------------------------------------------
 
 
-def create_entity(entity_in_blueprint, virtual=False):
+def create_entity(entity_in_blueprint, virtual=False, prototypes=None):
     # entity_in_blueprint examples:
     # {
     #     'entity_number': 18,
@@ -28,53 +28,140 @@ def create_entity(entity_in_blueprint, virtual=False):
     #     "recipe": "iron-gear-wheel"
     # },
 
-    # Check that the entity exists in the Factorio data
-    if entity_in_blueprint["name"] not in factorio.entities:
-        utils.warning(f"Entity {entity_in_blueprint['name']} not found in Factorio data")
-        # sys.exit(1)
-        return None
-
-    entity_data = factorio.entities[entity_in_blueprint["name"]]
-
     # Virtual entities are entities that are not in the original blueprint
     # We have created them to solve certain edge cases such as the inserter
     # that needs to pickup the item from an empty tile
-    entity_data["virtual"] = virtual
+
+    if prototypes is None:
+        prototypes = get_prototypes()
+
+    prototype = prototypes.get(entity_in_blueprint["name"])
+
+    if prototype is None:
+        return None
 
     # Return the corresponding Entity object
+    return prototype.entity_class(entity_in_blueprint, prototype, virtual)
+
+
+# -----------------------------------------------------------
+# Entities prototypes
+# The values shared by all the entities with the same name
+# (class, speed, offsets, crafting rates, ...) are computed once
+# for a Factorio data file and a config
+# -----------------------------------------------------------
+
+# Format: {
+#    (data hash, inserter capacity bonus): PrototypeTable
+# }
+prototype_tables = {}
+
+
+def get_prototypes():
+    # Returns the prototype table of the loaded data and settings
+    key = (factorio.data_hash, config.get_settings().inserter_capacity_bonus)
+
+    if key not in prototype_tables:
+        prototype_tables[key] = PrototypeTable(key[1])
+
+    return prototype_tables[key]
+
+
+def get_entity_class(entity_data):
+    # Returns the Entity class corresponding to the Factorio entity
     if entity_data["type"] == "transport-belt":
-        return TransportBelt(entity_in_blueprint, entity_data)
+        return TransportBelt
 
     elif entity_data["type"] == "assembling-machine":
-        return AssemblingMachine(entity_in_blueprint, entity_data)
+        return AssemblingMachine
 
     elif entity_data["type"] == "inserter":
         if entity_data["name"] == "long-handed-inserter":
-            return RedArm(entity_in_blueprint, entity_data)
+            return RedArm
         elif entity_data["name"] == "stack-inserter":
-            return StackInserter(entity_in_blueprint, entity_data)
+            return StackInserter
         else:
-            return Inserter(entity_in_blueprint, entity_data)
+            return Inserter
 
     elif entity_data["type"] in ["container", "logistic-container"]:
-        return Container(entity_in_blueprint, entity_data)
+        return Container
 
     elif entity_data["type"] == "underground-belt":
-        return UndergroundBelt(entity_in_blueprint, entity_data)
+        return UndergroundBelt
 
     elif entity_data["type"] == "splitter":
-        return Splitter(entity_in_blueprint, entity_data)
+        return Splitter
+
+    return None
+
+
+class PrototypeTable:
+    def __init__(self, inserter_capacity_bonus):
+        self.inserter_capacity_bonus = inserter_capacity_bonus
+
+        # Format: {
+        #    entity_name: Prototype or None if the entity is not supported
+        # }
+        # The prototypes are created the first time an entity is used
+        self.prototypes = {}
+
+    def get(self, name):
+        if name not in self.prototypes:
+            self.prototypes[name] = self.create_prototype(name)
+
+        prototype = self.prototypes[name]
+
+        if prototype is None:
+            # Check that the entity exists in the Factorio data
+            if name not in factorio.entities:
+                utils.warning(f"Entity {name} not found in Factorio data")
+            else:
+                utils.warning(
+                    f"entity {name} of type {factorio.entities[name]['type']} not supported")
+
+        return prototype
+
+    def create_prototype(self, name):
+        if name not in factorio.entities:
+            return None
+
+        entity_data = factorio.entities[name]
+        entity_class = get_entity_class(entity_data)
+
+        if entity_class is None:
+            return None
+
+        return Prototype(entity_class, entity_data, self)
+
 
-    utils.warning(f"entity {entity_in_blueprint['name']} of type {entity_data['type']} not supported")
+class Prototype:
+    def __init__(self, entity_class, entity_data, table):
+        self.entity_class = entity_class
+        self.data = entity_data
+        self.name = entity_data["name"]
+        self.type = entity_data["type"]
+        self.table = table
+
+        self.speed = None
+        self.offsets = []
+
+        entity_class.init_prototype(self)
 
 
 # Enities interfaces
+# The entities are slotted objects, a blueprint can contain
+# a large number of them
 class Entity:
-    def __init__(self, entity_in_blueprint, entity_data):
-        self.data = entity_data
+    __slots__ = ("prototype", "number", "name", "virtual",
+                 "original_position", "position", "direction", "speed")
+
+    large = False
+
+    def __init__(self, entity_in_blueprint, prototype, virtual=False):
+        self.prototype = prototype
         self.number = entity_in_blueprint["entity_number"]
         self.name = entity_in_blueprint["name"]
-        self.large = False
+        self.virtual = virtual
 
         # Correc position
         self.original_position = entity_in_blueprint["position"]
@@ -89,7 +176,17 @@ class Entity:
         else:
             self.direction = None
 
-        self.speed = None
+        self.speed = prototype.speed
+
+    @classmethod
+    def init_prototype(cls, prototype):
+        # Compute the values shared by all the entities of the prototype
+        pass
+
+    @property
+    def data(self):
+        # The Factorio data of the entity
+        return self.prototype.data
 
     def __str__(self):
         speed = ""
@@ -114,10 +211,13 @@ class Entity:
 
 class LargeEntity(Entity):
     # Assembling machines, splitters, furnace, etc.
-    def __init__(self, entity_in_blueprint, entity_data):
-        super().__init__(entity_in_blueprint, entity_data)
-        self.large = True
-        self.offsets = []
+    __slots__ = ("offsets",)
+
+    large = True
+
+    def __init__(self, entity_in_blueprint, prototype, virtual=False):
+        super().__init__(entity_in_blueprint, prototype, virtual)
+        self.offsets = prototype.offsets
 
     def to_char(self, coords=[0, 0]):
         return '?'
@@ -130,15 +230,16 @@ class LargeEntity(Entity):
 
 # Factorio entities:
 class TransportBelt(Entity):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
 
+    @classmethod
+    def init_prototype(cls, prototype):
         # Saving speed of the belt
-        if "speed" not in entity_data:
-            utils.warning(f"{self.name} has no speed")
-            self.tile_per_sec = 0.03125  # the tile_per_sec of the lvl1 transport belt
+        if "speed" not in prototype.data:
+            utils.warning(f"{prototype.name} has no speed")
+            tile_per_sec = 0.03125  # the tile_per_sec of the lvl1 transport belt
         else:
-            self.tile_per_sec = entity_data["speed"]
+            tile_per_sec = prototype.data["speed"]
 
         # Calculation of the belt item per second
         # 60 ticks / second
@@ -147,7 +248,7 @@ class TransportBelt(Entity):
         # this will result, for the first belt, with an output of 15 item per second
         # This can be veryfied here: https://wiki.factorio.com/Belt_transport_system
 
-        self.speed = self.tile_per_sec * 60 * 4 * 2
+        prototype.speed = tile_per_sec * 60 * 4 * 2
 
     def to_char(self):
         color = "white"
@@ -219,25 +320,27 @@ class TransportBelt(Entity):
 
 
 class Inserter (Entity):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
 
+    @classmethod
+    def init_prototype(cls, prototype):
         # Saving speed of the inserter
-        if "rotation_speed" not in entity_data:
-            utils.warning(f"{self.name} has no rotation speed")
-            self.rotation_speed = 0.014  # the rotation_speed of the lvl1 inserter
+        if "rotation_speed" not in prototype.data:
+            utils.warning(f"{prototype.name} has no rotation speed")
+            prototype.rotation_speed = 0.014  # the rotation_speed of the lvl1 inserter
         else:
-            self.rotation_speed = entity_data["rotation_speed"]
+            prototype.rotation_speed = prototype.data["rotation_speed"]
 
         # The rotation speed is the turn per tick
         # There is 60 ticks per second
-        self.speed = self.rotation_speed * 60  # turn or items per second
+        prototype.speed = prototype.rotation_speed * 60  # turn or items per second
 
         # Inserter capacity bonnus https://wiki.factorio.com/Inserter_capacity_bonus_(research)
-        if config.config.inserter_capacity_bonus >= 7:
-            self.speed *= 3
-        elif config.config.inserter_capacity_bonus >= 2:
-            self.speed *= 2
+        inserter_capacity_bonus = prototype.table.inserter_capacity_bonus
+        if inserter_capacity_bonus >= 7:
+            prototype.speed *= 3
+        elif inserter_capacity_bonus >= 2:
+            prototype.speed *= 2
 
     def get_drop_tile_offset(self):
         # Returns an offset of the tile where items are dropped
@@ -320,28 +423,31 @@ class Inserter (Entity):
 
 
 class StackInserter  (Inserter):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
+
+    @classmethod
+    def init_prototype(cls, prototype):
+        super().init_prototype(prototype)
 
         # Rewriting the speed
-        self.speed = self.rotation_speed * 60  # turn or items per second
+        prototype.speed = prototype.rotation_speed * 60  # turn or items per second
 
         # Inserter capacity bonnus https://wiki.factorio.com/Inserter_capacity_bonus_(research)
-        capacity_multiplier = 2 + config.config.inserter_capacity_bonus
+        inserter_capacity_bonus = prototype.table.inserter_capacity_bonus
+        capacity_multiplier = 2 + inserter_capacity_bonus
 
-        if config.config.inserter_capacity_bonus >= 5:
+        if inserter_capacity_bonus >= 5:
             capacity_multiplier += 1
-        if config.config.inserter_capacity_bonus >= 6:
+        if inserter_capacity_bonus >= 6:
             capacity_multiplier += 1
-        if config.config.inserter_capacity_bonus >= 7:
+        if inserter_capacity_bonus >= 7:
             capacity_multiplier += 1
 
-        self.speed *= capacity_multiplier
+        prototype.speed *= capacity_multiplier
 
 
 class RedArm (Inserter):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
 
     def get_drop_tile_offset(self):
         return [e * 2 for e in super().get_drop_tile_offset()]
@@ -352,10 +458,28 @@ class RedArm (Inserter):
 
 
 class AssemblingMachine (LargeEntity):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ("recipe", "items_per_second", "required_items_per_second")
+
+    def __init__(self, dictionary_entity, prototype, virtual=False):
+        super().__init__(dictionary_entity, prototype, virtual)
 
-        self.offsets = [
+        # The speed is only set if there is a recipe
+        self.speed = None
+
+        self.recipe = None
+        if "recipe" in dictionary_entity:
+            crafting_rates = self.get_crafting_rates(
+                prototype, dictionary_entity["recipe"])
+
+            if crafting_rates is not None:
+                (self.recipe,
+                 self.items_per_second,
+                 self.required_items_per_second) = crafting_rates
+                self.speed = prototype.speed
+
+    @classmethod
+    def init_prototype(cls, prototype):
+        prototype.offsets = [
             [0, 0],
             [0, 1],
             [0, -1],
@@ -367,28 +491,49 @@ class AssemblingMachine (LargeEntity):
             [-1, -1],
         ]
 
-        self.recipe = None
-        if "recipe" in dictionary_entity:
-            self.recipe = recipe.get_recipe(dictionary_entity["recipe"])
+        # Saving speed of the assembling machine
+        if "crafting_speed" not in prototype.data:
+            utils.warning(f"{prototype.name} has no crafting speed")
+            prototype.speed = 0.5  # the speed of the assembling-machine-1
+        else:
+            prototype.speed = prototype.data["crafting_speed"]
 
-        if self.recipe is not None:
-            # Saving speed of the assembling machine
-            if "crafting_speed" not in entity_data:
-                utils.warning(f"{self.name} has no crafting speed", level=1)
-                self.speed = 0.5  # the speed of the assembling-machine-1
-            else:
-                self.speed = entity_data["crafting_speed"]
+        # Format: {
+        #    recipe_name: (recipe, items_per_second, required_items_per_second)
+        #    or None if the recipe doesn't exist
+        # }
+        prototype.crafting_rates = {}
+
+    @classmethod
+    def get_crafting_rates(cls, prototype, recipe_name):
+        # Returns the recipe and the machine production and consumption rates
+        if recipe_name in prototype.crafting_rates:
+            if prototype.crafting_rates[recipe_name] is None:
+                utils.warning(f"No recipe found for {recipe_name}")
+
+            return prototype.crafting_rates[recipe_name]
+
+        machine_recipe = recipe.get_recipe(recipe_name)
+        crafting_rates = None
 
-            time_per_item = self.recipe.time / self.speed
-            self.items_per_second = self.recipe.result.amount / time_per_item
+        if machine_recipe is not None:
+            time_per_item = machine_recipe.time / prototype.speed
+            items_per_second = machine_recipe.result.amount / time_per_item
 
             # Define the required items per second
             # to have the assembling machine working at 100%
-            self.required_items_per_second = {}
-            for item in self.recipe.ingredients:
-                self.required_items_per_second[item.name] = item.amount / \
+            required_items_per_second = {}
+            for item in machine_recipe.ingredients:
+                required_items_per_second[item.name] = item.amount / \
                     time_per_item
 
+            crafting_rates = (machine_recipe,
+                              items_per_second,
+                              required_items_per_second)
+
+        prototype.crafting_rates[recipe_name] = crafting_rates
+        return crafting_rates
+
     def get_usage_ratio(self, ingredients_amount):
         # Calculate the number of items produced per second
         # according to an ingredients amount dictionary
@@ -455,8 +600,7 @@ class AssemblingMachine (LargeEntity):
 
 
 class Container (Entity):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
 
     def to_char(self):
         if self.name == "logistic-chest-passive-provider":
@@ -489,25 +633,30 @@ class Container (Entity):
 
 
 class UndergroundBelt (TransportBelt):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ("belt_type", "max_distance")
+
+    def __init__(self, dictionary_entity, prototype, virtual=False):
+        super().__init__(dictionary_entity, prototype, virtual)
 
         self.belt_type = dictionary_entity["type"]  # "input" or "output"
+        self.max_distance = prototype.max_distance
 
+    @classmethod
+    def init_prototype(cls, prototype):
         # Saving belt distance
-        if "max_distance" not in entity_data:
-            self.max_distance = 5  # the distance of the lvl1 underground-belt
+        if "max_distance" not in prototype.data:
+            prototype.max_distance = 5  # the distance of the lvl1 underground-belt
         else:
-            self.max_distance = entity_data["max_distance"]
+            prototype.max_distance = prototype.data["max_distance"]
 
         # Saving speed
-        if "speed" not in entity_data:
-            utils.warning(f"{self.name} has no speed")
-            self.speed = 0.03125  # the speed of the lvl1 underground-belt
+        if "speed" not in prototype.data:
+            utils.warning(f"{prototype.name} has no speed")
+            speed = 0.03125  # the speed of the lvl1 underground-belt
         else:
-            self.speed = entity_data["speed"]
+            speed = prototype.data["speed"]
 
-        self.speed = self.speed * 60 * 4 * 2
+        prototype.speed = speed * 60 * 4 * 2
 
     def get_possible_output_coords(self):
         start_coord = self.position
@@ -558,19 +707,23 @@ class UndergroundBelt (TransportBelt):
 
 
 class Splitter (LargeEntity):
-    def __init__(self, dictionary_entity, entity_data):
-        super().__init__(dictionary_entity, entity_data)
+    __slots__ = ()
+
+    def __init__(self, dictionary_entity, prototype, virtual=False):
+        super().__init__(dictionary_entity, prototype, virtual)
         self.offsets = [[0, 0], self.get_second_belt_offset()]
         # TODO: Filters
 
+    @classmethod
+    def init_prototype(cls, prototype):
         # Saving speed
-        if "speed" not in entity_data:
-            utils.warning(f"{self.name} has no speed")
-            self.speed = 0.03125  # the speed of the lvl1 splitter
+        if "speed" not in prototype.data:
+            utils.warning(f"{prototype.name} has no speed")
+            speed = 0.03125  # the speed of the lvl1 splitter
         else:
-            self.speed = entity_data["speed"]
+            speed = prototype.data["speed"]
 
-        self.speed = self.speed * 60 * 4 * 2
+        prototype.speed = speed * 60 * 4 * 2
 
     def get_second_belt_offset(self):
 
@@ -1,11 +1,20 @@
-
+import os
 import json
+import pickle
+import hashlib
+from collections.abc import Mapping
 
 from src import utils, config
 
 # -----------------------------------------------------------
 # Provide for the other files Factorio data
 # from the src/assets/factorio_raw/factorio_raw_min.json file
+#
+# The JSON file is compiled once in a binary snapshot saved
+# next to it (<data file>.cache), the snapshot is rebuilt when
+# the JSON file content changes.
+# Each recipe, item and entity is only unpickled the first
+# time it is used
 # -----------------------------------------------------------
 
 recipies_key = "recipe"
@@ -27,37 +36,139 @@ entities_categories_keys = [
 ]
 entities = {}
 
+cache_extension = ".cache"
+cache_version = 1
+
+# Hash of the loaded data file content
+data_hash = None
+
+
+class LazyData(Mapping):
+    # Read only dictionary of the Factorio data
+    # The entries are stored pickled and loaded on their first access
+
+    def __init__(self, pickled_entries):
+        self.pickled_entries = pickled_entries
+        self.entries = {}
+
+    def __getitem__(self, name):
+        if name not in self.entries:
+            self.entries[name] = pickle.loads(self.pickled_entries[name])
+
+        return self.entries[name]
+
+    def __contains__(self, name):
+        return name in self.pickled_entries
+
+    def __iter__(self):
+        return iter(self.pickled_entries)
+
+    def __len__(self):
+        return len(self.pickled_entries)
+
 
 def load_data():
-    global recipies, entities, items
+    global recipies, entities, items, data_hash
     factorio_raw_data_file_path = config.config.data_file_path
 
-    # TODO:. check that the file exists
-    with open(factorio_raw_data_file_path, "r") as f:
-        data = json.load(f)
+    if not os.path.exists(factorio_raw_data_file_path):
+        raise FileNotFoundError(
+            f"The Factorio data file '{factorio_raw_data_file_path}' does not exist")
+
+    with open(factorio_raw_data_file_path, "rb") as f:
+        raw_data = f.read()
+
+    data_hash = hashlib.sha256(raw_data).hexdigest()
+    cache_path = factorio_raw_data_file_path + cache_extension
+
+    snapshot = read_snapshot(cache_path, data_hash)
+
+    if snapshot is None:
+        # No valid snapshot, we compile the JSON data
+        snapshot = compile_data(json.loads(raw_data), data_hash)
+        write_snapshot(cache_path, snapshot)
+
+    recipies = LazyData(snapshot["recipies"])
+    items = LazyData(snapshot["items"])
+    entities = LazyData(snapshot["entities"])
+
+    utils.success(f"Factorio data successfully loaded")
+
+
+def compile_data(data, data_hash):
+    # Create the snapshot of the Factorio JSON data
+    # Snapshot format:
+    # {
+    #     "version": 1,
+    #     "hash": "ab12...",  # sha256 of the JSON file
+    #     "recipies": {"iron-gear-wheel": b"...", ...},
+    #     "items": {"iron-plate": b"...", ...},
+    #     "entities": {"transport-belt": b"...", ...}
+    # }
+
+    def pickle_entries(entries):
+        return {name: pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+                for (name, entry) in entries.items()}
+
+    # Load the recipies
+    if recipies_key not in data:
+        utils.warning(f"Recipe key {recipies_key} not found in Factorio data")
+
+    # Load the items
+    if items_key not in data:
+        utils.warning(f"Item key {items_key} not found in Factorio data")
+
+    # Load the entities
+    data_entities = {}
+    for key in entities_categories_keys:
+        if key not in data:
+            utils.warning(
+                f"Entity {key} category not found if Factorio data")
+        else:
+            data_entities.update(data[key])
+
+    return {
+        "version": cache_version,
+        "hash": data_hash,
+        "recipies": pickle_entries(data.get(recipies_key, {})),
+        "items": pickle_entries(data.get(items_key, {})),
+        "entities": pickle_entries(data_entities)
+    }
+
+
+def read_snapshot(cache_path, data_hash):
+    # Returns the snapshot if it exists and corresponds to the data
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        with open(cache_path, "rb") as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        utils.warning(f"Invalid Factorio data cache {cache_path}, rebuilding it")
+        return None
+
+    if snapshot.get("version") != cache_version or snapshot.get("hash") != data_hash:
+        return None
 
-        # Load the recipies
-        if recipies_key not in data:
-            utils.warning(f"Recipe key {recipies_key} not found in Factorio data")
+    return snapshot
 
-        recipies = data[recipies_key]
 
-        # Load the items
-        if items_key not in data:
-            utils.warning(f"Item key {items_key} not found in Factorio data")
+def write_snapshot(cache_path, snapshot):
+    # The snapshot is written in a temporary file first so that
+    # processes loading the data at the same time never read
+    # a partially written file
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
 
-        items = data[items_key]
+    try:
+        with open(temporary_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
 
-        # Load the entities
-        for key in entities_categories_keys:
-            if key not in data:
-                utils.warning(
-                    f"Entity {key} category not found if Factorio data")
-            else:
-                for entity in data[key]:
-                    entities[entity] = data[key][entity]
+        os.replace(temporary_path, cache_path)
 
-        utils.success(f"Factorio data successfully loaded")
+    except OSError as e:
+        # Not a problem, the data will be compiled again next time
+        utils.warning(f"Couldn't write the Factorio data cache {cache_path}: {e}")
 
 
 def entity_exist(entity):
@@ -0,0 +1,396 @@
+from src import factorio, recipe, utils
+
+# -----------------------------------------------------------
+# Generation of synthetic blueprints of any size to measure
+# the analysis scaling
+# Each shape function returns a blueprint dictionary with
+# about the requested number of entities, the entities and
+# recipes names are checked in the Factorio data
+# -----------------------------------------------------------
+
+# Blueprint directions, the north direction is not written
+NORTH = None
+EAST = 2
+SOUTH = 4
+WEST = 6
+
+# Version of the blueprints exported by Factorio 1.1
+blueprint_version = 281479275544576
+
+# Recipes of the assembling machines cells by number of ingredients
+default_recipes = {
+    1: "iron-gear-wheel",
+    2: "electronic-circuit",
+    3: "inserter",
+}
+
+
+class BlueprintBuilder:
+    # Create the entities list of a blueprint
+    # The coordinates are the tiles coordinates, for the 3x3
+    # entities the coordinates of the center tile
+    def __init__(self, label):
+        self.label = label
+        self.entities = []
+
+    def add(self, name, x, y, direction=NORTH, entity_type=None, **fields):
+        # Add an entity, returns its entity number
+        check_entity(name, entity_type)
+
+        entity = {
+            "entity_number": len(self.entities) + 1,
+            "name": name,
+            "position": {"x": x + 0.5, "y": y + 0.5},
+        }
+
+        if direction is not None:
+            entity["direction"] = direction
+
+        entity.update(fields)
+        self.entities.append(entity)
+
+        return entity["entity_number"]
+
+    def add_splitter(self, name, x, y, direction=EAST):
+        # Add a splitter covering the tile (x, y) and
+        # the tile on its left (or above for the vertical splitters)
+        check_entity(name, "splitter")
+
+        position = {"x": x + 0.5, "y": y + 0.5}
+        if direction in [EAST, WEST]:
+            position["y"] = y
+        else:
+            position["x"] = x
+
+        entity = {
+            "entity_number": len(self.entities) + 1,
+            "name": name,
+            "position": position,
+            "direction": direction,
+        }
+        self.entities.append(entity)
+
+        return entity["entity_number"]
+
+    def add_belt_line(self, name, x, y, length, direction=EAST):
+        # Add a straight belt line starting at (x, y)
+        (step_x, step_y) = get_direction_offset(direction)
+
+        for i in range(length):
+            self.add(name, x + i * step_x, y + i * step_y,
+                     direction, "transport-belt")
+
+    def get_blueprint(self):
+        return {
+            "blueprint": {
+                "icons": [{"signal": {"type": "item", "name": "transport-belt"}, "index": 1}],
+                "entities": self.entities,
+                "item": "blueprint",
+                "label": self.label,
+                "version": blueprint_version,
+            }
+        }
+
+
+def get_direction_offset(direction):
+    if direction == EAST:
+        return (1, 0)
+    elif direction == SOUTH:
+        return (0, 1)
+    elif direction == WEST:
+        return (-1, 0)
+    else:
+        return (0, -1)
+
+
+def check_entity(name, entity_type=None):
+    # Check that the entity exists in the Factorio data
+    if name not in factorio.entities:
+        raise ValueError(f"Unknown entity {name}")
+
+    if entity_type is not None and factorio.entities[name]["type"] != entity_type:
+        raise ValueError(f"{name} is not a {entity_type}")
+
+
+def get_solid_ingredients(recipe_name):
+    return recipe.Recipe(recipe_name).ingredients
+
+
+def find_recipes(nb_ingredients, machine="assembling-machine-2"):
+    # Returns the names of the recipes with the given number of solid
+    # ingredients and no fluid, that the machine can craft
+    crafting_categories = factorio.entities[machine].get(
+        "crafting_categories", ["crafting"])
+
+    recipes = []
+    for recipe_name in sorted(factorio.recipies):
+        factorio_recipe = factorio.recipies[recipe_name]
+
+        if factorio_recipe.get("category", "crafting") not in crafting_categories:
+            continue
+
+        # Some recipes have normal and expensive versions
+        recipe_data = factorio_recipe.get(recipe.DIFFICULTY, factorio_recipe)
+        if "ingredients" not in recipe_data:
+            continue
+
+        # The fluid ingredients are not supported
+        if any(isinstance(ingredient, dict) and ingredient.get("type") == "fluid"
+               for ingredient in recipe_data["ingredients"]):
+            continue
+
+        # The recipes with several results are not supported
+        if "result" not in recipe_data:
+            continue
+
+        if len(recipe_data["ingredients"]) == nb_ingredients:
+            recipes.append(recipe_name)
+
+    return recipes
+
+
+# ==== Shapes ====
+
+def belt_snake(nb_entities, row_length=100, belt="transport-belt"):
+    # One belt line going back and forth in rows of row_length belts
+    builder = BlueprintBuilder(f"Belt snake {nb_entities}")
+
+    for i in range(nb_entities):
+        row = i // row_length
+        column = i % row_length
+
+        # The last belt of each row goes down to the next row
+        if column == row_length - 1:
+            direction = SOUTH
+        else:
+            direction = EAST if row % 2 == 0 else WEST
+
+        x = column if row % 2 == 0 else row_length - 1 - column
+        builder.add(belt, x, row, direction, "transport-belt")
+
+    return builder.get_blueprint()
+
+
+def underground_chain(nb_entities, underground="underground-belt",
+                      belt="transport-belt", distance=None):
+    # A line of underground belts, with a belt between each pair
+    # The pairs are separated by the maximum underground distance by default
+    check_entity(underground, "underground-belt")
+
+    if distance is None:
+        distance = factorio.entities[underground].get("max_distance", 5)
+
+    builder = BlueprintBuilder(f"Underground chain {nb_entities}")
+
+    x = 0
+    while len(builder.entities) < nb_entities:
+        builder.add(belt, x, 0, EAST, "transport-belt")
+        builder.add(underground, x + 1, 0, EAST, "underground-belt", type="input")
+        builder.add(underground, x + 1 + distance, 0, EAST, "underground-belt", type="output")
+        x += distance + 2
+
+    return builder.get_blueprint()
+
+
+def inserter_chest_chains(nb_entities, chain_length=100,
+                          inserter="inserter", chest="wooden-chest"):
+    # Rows of chests linked by inserters moving the items to the east
+    builder = BlueprintBuilder(f"Inserter chest chains {nb_entities}")
+
+    i = 0
+    while len(builder.entities) < nb_entities:
+        row = i // chain_length
+        column = i % chain_length
+
+        if column % 2 == 0:
+            builder.add(chest, column, 2 * row, NORTH, "container")
+        else:
+            # The inserters face their pickup tile
+            builder.add(inserter, column, 2 * row, WEST, "inserter")
+        i += 1
+
+    return builder.get_blueprint()
+
+
+def splitter_tree(nb_entities, nb_outputs=8,
+                  splitter="splitter", belt="transport-belt"):
+    # A belt split in nb_outputs belts by a tree of splitters
+    # The output belts are extended to reach the number of entities
+    depth = nb_outputs.bit_length() - 1
+    if nb_outputs < 2 or 2 ** depth != nb_outputs:
+        raise ValueError("The number of outputs must be a power of 2")
+
+    builder = BlueprintBuilder(f"Splitter tree {nb_outputs} {nb_entities}")
+
+    # Input belt
+    builder.add_belt_line(belt, 0, nb_outputs // 2, 2)
+
+    # Each lane of the level k of the tree sends its items to the
+    # output belts [first, first + size[, its splitter is placed
+    # on the rows first + size / 2 - 1 and first + size / 2
+    lanes = [0]
+    size = nb_outputs
+    x = 2
+
+    for _ in range(depth):
+        next_lanes = []
+        for first in lanes:
+            y = first + size // 2
+            builder.add_splitter(splitter, x, y, EAST)
+
+            # The two outputs move to the rows of the next level lanes
+            for (output_y, child_first) in [(y - 1, first), (y, first + size // 2)]:
+                child_y = child_first + size // 4 if size >= 4 else child_first
+
+                if child_y == output_y:
+                    builder.add(belt, x + 1, output_y, EAST, "transport-belt")
+                else:
+                    direction = NORTH if child_y < output_y else SOUTH
+                    builder.add_belt_line(belt, x + 1, output_y,
+                                          abs(child_y - output_y), direction)
+                    builder.add(belt, x + 1, child_y, EAST, "transport-belt")
+
+                builder.add(belt, x + 2, child_y, EAST, "transport-belt")
+                next_lanes.append(child_first)
+
+        lanes = next_lanes
+        size //= 2
+        x += 3
+
+    # Output belts
+    output_length = max(1, (nb_entities - len(builder.entities)) // nb_outputs)
+    for y in range(nb_outputs):
+        builder.add_belt_line(belt, x, y, output_length)
+
+    return builder.get_blueprint()
+
+
+def splitter_chain(nb_entities, splitter="splitter", belt="transport-belt",
+                   machine="assembling-machine-3", recipe_name="iron-gear-wheel"):
+    # Two chests feeding a machine through a chain of splitters
+    # Each splitter is linked twice to the next one, so the number of
+    # paths from the chests to the machine doubles with each splitter
+    # The inserters taking the items from the chests cannot provide
+    # all the items needed by the machine
+    #   c i = = ╔  ╔       ┌ ─ ┐
+    #   c i = = ╚  ╚  = f  │ A │
+    #                      └ ─ ┘ f = = =
+    check_entity(machine, "assembling-machine")
+    nb_splitters = max(1, nb_entities - 14)
+
+    builder = BlueprintBuilder(f"Splitter chain {nb_entities}")
+
+    for y in (0, 1):
+        builder.add("wooden-chest", 0, y, NORTH, "container")
+        # The inserters face their pickup tile
+        builder.add("inserter", 1, y, WEST, "inserter")
+        builder.add_belt_line(belt, 2, y, 2)
+
+    for i in range(nb_splitters):
+        builder.add_splitter(splitter, 4 + i, 1, EAST)
+
+    x = 4 + nb_splitters
+    builder.add(belt, x, 1, EAST, "transport-belt")
+    builder.add("fast-inserter", x + 1, 1, WEST, "inserter")
+    builder.add(machine, x + 3, 1, NORTH, "assembling-machine", recipe=recipe_name)
+    builder.add("fast-inserter", x + 5, 2, WEST, "inserter")
+    builder.add_belt_line(belt, x + 6, 2, 3)
+
+    return builder.get_blueprint()
+
+
+def assembler_cells(nb_entities, recipe_name=None, nb_ingredients=1,
+                    nb_columns=50, machine="assembling-machine-2",
+                    inserter="inserter", long_inserter="long-handed-inserter",
+                    belt="transport-belt"):
+    # Rows of assembling machines between input and output belts
+    # With several ingredients, a second input belt is added, the
+    # machines take the items of the first belt with long handed inserters
+    # Cell of 3 columns:
+    #   = = =  input belt (only with several ingredients)
+    #   = = =  input belt
+    #   l i    inserters
+    #   ┌ ─ ┐
+    #   │ A │  assembling machine
+    #   └ ─ ┘
+    #     i    inserter
+    #   = = =  output belt
+    if recipe_name is None and nb_ingredients in default_recipes:
+        recipe_name = default_recipes[nb_ingredients]
+
+    if recipe_name is None:
+        recipes = find_recipes(nb_ingredients, machine)
+        if len(recipes) == 0:
+            raise ValueError(f"No recipe with {nb_ingredients} ingredients")
+        recipe_name = recipes[0]
+
+    if recipe_name not in factorio.recipies:
+        raise ValueError(f"Unknown recipe {recipe_name}")
+
+    nb_ingredients = len(get_solid_ingredients(recipe_name))
+    two_input_belts = nb_ingredients > 1
+
+    # Number of entities of a cell
+    cell_size = 6 + 3 + (4 if two_input_belts else 0)
+    nb_cells = max(1, nb_entities // cell_size)
+
+    nb_rows = -(-nb_cells // nb_columns)
+    row_heigth = 8 if two_input_belts else 7
+
+    builder = BlueprintBuilder(f"Assembler cells {recipe_name} {nb_entities}")
+
+    for row in range(nb_rows):
+        nb_row_cells = min(nb_columns, nb_cells - row * nb_columns)
+        y = row * row_heigth
+
+        if two_input_belts:
+            builder.add_belt_line(belt, 0, y, 3 * nb_row_cells)
+            y += 1
+
+        builder.add_belt_line(belt, 0, y, 3 * nb_row_cells)
+
+        for column in range(nb_row_cells):
+            x = 3 * column + 1
+
+            # The inserters face their pickup tile
+            if two_input_belts:
+                builder.add(long_inserter, x - 1, y + 1, NORTH, "inserter")
+            builder.add(inserter, x, y + 1, NORTH, "inserter")
+
+            builder.add(machine, x, y + 3, NORTH, "assembling-machine",
+                        recipe=recipe_name)
+
+            builder.add(inserter, x, y + 5, NORTH, "inserter")
+
+        builder.add_belt_line(belt, 0, y + 6, 3 * nb_row_cells)
+
+    return builder.get_blueprint()
+
+
+def multi_ingredient_cells(nb_entities, nb_ingredients=3, **options):
+    return assembler_cells(nb_entities, nb_ingredients=nb_ingredients, **options)
+
+
+shapes = {
+    "cells": assembler_cells,
+    "multi-ingredient": multi_ingredient_cells,
+    "splitter-tree": splitter_tree,
+    "splitter-chain": splitter_chain,
+    "snake": belt_snake,
+    "underground": underground_chain,
+    "inserter-chain": inserter_chest_chains,
+}
+
+
+def generate(shape, nb_entities, **options):
+    # Returns a blueprint dictionary of the given shape
+    if shape not in shapes:
+        raise ValueError(
+            f"Unknown shape {shape}, available shapes: {', '.join(shapes)}")
+
+    return shapes[shape](nb_entities, **options)
+
+
+def generate_string(shape, nb_entities, **options):
+    # Returns the blueprint as a string that can be imported in Factorio
+    return utils.encode(generate(shape, nb_entities, **options))
@@ -0,0 +1,219 @@
+import os
+import json
+
+# -----------------------------------------------------------
+# Export an analysed network as a graph file, without pyvis
+# and without network access
+# The nodes are placed at the position of their entity in the
+# blueprint, no layout is calculated: the file is written
+# node by node and large networks are exported in seconds
+#
+# Usage:
+#   export_network(nw, "factory.graph.json")
+#   export_network(nw, "factory.html", icons_dir="icons")
+#
+# JSON format:
+# {
+#     "format": "network-graph",
+#     "version": 1,
+#     "label": "beltFac1",
+#     "width": 12,
+#     "height": 8,
+#     "names": ["transport-belt", "iron-plate", ...],
+#     "icons": {"transport-belt": "icons/transport-belt.png"},
+#     "fields": ["entity", "name", "x", "y", "flow", "usage", "flags",
+#                "recipe", "items", "compacted"],
+#     "nodes": [
+#         [1, 0, 0.5, 3.5, 1.26, 0.87, 1, -1, [1], [2, 3]],
+#         ...
+#     ],
+#     "edges": [0, 1, 1, 2, ...]
+# }
+# The entity numbers of the virtual chests are strings like "12_virtual".
+# The names, recipe and items are indexes in "names", -1 if the
+# node has no recipe. The flags are a sum of the node_flags. The
+# edges are pairs of indexes in "nodes", from parent to child.
+# The icons are the "<name>.png" files of the icons directory,
+# with paths relative to the exported file
+# -----------------------------------------------------------
+
+graph_format = "network-graph"
+graph_version = 1
+
+fields = ["entity", "name", "x", "y", "flow", "usage", "flags", "recipe", "items", "compacted"]
+
+node_flags = {
+    "input": 1,
+    "output": 2,
+    "bottleneck": 4,
+    "virtual": 8,
+}
+
+formats = ["json", "html"]
+
+html_template_path = os.path.join(os.path.dirname(__file__), "assets", "graph.html")
+
+# Placeholder of the graph JSON in the HTML template
+html_graph_marker = "/*GRAPH*/"
+
+
+def get_format(path):
+    # Export format of a file path, from its extension
+    extension = os.path.splitext(path)[1].lower()
+    if extension in [".html", ".htm"]:
+        return "html"
+
+    return "json"
+
+
+def export_network(nw, path, graph_format=None, icons_dir=None):
+    # Write the graph of a calculated network in a file
+    # graph_format: "json" or "html", from the path extension if None
+    # icons_dir: directory of the "<name>.png" icons, no icon if None
+    if graph_format is None:
+        graph_format = get_format(path)
+
+    if graph_format not in formats:
+        raise ValueError(f"Unknown graph format: {graph_format}")
+
+    icons = {}
+    if icons_dir is not None:
+        icons = get_icons(nw, icons_dir, os.path.dirname(os.path.abspath(path)))
+
+    with open(path, "w", encoding="utf-8") as f:
+        if graph_format == "json":
+            write_json(nw, f, icons)
+        else:
+            write_html(nw, f, icons)
+
+
+def get_icons(nw, icons_dir, base_dir):
+    # Icons paths of the network names, relative to the exported file
+    # Format: {name: path}
+    icons = {}
+    for name in get_names(nw):
+        icon_path = os.path.join(icons_dir, f"{name}.png")
+        if os.path.isfile(icon_path):
+            icons[name] = os.path.relpath(os.path.abspath(icon_path), base_dir).replace(os.sep, "/")
+
+    return icons
+
+
+def get_names(nw):
+    # Entities, recipes and items names of the network, in the
+    # order of their first use
+    # Format: {name: index}
+    names = {}
+    for node in nw.nodes:
+        names.setdefault(node.entity.name, len(names))
+
+        recipe = getattr(node.entity, "recipe", None)
+        if recipe is not None:
+            names.setdefault(recipe.name, len(names))
+
+        for item in getattr(node, "transported_items", None) or ():
+            names.setdefault(item.name, len(names))
+
+    return names
+
+
+def write_json(nw, f, icons=None):
+    # Write the graph JSON of the network in a text file
+    bp = nw.blueprint
+    names = get_names(nw)
+
+    f.write(f'{{"format":"{graph_format}","version":{graph_version},'
+            f'"label":{dump(bp.label)},"width":{bp.width},"height":{bp.heigth},\n')
+    f.write(f'"names":{dump(list(names))},\n')
+    f.write(f'"icons":{dump(icons or {})},\n')
+    f.write(f'"fields":{dump(fields)},\n')
+
+    f.write('"nodes":[')
+    index = {}
+    for node in nw.nodes:
+        if len(index) > 0:
+            f.write(",\n")
+        index[node] = len(index)
+        f.write(get_node_line(nw, node, names))
+
+    # The edges are written by chunks of one line per parent
+    f.write('],\n"edges":[')
+    separator = ""
+    for node in nw.nodes:
+        if len(node.childs) > 0:
+            node_index = index[node]
+            f.write(separator)
+            f.write(",".join(f"{node_index},{index[child]}" for child in node.childs))
+            separator = ",\n"
+
+    f.write("]}\n")
+
+
+def get_node_line(nw, node, names):
+    entity_obj = node.entity
+
+    # Center of the entity tile
+    x = entity_obj.position[0] + 0.5
+    y = entity_obj.position[1] + 0.5
+
+    usage_ratio = node.usage_ratio
+
+    flags = 0
+    if len(node.parents) == 0:
+        flags += node_flags["input"]
+    if len(node.childs) == 0:
+        flags += node_flags["output"]
+    if usage_ratio is not None and nw.is_bottleneck(node):
+        flags += node_flags["bottleneck"]
+    if entity_obj.virtual:
+        flags += node_flags["virtual"]
+
+    recipe = getattr(entity_obj, "recipe", None)
+    recipe_index = names[recipe.name] if recipe is not None else -1
+
+    items = ",".join(str(names[item.name])
+                     for item in getattr(node, "transported_items", None) or ())
+    compacted = ",".join(format_entity_number(compacted_node.entity.number)
+                         for compacted_node in node.compacted_nodes)
+
+    usage = "null" if usage_ratio is None else format_number(usage_ratio)
+
+    return (f"[{format_entity_number(entity_obj.number)},{names[entity_obj.name]},{format_number(x)},{format_number(y)},"
+            f"{format_number(node.flow.total_amount)},{usage},{flags},{recipe_index},"
+            f"[{items}],[{compacted}]]")
+
+
+def format_entity_number(number):
+    # The virtual entities numbers are strings
+    return str(number) if type(number) is int else dump(number)
+
+
+def format_number(number):
+    # Short JSON number, the flows are displayed with 2 decimals
+    number = round(number, 4)
+    if number == int(number):
+        return str(int(number))
+
+    return repr(number)
+
+
+def dump(value):
+    # JSON value that can be written in an HTML script element
+    return json.dumps(value, separators=(",", ":")).replace("</", "<\\/")
+
+
+def write_html(nw, f, icons=None):
+    # Write a static HTML page drawing the graph, the graph JSON
+    # is written in the page
+    with open(html_template_path, "r", encoding="utf-8") as template_file:
+        template = template_file.read()
+
+    (head, tail) = template.split(html_graph_marker, 1)
+
+    f.write(head.replace("{{title}}", escape_html(nw.blueprint.label)))
+    write_json(nw, f, icons)
+    f.write(tail)
+
+
+def escape_html(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
@@ -0,0 +1,368 @@
+from src import blueprint as blueprint_service, network as network_service, entity, instrumentation
+
+# -----------------------------------------------------------
+# Analyse again an analysed network after a blueprint edit
+# (entity added, removed, rotated, upgraded or recipe changed)
+# without running the whole analysis again
+#
+# The nodes of an entity only depend on the entities of the tiles
+# they link to. The region of an edit is the closure of the edited
+# entity by this relation, in both directions: the entities of the
+# tiles a region entity links to, and the entities linking to the
+# tiles of a region entity. No node outside of the region is linked
+# to a region node, before or after the edit, so:
+#   - the region nodes are created again, in the same order as
+#     a full analysis, the other nodes are kept
+#   - the purpose and the flow are calculated again for the region
+#     nodes only, they are not linked to the others
+# The results are the same as a full analysis of the edited blueprint.
+# Edits changing the blueprint bounds, or on a blueprint with
+# overlapping entities, need a full analysis.
+# -----------------------------------------------------------
+
+# Blueprint entity key changed by the edit actions
+edited_keys = {"rotate": "direction", "upgrade": "name", "recipe": "recipe"}
+
+# Part of the blueprint entities above which the region is not
+# edited, the blueprint is analysed again
+max_region_ratio = 0.5
+
+
+class Edit:
+    # Edit of one blueprint entity, see the functions below
+    def __init__(self, action, entity_number, value=None):
+        if action != "add" and action != "remove" and action not in edited_keys:
+            raise ValueError(f"Unknown edit action: {action}")
+
+        self.action = action
+        self.entity_number = entity_number
+
+        # Added entity dictionary, or new value of the edited key
+        self.value = value
+
+    def __str__(self):
+        return f"{self.action} {self.entity_number}"
+
+
+def add_entity(entity_dic):
+    # entity_dic: blueprint entity dictionary, with a new entity number
+    return Edit("add", entity_dic["entity_number"], entity_dic)
+
+
+def remove_entity(entity_number):
+    return Edit("remove", entity_number)
+
+
+def rotate_entity(entity_number, direction):
+    # The blueprints have no direction for the north
+    return Edit("rotate", entity_number, direction if direction != 0 else None)
+
+
+def upgrade_entity(entity_number, name):
+    return Edit("upgrade", entity_number, name)
+
+
+def set_recipe(entity_number, recipe_name):
+    # A None recipe name removes the recipe
+    return Edit("recipe", entity_number, recipe_name)
+
+
+class NetworkEditor:
+    def __init__(self, network):
+        self.index_network(network)
+
+        # Nodes created again by the last edit, None after a full analysis
+        self.rebuilt_nodes = None
+
+    def index_network(self, network):
+        self.network = network
+        self.blueprint = network.blueprint
+
+        self.network_creator = network_service.NetworkCreator(self.blueprint)
+        self.network_creator.node_map = network.node_map
+
+        # Format: {entity_number: Entity}
+        self.entities_by_number = {}
+
+        # Entities whose node links to each tile
+        # Format: {(x, y): [Entity]}
+        self.linking_entities = {}
+
+        # The grid only keeps one entity per tile
+        self.overlapping = False
+
+        for entity_obj in self.blueprint.entities:
+            self.entities_by_number.setdefault(entity_obj.number, entity_obj)
+            self.add_links(entity_obj)
+
+            for (x, y) in self.blueprint.get_entity_tiles(entity_obj):
+                if self.blueprint.grid.get(x, y) is not entity_obj:
+                    self.overlapping = True
+
+        # The network nodes are sorted by their first tile in the
+        # node map, row by row
+        # Format: {node: (y, x)}
+        self.nodes_key = {}
+        for (x, y, node) in network.node_map.cells():
+            if node not in self.nodes_key:
+                self.nodes_key[node] = (y, x)
+
+    def add_links(self, entity_obj):
+        for tile in self.network_creator.get_link_tiles(entity_obj):
+            self.linking_entities.setdefault(tile, []).append(entity_obj)
+
+    def remove_links(self, entity_obj):
+        for tile in self.network_creator.get_link_tiles(entity_obj):
+            self.linking_entities[tile].remove(entity_obj)
+
+    def apply(self, edit):
+        # Edit the blueprint and analyse it again
+        # Returns the network, a new one if a full analysis was needed
+        (old_entity, new_entity, full_analysis) = self.edit_blueprint(edit)
+
+        if full_analysis or self.changes_bounds(old_entity, new_entity):
+            self.analyse_blueprint()
+            return self.network
+
+        # A full analysis is faster than editing most of the network
+        region = self.get_region(old_entity, new_entity,
+                                 max_region_ratio * len(self.blueprint.entities))
+        if region is None:
+            self.analyse_blueprint()
+        else:
+            self.analyse_region(region, old_entity, new_entity)
+
+        return self.network
+
+    def edit_blueprint(self, edit):
+        # Change the blueprint json, returns the entity before and
+        # after the edit, None if there is no entity, and True if the
+        # edit needs a full analysis
+        bp = self.blueprint
+        entities = bp.blueprint["blueprint"]["entities"]
+        entity_dic = bp.entities_by_number.get(edit.entity_number)
+        full_analysis = False
+
+        if edit.action == "add":
+            if entity_dic is not None:
+                raise ValueError(f"The entity number {edit.entity_number} is already used")
+
+            entity_dic = edit.value
+            entities.append(entity_dic)
+            old_entity = None
+
+        else:
+            if entity_dic is None:
+                raise ValueError(f"No entity {edit.entity_number} in the blueprint")
+
+            # With several entities with this number, the first
+            # entity may not be the first dictionary
+            old_entity = self.entities_by_number.get(edit.entity_number)
+            if old_entity is not None and old_entity.original_position is not entity_dic["position"]:
+                full_analysis = True
+
+            if edit.action == "remove":
+                del entities[next(i for (i, dic) in enumerate(entities) if dic is entity_dic)]
+                return (old_entity, None, full_analysis)
+
+            key = edited_keys[edit.action]
+            if edit.value is None:
+                entity_dic.pop(key, None)
+            else:
+                entity_dic[key] = edit.value
+
+        # Replace infinit chests with a normal chest, as the blueprint does
+        if entity_dic["name"] == "infinity-chest":
+            entity_dic["name"] = "iron-chest"
+
+        new_entity = entity.create_entity(entity_dic)
+
+        if bp.origin is None:
+            # The blueprint had no entity, the origin is not known
+            return (old_entity, new_entity, True)
+
+        if new_entity is not None:
+            new_entity.position[0] -= bp.origin[0]
+            new_entity.position[1] -= bp.origin[1]
+
+        # The entity is ignored before or after the edit, its place
+        # in the blueprint entities is not known
+        if edit.action != "add" and (old_entity is None) != (new_entity is None):
+            full_analysis = True
+
+        return (old_entity, new_entity, full_analysis)
+
+    def changes_bounds(self, old_entity, new_entity):
+        # True if the edit changes the blueprint size or origin,
+        # or makes two entities overlap
+        bp = self.blueprint
+
+        if self.overlapping:
+            return True
+
+        if new_entity is not None:
+            if not bp.is_coord_in_boundaries(new_entity.position):
+                return True
+
+            for (x, y) in bp.get_entity_tiles(new_entity):
+                tile_entity = bp.grid.get(x, y)
+                if tile_entity is not None and tile_entity is not old_entity \
+                        and not tile_entity.virtual:
+                    return True
+
+        if old_entity is not None and \
+                (new_entity is None or new_entity.position != old_entity.position):
+            # The bounds only change if the entity was the last on a side
+            (x, y) = old_entity.position
+            if x == 0 or y == 0 or x == bp.width - 1 or y == bp.heigth - 1:
+                positions = [e.position for e in bp.entities if e is not old_entity]
+                if len(positions) == 0 or \
+                        min(position[0] for position in positions) != 0 or \
+                        min(position[1] for position in positions) != 0 or \
+                        max(position[0] for position in positions) != bp.width - 1 or \
+                        max(position[1] for position in positions) != bp.heigth - 1:
+                    return True
+
+        return False
+
+    def analyse_blueprint(self):
+        # Full analysis of the edited blueprint
+        bp = blueprint_service.Blueprint(self.blueprint.blueprint)
+        nw = network_service.create_network(bp)
+        nw.calculate_bottleneck()
+
+        self.index_network(nw)
+        self.rebuilt_nodes = None
+
+    def get_region(self, old_entity, new_entity, max_size):
+        # Entities of the grid whose nodes can change with the edit,
+        # None if there are more than max_size
+        bp = self.blueprint
+        region = set()
+        worklist = []
+
+        def add_to_region(entity_obj):
+            if entity_obj is not None and entity_obj not in region:
+                region.add(entity_obj)
+                worklist.append(entity_obj)
+
+        add_to_region(old_entity)
+
+        if new_entity is not None:
+            # The entities of the new tiles and those linking to them
+            for (x, y) in bp.get_entity_tiles(new_entity):
+                add_to_region(bp.grid.get(x, y))
+                for linking_entity in self.linking_entities.get((x, y), ()):
+                    add_to_region(linking_entity)
+
+            # A virtual chest can be added on an empty tile it links to
+            for (x, y) in self.network_creator.get_link_tiles(new_entity):
+                add_to_region(bp.grid.get(x, y))
+                for linking_entity in self.linking_entities.get((x, y), ()):
+                    add_to_region(linking_entity)
+
+        while len(worklist) > 0:
+            if len(region) > max_size:
+                return None
+
+            entity_obj = worklist.pop()
+
+            for tile in bp.get_entity_tiles(entity_obj):
+                for linking_entity in self.linking_entities.get(tile, ()):
+                    add_to_region(linking_entity)
+
+            for (x, y) in self.network_creator.get_link_tiles(entity_obj):
+                add_to_region(bp.grid.get(x, y))
+
+        return region if len(region) <= max_size else None
+
+    def analyse_region(self, region, old_entity, new_entity):
+        bp = self.blueprint
+        nw = self.network
+        node_map = nw.node_map
+
+        with instrumentation.phase("edit"):
+            # Remove the region entities and nodes, and the virtual chests
+            # that will be added again
+            old_nodes = set()
+            for entity_obj in region:
+                for (x, y) in bp.get_entity_tiles(entity_obj):
+                    node = node_map.get(x, y)
+                    if node is not None:
+                        old_nodes.add(node)
+                        node_map.set(x, y, None)
+
+                    if entity_obj.virtual or entity_obj is old_entity:
+                        bp.grid.set(x, y, None)
+
+            region_entities = [entity_obj for entity_obj in region
+                               if not entity_obj.virtual and entity_obj is not old_entity]
+
+            if old_entity is not None:
+                self.remove_links(old_entity)
+                del self.entities_by_number[old_entity.number]
+
+                if new_entity is not None:
+                    bp.entities[bp.entities.index(old_entity)] = new_entity
+                else:
+                    bp.entities.remove(old_entity)
+
+            elif new_entity is not None:
+                bp.entities.append(new_entity)
+
+            if new_entity is not None:
+                for (x, y) in bp.get_entity_tiles(new_entity):
+                    bp.grid.set(x, y, new_entity)
+
+                self.add_links(new_entity)
+                self.entities_by_number.setdefault(new_entity.number, new_entity)
+                region_entities.append(new_entity)
+
+            bp.index_entities()
+
+            # The virtual chests are added in the grid order
+            prototypes = entity.get_prototypes()
+            inserters = sorted(
+                (entity_obj for entity_obj in region_entities if entity_obj.data["type"] == "inserter"),
+                key=lambda inserter: (inserter.position[1], inserter.position[0]))
+
+            for inserter in inserters:
+                container = bp.add_virtual_chest(inserter, prototypes)
+                if container is not None:
+                    region_entities.append(container)
+
+            # Create the region nodes as create_network does, in the grid order
+            tiles = sorted((tile for entity_obj in region_entities
+                            for tile in bp.get_entity_tiles(entity_obj)),
+                           key=lambda tile: (tile[1], tile[0]))
+
+            for (x, y) in tiles:
+                self.network_creator.create_node(x, y)
+
+            region_nodes = []
+            for (x, y) in tiles:
+                node = node_map.get(x, y)
+                if node is not None and node not in self.nodes_key:
+                    self.nodes_key[node] = (y, x)
+                    region_nodes.append(node)
+
+            for node in region_nodes:
+                node.optimize()
+
+            region_nodes = [node for node in region_nodes if not node.removed]
+
+            for node in old_nodes:
+                del self.nodes_key[node]
+
+            nodes = [node for node in nw.nodes if node not in old_nodes]
+            nodes += region_nodes
+            nodes.sort(key=self.nodes_key.__getitem__)
+
+            nw.nodes = nodes
+            nw.index_nodes()
+
+        instrumentation.count("edited_nodes", len(region_nodes))
+
+        nw.calculate_bottleneck(region_nodes)
+
+        self.rebuilt_nodes = region_nodes
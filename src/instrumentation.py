@@ -0,0 +1,150 @@
+import time
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+# -----------------------------------------------------------
+# Optional measure of the analysis phases
+# The analysis code declares its phases and counters with the
+# functions of this module, they are recorded in the
+# Instrumentation object of the current analysis, if any
+#
+# Usage:
+#   with Instrumentation() as instrumentation:
+#       with phase("network"):
+#           ...
+#       count("nodes", len(nodes))
+#   instrumentation.to_dict()
+# -----------------------------------------------------------
+
+# Instrumentation of the analysis running in the current thread or
+# asyncio task, None if not recorded
+current = contextvars.ContextVar("instrumentation", default=None)
+
+
+class Phase:
+    __slots__ = ("name", "wall_time", "cpu_time", "calls")
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0
+        self.cpu_time = 0
+        self.calls = 0
+
+    def to_dict(self):
+        return {
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "calls": self.calls
+        }
+
+
+class Instrumentation:
+    # Wall and CPU time of each phase and counters of an analysis
+    # The time of a phase does not include the time of the phases
+    # started inside it, so the phases times add up to the total time
+
+    def __init__(self):
+        # Format: {phase_name: Phase}, in the order of the first call
+        self.phases = {}
+
+        # Format: {counter_name: value}
+        self.counters = {}
+
+        self.wall_time = 0
+        self.cpu_time = 0
+
+        # Running phases, the last one is measured
+        # Format: [[Phase, wall start, cpu start]]
+        self._running_phases = []
+        self._token = None
+        self._start = None
+
+    def __enter__(self):
+        # Record the phases of the code run in the with block,
+        # in the current thread or asyncio task
+        self._token = current.set(self)
+        self._start = (time.perf_counter(), time.process_time())
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time += time.perf_counter() - self._start[0]
+        self.cpu_time += time.process_time() - self._start[1]
+        current.reset(self._token)
+        self._token = None
+        return False
+
+    @contextmanager
+    def phase(self, name):
+        if name not in self.phases:
+            self.phases[name] = Phase(name)
+
+        phase_measure = self.phases[name]
+        phase_measure.calls += 1
+
+        # The parent phase is paused
+        self._pause()
+        self._running_phases.append(
+            [phase_measure, time.perf_counter(), time.process_time()])
+
+        try:
+            yield phase_measure
+        finally:
+            self._pause()
+            self._running_phases.pop()
+
+            # The parent phase is resumed
+            if len(self._running_phases) > 0:
+                self._running_phases[-1][1] = time.perf_counter()
+                self._running_phases[-1][2] = time.process_time()
+
+    def _pause(self):
+        # Add the time spent since the start of the last running phase
+        if len(self._running_phases) == 0:
+            return
+
+        running_phase = self._running_phases[-1]
+        wall_time = time.perf_counter()
+        cpu_time = time.process_time()
+
+        running_phase[0].wall_time += wall_time - running_phase[1]
+        running_phase[0].cpu_time += cpu_time - running_phase[2]
+        running_phase[1] = wall_time
+        running_phase[2] = cpu_time
+
+    def to_dict(self):
+        # Format: {
+        #     "wall_time": 0.012,
+        #     "cpu_time": 0.011,
+        #     "phases": {
+        #         "decode": {"wall_time": 0.001, "cpu_time": 0.001, "calls": 1},
+        #         ...
+        #     },
+        #     "counters": {"entities": 120, ...}
+        # }
+        return {
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "phases": {name: phase_measure.to_dict()
+                       for (name, phase_measure) in self.phases.items()},
+            "counters": dict(self.counters)
+        }
+
+
+def is_active():
+    return current.get() is not None
+
+
+def phase(name):
+    # Context manager measuring a phase of the current analysis
+    instrumentation = current.get()
+    if instrumentation is None:
+        return nullcontext()
+
+    return instrumentation.phase(name)
+
+
+def count(name, value):
+    # Set a counter of the current analysis
+    instrumentation = current.get()
+    if instrumentation is not None:
+        instrumentation.counters[name] = value
@@ -6,6 +6,8 @@
 
 
 class Item:
+    __slots__ = ("name", "amount", "type")
+
     def __init__(self, name, amount, type="item"):
         self.name = name
         self.amount = amount
@@ -26,13 +28,23 @@ class Item:
 
 
 class Flow:
+    __slots__ = ("_items",)
+
     def __init__(self):
-        self.items = {}
+        # Most of the flows stay empty, their dictionary
+        # is only created when an item is added
+        self._items = None
         # Format:  {
         #    item_name_1: 0.8, # Per min
         #    item_name_2: 0.4,
         # }
 
+    @property
+    def items(self):
+        if self._items is None:
+            return {}
+        return self._items
+
     def add_item(self, item, amount):
         if item is None:
             raise Exception("Flow added without item")
@@ -43,24 +55,27 @@ class Flow:
         if amount is None:
             raise Exception("Flow added without amount")
 
-        if item not in self.items:
-            self.items[item] = amount
+        if self._items is None:
+            self._items = {}
+
+        if item not in self._items:
+            self._items[item] = amount
         else:
-            self.items[item] += amount
+            self._items[item] += amount
 
     def reduce(self, item, amount):
         if item not in self.items:
             raise Exception("Item not in flow")
 
-        self.items[item] -= amount
-        if self.items[item] <= 0:
-            del self.items[item]
+        self._items[item] -= amount
+        if self._items[item] <= 0:
+            del self._items[item]
 
     @property
     def total_amount(self):
-        if len(self.items) == 0:
+        if not self._items:
             return 0
-        return sum(self.items.values())
+        return sum(self._items.values())
 
     def __str__(self) -> str:
         return "[" + ", ".join([f"{item}: {amount}" for item, amount in self.items.items()]) + "]"
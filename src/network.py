@@ -1,5 +1,4 @@
-from src import node as node_service, utils
-from pyvis.network import Network as NetworkDisplay
+from src import node as node_service, item as item_service, utils, spatial, instrumentation, config, solver
 
 # -----------------------------------------------------------
 # Create a node network from a blueprint
@@ -20,53 +19,95 @@ def create_network(blueprint):
 class NetworkCreator:
     def __init__(self, blueprint):
         self.blueprint = blueprint
-        self.node_map = []
+        self.node_map = None
 
     def create_network(self):
-        # Create a 2D array that will contain all nodes,
-        # the same way as the blueprint array
+        # Create a 2D grid that will contain all nodes,
+        # the same way as the blueprint grid
         # Knowing where the nodes are located from each other will be useful
 
-        # The nodes will then be exctracted from the 2D array in a list
+        # The nodes will then be exctracted from the 2D grid in a list
 
-        self.node_map = []
-
-        for _ in range(self.blueprint.heigth):
-            self.node_map += [[None for _ in range(self.blueprint.width)]]
+        self.node_map = spatial.ChunkedGrid(
+            self.blueprint.width, self.blueprint.heigth)
 
         # Iterate over the blueprint entities
-        # to create each nodes recursively
-        for y in range(self.blueprint.heigth):
-            for x in range(self.blueprint.width):
-                self.create_node(x, y)
+        # to create each nodes and their neighbours
+        for (x, y, _) in self.blueprint.grid.cells():
+            self.create_node(x, y)
 
         return Network(self.blueprint, self.node_map)
 
     def create_node(self, x, y):
         # Returns a node object or None
 
+        # A node needs the nodes of its neighbour tiles to be linked to them,
+        # which need their own neighbours, and so on.
+        # Instead of recursive calls, that would be as deep as the longest
+        # belt line, the nodes being linked are kept in an explicit stack:
+        # each one is a link_node generator that yields the coordinates of
+        # the tile it needs and receives the node of this tile.
+
+        (node, node_linker) = self.get_or_create_node(x, y)
+        if node_linker is None:
+            return node
+
+        stack = [node_linker]
+        tile_node = None
+
+        while len(stack) > 0:
+            try:
+                (target_x, target_y) = stack[-1].send(tile_node)
+
+            except StopIteration as linked:
+                # The node is linked, we give it to the node that asked for it
+                stack.pop()
+                tile_node = linked.value
+                continue
+
+            (tile_node, node_linker) = self.get_or_create_node(
+                target_x, target_y)
+
+            if node_linker is not None:
+                stack.append(node_linker)
+                tile_node = None
+
+        return tile_node
+
+    def get_or_create_node(self, x, y):
+        # Returns the (node, None) if the tile node exists or if there is
+        # no node to create, else (None, link_node generator of the new node)
+
         # Check if the cell hasn't been filled yet
         if x < 0 or x >= self.blueprint.width or y < 0 or y >= self.blueprint.heigth:
-            return None
+            return (None, None)
 
         # Check if a node already exists in the cell
-        if self.node_map[y][x] is not None:
-            return self.node_map[y][x]
+        existing_node = self.node_map.get(x, y)
+        if existing_node is not None:
+            return (existing_node, None)
 
         # Get the entity at the given position
-        entity = self.blueprint.array[y][x]
+        entity = self.blueprint.grid.get(x, y)
 
         if entity is None:
-            return None
+            return (None, None)
 
         # We can now create the node
         node = node_service.create_node(entity)
 
+        return (None, self.link_node(node, entity, x, y))
+
+    def link_node(self, node, entity, x, y):
+        # Generator linking the node to its neighbours
+        # "yield (x, y)" returns the node of the given tile,
+        # creating it if needed, the generator returns the node
+
         # Each game entity interacts with the other nodes in there own way
-        # The requiered nodes will be created recursively
+        # The requiered nodes will be created by create_node
         if node.type == "transport-belt":
-            # The node is inserted in the map to avoid infinit recursion
-            self.node_map[y][x] = node
+            # The node is inserted in the map to avoid infinit loops
+            self.node_map.set(x, y, node)
 
             # We want to set the entity in front of the belt as the node's child
             # We get the coordinates of the entity in front of the belt:
@@ -75,7 +116,7 @@ class NetworkCreator:
             target_y = y + tile_in_front_offset[1]
 
             # We get the node in front of the belt or create a new one
-            child_node = self.create_node(target_x, target_y)
+            child_node = (yield (target_x, target_y))
 
             if child_node is not None and entity.can_connect_to(child_node.entity):
                 node.childs.append(child_node)
@@ -84,15 +125,15 @@ class NetworkCreator:
             return node
 
         elif node.type == "inserter":
-            # The node is inserted in the map to avoid infinit recursion
-            self.node_map[y][x] = node
+            # The node is inserted in the map to avoid infinit loops
+            self.node_map.set(x, y, node)
 
             # Set the entity where items are droped as the node's child
             tile_drop_offset = entity.get_drop_tile_offset()
             target_drop_x = x + tile_drop_offset[0]
             target_drop_y = y + tile_drop_offset[1]
 
-            drop_child_node = self.create_node(target_drop_x, target_drop_y)
+            drop_child_node = (yield (target_drop_x, target_drop_y))
 
             if drop_child_node is not None and entity.can_move_to(drop_child_node.entity):
                 node.childs.append(drop_child_node)
@@ -103,7 +144,7 @@ class NetworkCreator:
             target_pickup_x = x + tile_pickup_offset[0]
             target_pickup_y = y + tile_pickup_offset[1]
 
-            pickup_node = self.create_node(target_pickup_x, target_pickup_y)
+            pickup_node = (yield (target_pickup_x, target_pickup_y))
 
             if pickup_node is not None and entity.can_move_from(pickup_node.entity):
                 node.parents.append(pickup_node)
@@ -122,11 +163,11 @@ class NetworkCreator:
                         or target_y < 0 or target_y >= self.blueprint.heigth:
                     continue
 
-                self.node_map[target_y][target_x] = node
+                self.node_map.set(target_x, target_y, node)
             return node
 
         elif node.type == "underground-belt":
-            self.node_map[y][x] = node
+            self.node_map.set(x, y, node)
 
             if entity.belt_type == "output":
                 # Set the entity where items are droped as the node's child
@@ -136,7 +177,7 @@ class NetworkCreator:
                 target_y = y + tile_in_front_offset[1]
 
                 # We get the node in front of the belt or create a new one
-                child_node = self.create_node(target_x, target_y)
+                child_node = (yield (target_x, target_y))
 
                 if child_node is not None and entity.can_connect_to(child_node.entity):
                     node.childs.append(child_node)
@@ -145,8 +186,7 @@ class NetworkCreator:
                 # We try to connect to the output belt
                 possible_output_coords = entity.get_possible_output_coords()
                 for possible_coord in possible_output_coords:
-                    child_node = self.create_node(
-                        possible_coord[0], possible_coord[1])
+                    child_node = (yield (possible_coord[0], possible_coord[1]))
 
                     if child_node is not None and \
                             child_node.entity.name == node.entity.name and \
@@ -162,7 +202,7 @@ class NetworkCreator:
 
         elif node.type in ["container", "logistic-container"]:
             # Those entities does not interact with others
-            self.node_map[y][x] = node
+            self.node_map.set(x, y, node)
             return node
 
         elif node.type == "splitter":
@@ -170,7 +210,7 @@ class NetworkCreator:
             # We need to add the second splitter tile to the map
             if x == entity.position[0] and y == entity.position[1]:
                 # If we are the original splitter, we need to add the second splitter
-                self.node_map[y][x] = node
+                self.node_map.set(x, y, node)
 
                 second_belt_offset = entity.get_second_belt_offset()
                 second_node_x = x + second_belt_offset[0]
@@ -178,10 +218,10 @@ class NetworkCreator:
 
                 if second_node_x >= 0 and second_node_x < self.blueprint.width and\
                         second_node_y >= 0 and second_node_y < self.blueprint.heigth:
-                    self.node_map[second_node_y][second_node_x] = node
+                    self.node_map.set(second_node_x, second_node_y, node)
             else:
                 # We create the original splitter instead
-                return self.create_node(entity.position[0], entity.position[1])
+                return (yield (entity.position[0], entity.position[1]))
 
             # Set the entity where items are droped as the node's child
             drop_tile_offsets = entity.get_drop_tile_offsets()
@@ -189,8 +229,7 @@ class NetworkCreator:
                 target_drop_x = x + offset[0]
                 target_drop_y = y + offset[1]
 
-                drop_child_node = self.create_node(
-                    target_drop_x, target_drop_y)
+                drop_child_node = (yield (target_drop_x, target_drop_y))
 
                 if drop_child_node is not None and entity.can_move_to(drop_child_node.entity):
                     node.childs.append(drop_child_node)
@@ -201,24 +240,63 @@ class NetworkCreator:
         utils.warning(f"Unsupported entity type: {entity.data['type']}")
         return None
 
+    def get_link_tiles(self, entity):
+        # Returns the tiles link_node may ask for to link the entity node,
+        # except its own tiles, they must follow the link_node cases
+        node_type = entity.data["type"]
+        (x, y) = entity.position
+
+        if node_type == "transport-belt" or \
+                node_type == "underground-belt" and entity.belt_type == "output":
+            tile_in_front_offset = entity.get_tile_in_front_offset()
+            return [(x + tile_in_front_offset[0], y + tile_in_front_offset[1])]
+
+        elif node_type == "inserter":
+            tile_drop_offset = entity.get_drop_tile_offset()
+            tile_pickup_offset = entity.get_pickup_tile_offset()
+            return [(x + tile_drop_offset[0], y + tile_drop_offset[1]),
+                    (x + tile_pickup_offset[0], y + tile_pickup_offset[1])]
+
+        elif node_type == "underground-belt":
+            return [(coord[0], coord[1]) for coord in entity.get_possible_output_coords()]
+
+        elif node_type == "splitter":
+            return [(x + offset[0], y + offset[1]) for offset in entity.get_drop_tile_offsets()]
+
+        return []
+
 
 class Network:
-    def __init__(self, blueprint, nodes_array):
+    def __init__(self, blueprint, node_map):
         self.blueprint = blueprint
-        self.nodes_array = nodes_array
+        self.node_map = node_map
 
         self.nodes = []
+        added_nodes = set()
+
+        # Nodes limiting the flow, given by the max flow solver
+        # None if the bottlenecks are deduced from the usage ratios
+        self.bottleneck_nodes = None
+
+        for (_, _, node) in self.node_map.cells():
+            if not node.removed:
+                # Check that the node is not already in the list
+                # It's normal if the node takes multiple tiles
+                # (They appear multiple times in the map)
+                if node not in added_nodes:
+                    added_nodes.add(node)
+                    self.nodes.append(node)
 
-        for row in self.nodes_array:
-            for node in row:
-                if node is not None and not node.removed:
-                    # Check that the node is not already in the list
-                    # It's normal if the node takes multiple tiles
-                    # (They appear multiple times in the map)
-                    if node not in self.nodes:
-                        self.nodes.append(node)
+        if instrumentation.is_active():
+            instrumentation.count("nodes_before_optimization", len(self.nodes))
+            instrumentation.count("edges_before_optimization", self.count_edges())
 
-        self.optimize()
+        with instrumentation.phase("optimize"):
+            self.optimize()
+
+        if instrumentation.is_active():
+            instrumentation.count("nodes", len(self.nodes))
+            instrumentation.count("edges", self.count_edges())
 
     def optimize(self):
         # Network optimisation
@@ -233,13 +311,20 @@ class Network:
                 optimized_nodes.append(node)
 
         self.nodes = optimized_nodes
+        self.index_nodes()
 
-    def get_node(self, entity_number) -> node_service.Node:
+    def index_nodes(self):
+        # Index of the nodes by entity number
+        # The first node of the list is kept if a number is used twice
+        self.nodes_by_number = {}
         for node in self.nodes:
-            if node.entity.number == entity_number:
-                return node
+            self.nodes_by_number.setdefault(node.entity.number, node)
 
-        return None
+    def count_edges(self):
+        return sum(len(node.childs) for node in self.nodes)
+
+    def get_node(self, entity_number) -> node_service.Node:
+        return self.nodes_by_number.get(entity_number)
 
     def root_nodes(self):
         roots = []
@@ -248,14 +333,32 @@ class Network:
                 roots.append(node)
         return roots
 
-    def leaf_nodes(self):
+    def leaf_nodes(self, nodes=None):
+        if nodes is None:
+            nodes = self.nodes
+
         leafs = []
-        for node in self.nodes:
+        for node in nodes:
             if len(node.childs) == 0:
                 leafs.append(node)
         return leafs
 
-    def calculate_bottleneck(self):
+    def is_bottleneck(self, node):
+        if self.bottleneck_nodes is not None:
+            return node in self.bottleneck_nodes
+
+        return node.usage_ratio is not None and node.usage_ratio >= 1
+
+    def calculate_bottleneck(self, nodes=None):
+        # nodes: the nodes to calculate, all the network nodes by default
+        # The other nodes must be calculated and not linked to them
+        with instrumentation.phase("purpose"):
+            self.estimate_purpose(nodes)
+
+        with instrumentation.phase("flow"):
+            self.calculate_flow(nodes)
+
+    def estimate_purpose(self, nodes=None):
         # ==========================================
         # ====== Step 1: Purpose estimation ========
         # ==========================================
@@ -267,7 +370,10 @@ class Network:
         # The purpose calculation starts from the assembly machines
         # childs as only one item is produced per assembling machine
 
-        for node in self.nodes:
+        if nodes is None:
+            nodes = self.nodes
+
+        for node in nodes:
             if node.type == "assembling-machine":
                 node.calculate_childs_purpose()
 
@@ -275,14 +381,14 @@ class Network:
         # with recipes that have one ingredient first as they are easier to process
 
         # Recipes with one ingredient first
-        for node in self.nodes:
+        for node in nodes:
             if node.type == "assembling-machine" and\
                 node.entity.recipe is not None and\
                     len(node.entity.recipe.ingredients) == 1:
                 node.calculate_parents_purpose()
 
         # Recipes with multiple ingredients
-        for node in self.nodes:
+        for node in nodes:
             if node.type == "assembling-machine" and\
                 node.entity.recipe is not None and\
                     len(node.entity.recipe.ingredients) > 1:
@@ -292,7 +398,7 @@ class Network:
         nb_transport_nodes_with_no_purpose = 0
         nb_transport_nodes = 0
 
-        for node in self.nodes:
+        for node in nodes:
             if node.node_type == "transport_node":
                 nb_transport_nodes += 1
                 if node.transported_items is None or\
@@ -304,15 +410,44 @@ class Network:
         utils.verbose(
             f"{nb_transport_nodes - nb_transport_nodes_with_no_purpose} / {nb_transport_nodes} nodes with purpose")
 
+    def calculate_flow(self, nodes=None):
         # ==============================================
         # ====== Step 2: Bottleneck calculation ========
         # ==============================================
 
+        flow_solver = config.get_settings().flow_solver
+
+        if flow_solver == "negotiation":
+            self.negotiate_flow(nodes)
+        elif flow_solver == "maxflow":
+            # The max flow solver passes are shared by all the nodes,
+            # the whole network is solved again
+            if nodes is not None:
+                for node in self.nodes:
+                    node.flow = item_service.Flow()
+                nodes = None
+
+            solver.solve(self)
+        else:
+            raise ValueError(f"Unknown flow solver: {flow_solver}")
+
+        utils.verbose("")
+        utils.success("Bottleneck calculation complete!")
+        utils.verbose("Produced items:")
+        for node in self.leaf_nodes(nodes):
+            # TODO: fix that nothing is shown for the bp blueprints4/drillFac1
+            # None of the leaf nodes have a flow and none of them are processed by
+            # the bottleneck algorithm (no node with 0 childs processed).
+            # due to bp optimization ?
+            for item in node.flow.items:
+                utils.verbose(f"   {item}: {node.flow.items[item]} /s")
+
+    def negotiate_flow(self, nodes=None):
         # We will try to estimate the use rate of all nodes
         # We start with the leaf nodes that have a purpose and
         # we will ask for the maximum produced item per second
 
-        for node in self.leaf_nodes():
+        for node in self.leaf_nodes(nodes):
             items_output = node.get_materials_output()
 
             if items_output is None or len(items_output) == 0:
@@ -329,20 +464,12 @@ class Network:
                 acepted_amount = node.ask_flow(item_output.name, flow_capacity)
                 flow_capacity -= acepted_amount
 
-        utils.verbose("")
-        utils.success("Bottleneck calculation complete!")
-        utils.verbose("Produced items:")
-        for node in self.leaf_nodes():
-            # TODO: fix that nothing is shown for the bp blueprints4/drillFac1
-            # None of the leaf nodes have a flow and none of them are processed by
-            # the bottleneck algorithm (no node with 0 childs processed).
-            # due to bp optimization ?
-            for item in node.flow.items:
-                utils.verbose(f"   {item}: {node.flow.items[item]} /s")
-
     def display(self):
         # Display the network as a node graph using the
         # networkx library
+        # pyvis is slow to import, it is only loaded to display a network
+        from pyvis.network import Network as NetworkDisplay
+
         net = NetworkDisplay(directed=True, height=1000, width=1900)
         net.repulsion(node_distance=80, spring_length=0)
 
@@ -13,6 +13,11 @@ def create_node(entity):
 
 
 class Node:
+    # The nodes are slotted objects, a network can contain
+    # a large number of them
+    __slots__ = ("entity", "childs", "parents", "type",
+                 "removed", "_compacted_nodes", "flow")
+
     def __init__(self, entity):
         # Network construction data
         self.entity = entity
@@ -22,11 +27,33 @@ class Node:
         # self.direct_input = False
         # Network optimization data
         self.removed = False
-        self.compacted_nodes = []  # Contain the nodes deleted by the optimizer
+        self._compacted_nodes = None  # Created when the first node is compacted
 
         # Bottleneck calculation
         self.flow = item.Flow()
 
+    @property
+    def compacted_nodes(self):
+        # Contain the nodes deleted by the optimizer
+        if self._compacted_nodes is None:
+            return ()
+        return self._compacted_nodes
+
+    def add_compacted_nodes(self, nodes):
+        if self._compacted_nodes is None:
+            self._compacted_nodes = []
+        self._compacted_nodes += nodes
+
+    def take_compacted_nodes(self, node):
+        # Add the compacted nodes of a removed node
+        if self._compacted_nodes is None:
+            # The removed node list is not used anymore, we take it
+            # instead of copying it, along a belt line compacted from its
+            # end the list would be copied for each belt
+            self._compacted_nodes = node._compacted_nodes
+        else:
+            self._compacted_nodes += node._compacted_nodes
+
     # Optimization
     def optimize(self):
         # Optimize the graph by removing the node if it's not needed.
@@ -66,8 +93,8 @@ class Node:
                 self.parents[0].childs.append(self.childs[0])
 
         # We keep a trace of this node by adding it to the compacted list
-        self.compacted_nodes.append(self)
-        self.parents[0].compacted_nodes += self.compacted_nodes
+        self.add_compacted_nodes([self])
+        self.parents[0].take_compacted_nodes(self)
 
     # Purpose estimation
     def get_materials_output(self):
@@ -84,16 +111,24 @@ class Node:
 
     def connected_to_input(self):
         # True if no assembly mach between the node and the root
-        if self.node_type == "assembling-machine":
-            return False
+        # The ancestors are visited once, in a worklist
+        visited = set()
+        worklist = [self]
 
-        if len(self.parents) == 0:
-            return True
+        while len(worklist) > 0:
+            node = worklist.pop()
+            if node in visited:
+                continue
+            visited.add(node)
 
-        for parent in self.parents:
-            if parent.connected_to_input():
+            if node.node_type == "assembling-machine":
+                continue
+
+            if len(node.parents) == 0:
                 return True
 
+            worklist += node.parents
+
         return False
 
     # Bottleneck calculation
@@ -113,9 +148,12 @@ class Node:
 
 
 class Assembly_node (Node):
+    __slots__ = ("inputs", "outputs")
+
+    node_type = "assembly_node"
+
     def __init__(self, entity):
         super().__init__(entity)
-        self.node_type = "assembly_node"
 
         # Purpose calculation data
         self.inputs = []
@@ -414,13 +452,21 @@ class Assembly_node (Node):
 
 
 class Transport_node (Node):
+    __slots__ = ("transported_items", "items_from_parents", "items_from_childs")
+
+    node_type = "transport_node"
+
     def __init__(self, entity):
         super().__init__(entity)
-        self.node_type = "transport_node"
 
         # Bottleneck calculation data
         self.transported_items = None
 
+        # Names of the items already propagated through the node
+        # by set_purpose_from_parent and set_purpose_from_child
+        self.items_from_parents = None
+        self.items_from_childs = None
+
     def __str__(self):
         transported_items = ""
 
@@ -439,35 +485,95 @@ class Transport_node (Node):
     def get_materials_output(self):
         # Get the materials output of the node
 
-        if self.transported_items is None:
-            # We don't know what the node outputs are
-            # so we ask our parents for their output
-            transported_items = []
-            for parent in self.parents:
-                transported_items += parent.get_materials_output()
+        if self.transported_items is not None:
+            return self.transported_items
 
+        # We don't know what the node outputs are
+        # so we ask our parents for their output
+        # The node outputs are the concatenation of its parents outputs,
+        # the nodes outputs are computed from the parents to the childs
+        # with a stack, each node is computed once
+        # Format: [[node, next parent index, outputs]]
+        stack = [[self, 0, []]]
+        stacked_nodes = {self}
+
+        # Outputs of the nodes computed during this call, the nodes
+        # with outputs also save them in their transported items
+        computed_outputs = {}
+
+        while True:
+            frame = stack[-1]
+            (node, parent_index, transported_items) = frame
+
+            if parent_index < len(node.parents):
+                parent = node.parents[parent_index]
+                frame[1] += 1
+
+                if parent.node_type != "transport_node" or \
+                        parent.transported_items is not None:
+                    transported_items += parent.get_materials_output()
+
+                elif parent in computed_outputs:
+                    transported_items += computed_outputs[parent]
+
+                elif parent in stacked_nodes:
+                    # Loop in the network, the parent output is unknown
+                    pass
+
+                else:
+                    stack.append([parent, 0, []])
+                    stacked_nodes.add(parent)
+
+                continue
+
+            # All the parents outputs are known
             if len(transported_items) > 0:
-                self.transported_items = transported_items
+                node.transported_items = transported_items
 
-            return transported_items
+            computed_outputs[node] = transported_items
+            stack.pop()
+            stacked_nodes.remove(node)
 
-        return self.transported_items
+            if len(stack) == 0:
+                return transported_items
+
+            stack[-1][2] += transported_items
 
     def set_purpose_from_child(self, items):
         # Our childrens are telling us the items that they need
-        self.add_transported_item(items)
-
-        # We send the message to our parents
-        for parent in self.parents:
-            parent.set_purpose_from_child(items)
+        # We send the message to our parents, and their parents
+        self.propagate_purpose(items, "items_from_childs", "parents")
 
     def set_purpose_from_parent(self, items):
         # Our parents are telling us the items that they will give us
-        self.add_transported_item(items)
-
-        # We send the message to our childs
-        for child in self.childs:
-            child.set_purpose_from_parent(items)
+        # We send the message to our childs, and their childs
+        self.propagate_purpose(items, "items_from_parents", "childs")
+
+    def propagate_purpose(self, items, propagated_items_attribute, next_nodes_attribute):
+        # Add the items to the transported items of the transport nodes
+        # reachable from this node, the assembly nodes stop the propagation
+        # A node is skipped if the items already went through it in the same
+        # direction: all the following nodes already transport them
+        item_names = set(item.name for item in items)
+        worklist = [self]
+
+        while len(worklist) > 0:
+            node = worklist.pop()
+
+            if node.node_type != "transport_node":
+                continue
+
+            propagated_items = getattr(node, propagated_items_attribute)
+
+            if propagated_items is None:
+                setattr(node, propagated_items_attribute, set(item_names))
+            elif item_names <= propagated_items:
+                continue
+            else:
+                propagated_items |= item_names
+
+            node.add_transported_item(items)
+            worklist += getattr(node, next_nodes_attribute)
 
     def add_transported_item(self, items):
         if self.transported_items is None:
@@ -3,6 +3,8 @@ import argparse
 import sys
 import os
 
+from src import result_export
+
 # -----------------------------------------------------------
 # Read the user input and check the options
 # The options are stored in the global variables
@@ -11,10 +13,20 @@ import os
 input = ""
 output = ""
 force = False
+batch = False
+jobs = None
+cache = None
+serve = None
+export_format = result_export.default_format
+fields = None
+
+default_output = "analysed_blueprint"
+default_batch_output = "analysed_blueprints"
+default_server_address = "127.0.0.1:8000"
 
 
 def read_options():
-    global input, output, force
+    global input, output, force, batch, jobs, cache, serve, export_format, fields
 
     # ==== Options read ====
 
@@ -29,24 +41,74 @@ def read_options():
                         help="Blueprint JSON or encoded file path", default="./examples/beltFac.json")
 
     parser.add_argument("-o", "--output", nargs="?", dest="output",
-                        help="JSON File output for the analysed blueprint", default="analysed_blueprint.json")
+                        help=f"File output for the analysed blueprint, or output directory in batch mode (default: {default_output}.json or {default_batch_output}/)", default=None)
 
     parser.add_argument("-f", "--force", action="store_true", dest="force",
                         help="Force overwrite of existing result file", default=False)
 
+    parser.add_argument("-b", "--batch", action="store_true", dest="batch",
+                        help="Analyse all the blueprints of the input directory, glob pattern or manifest file", default=False)
+
+    parser.add_argument("-j", "--jobs", type=int, dest="jobs",
+                        help="Number of worker processes in batch or server mode (default: number of cores)", default=None)
+
+    parser.add_argument("-c", "--cache", dest="cache",
+                        help="SQLite file caching the analyses, a blueprint already analysed is not analysed again (default: cache.path of the config)", default=None)
+
+    parser.add_argument("-s", "--serve", nargs="?", dest="serve", const=default_server_address,
+                        help=f"Start an analysis server on host:port or unix:path (default: {default_server_address})", default=None)
+
+    parser.add_argument("--format", dest="export_format", choices=list(result_export.formats),
+                        help=f"Format of the analysis files: indented JSON, compact JSON, one JSON record per line or MessagePack (default: {result_export.default_format})",
+                        default=result_export.default_format)
+
+    parser.add_argument("--fields", dest="fields",
+                        help=f"Comma separated fields of the analysis to export, among {','.join(result_export.analysis_fields)} (default: all)", default=None)
+
     opt = parser.parse_args()
 
     input = opt.input
-    output = opt.output
     force = opt.force
+    batch = opt.batch
+    jobs = opt.jobs
+    cache = opt.cache
+    serve = opt.serve
+    export_format = opt.export_format
+
+    if opt.fields is not None:
+        fields = [field.strip() for field in opt.fields.split(",") if field.strip() != ""]
+
+    output = opt.output
+    if output is None:
+        output = default_batch_output if batch else default_output + result_export.formats[export_format]
 
     # ==== Options validation ====
 
+    if jobs is not None and jobs < 1:
+        raise Exception(f"Invalid number of jobs: {jobs}")
+
+    result_export.check_format(export_format)
+    if fields is not None:
+        result_export.check_fields(fields)
+
+    if serve is not None:
+        # The blueprints are read from the requests
+        return
+
     # Check if the input file exists
-    if not os.path.exists(opt.input):
-        raise Exception(f"Input file '{opt.input}' does not exist")
+    # In batch mode, the input can also be a glob pattern
+    if not os.path.exists(input) and not (batch and any(c in input for c in "*?[")):
+        raise Exception(f"Input file '{input}' does not exist")
 
     # Check if the output file exists
-    if os.path.exists(opt.output) and not force:
+    if batch:
+        if os.path.isdir(output) and len(os.listdir(output)) > 0 and not force:
+            raise Exception(
+                f"Output directory '{output}' is not empty\nUse --force or -f to overwrite its content")
+
+        if os.path.isfile(output):
+            raise Exception(f"Output '{output}' is a file, a directory is expected in batch mode")
+
+    elif os.path.exists(output) and not force:
         raise Exception(
-            f"Output file '{opt.output}' already exists\nUse --force or -f to overwrite it")
+            f"Output file '{output}' already exists\nUse --force or -f to overwrite it")
@@ -0,0 +1,118 @@
+import os
+import multiprocessing
+
+from src import blueprint, network, blueprint_analyser
+
+# -----------------------------------------------------------
+# Evaluate populations of blueprints for optimisation loops
+# The blueprints are given as decoded dictionaries, they are
+# not displayed and no analysed blueprint is built: each one
+# gets a compact fitness record read from its network
+#
+# Usage:
+#   records = evaluate_population(bp_jsons)
+#
+#   with PopulationEvaluator(jobs=8) as evaluator:
+#       for generation in range(100):
+#           records = evaluator.evaluate(bp_jsons)
+#           ...
+# -----------------------------------------------------------
+
+
+def evaluate_blueprint(bp_json):
+    # Fitness record of a decoded blueprint
+    # Format: {
+    #     "output": 0.84,                          items per second leaving the blueprint
+    #     "items_output": {"transport-belt": 0.84},
+    #     "nb_bottlenecks": 2,                     bottleneck entities
+    #     "mean_usage": 0.61,                      mean usage rate of the entities
+    # }
+    # If the analysis fails: {"error": "RecursionError: ..."}
+    try:
+        bp = blueprint.Blueprint(bp_json)
+        nw = network.create_network(bp)
+        nw.calculate_bottleneck()
+        return get_fitness(nw)
+
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def get_fitness(nw):
+    # Fitness record of a calculated network, see evaluate_blueprint
+    items_output = {}
+    for node in nw.leaf_nodes():
+        for (item_name, amount) in node.flow.items.items():
+            items_output[item_name] = items_output.get(item_name, 0) + amount
+
+    # The compacted entities have the usage rate of their node
+    nb_bottlenecks = 0
+    nb_used_entities = 0
+    total_usage = 0
+
+    for node in nw.nodes:
+        if node.usage_ratio is None:
+            continue
+
+        nb_entities = 1 + len(node.compacted_nodes)
+        nb_used_entities += nb_entities
+        total_usage += node.usage_ratio * nb_entities
+
+        if nw.is_bottleneck(node):
+            nb_bottlenecks += nb_entities
+
+    return {
+        "output": sum(items_output.values()),
+        "items_output": items_output,
+        "nb_bottlenecks": nb_bottlenecks,
+        "mean_usage": total_usage / nb_used_entities if nb_used_entities > 0 else 0,
+    }
+
+
+def evaluate_population(bp_jsons, pool=None, jobs=None):
+    # Fitness records of the blueprints, in the same order
+    # pool: pool of worker processes created by
+    # blueprint_analyser.create_pool, the blueprints are
+    # evaluated in this process if None
+    # jobs: number of processes of the pool, all the cores if None
+    if pool is None:
+        return [evaluate_blueprint(bp_json) for bp_json in bp_jsons]
+
+    # Sending the blueprints by chunks reduces the inter process
+    # communication cost, a few chunks per process balance the load
+    nb_processes = jobs if jobs is not None else os.cpu_count()
+    chunksize = max(1, min(64, len(bp_jsons) // (nb_processes * 4)))
+
+    return pool.map(evaluate_blueprint, bp_jsons, chunksize)
+
+
+class PopulationEvaluator:
+    # Evaluate populations with a pool of worker processes kept
+    # between the calls, the workers load the config and the
+    # Factorio data once
+    # jobs: number of processes, all the cores are used if None,
+    # with 1 the populations are evaluated in this process
+
+    def __init__(self, jobs=None):
+        self.jobs = jobs if jobs is not None else os.cpu_count()
+        self.pool = None
+
+        # A pool worker can't have child processes
+        if self.jobs > 1 and not multiprocessing.current_process().daemon:
+            self.pool = blueprint_analyser.create_pool(self.jobs)
+
+    def evaluate(self, bp_jsons):
+        # Fitness records of the blueprints, see evaluate_blueprint
+        return evaluate_population(bp_jsons, self.pool, self.jobs)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,198 @@
+import os
+import json
+
+from src import utils, analysis_result
+
+# Optional binary encoding
+# The binary format is MessagePack, it needs the msgpack package
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# -----------------------------------------------------------
+# Write the analysis of a blueprint or blueprint book in a file
+# Formats:
+#   json     indented JSON, the default
+#   compact  JSON without spaces
+#   ndjson   one JSON record per line, the entities are written
+#            one by one, see get_records
+#   binary   MessagePack
+#
+# A field selector keeps only some top level fields of the
+# analysis, for example only the items_output and the
+# entities_bottleneck, without the blueprint and its entities
+#
+# Usage:
+#   write_analysis(analysis, "analysis.ndjson", "ndjson",
+#                  fields=["items_output", "entities_bottleneck"])
+#   analysis = read_analysis("analysis.ndjson")
+# -----------------------------------------------------------
+
+# Format: {format: file extension}
+formats = {
+    "json": ".json",
+    "compact": ".json",
+    "ndjson": ".ndjson",
+    "binary": ".msgpack",
+}
+
+default_format = "json"
+
+# Top level fields of a blueprint analysis
+analysis_fields = ["blueprint", "items_input", "items_output", "entities_input",
+                   "entities_output", "entities_bottleneck", "instrumentation"]
+
+
+def check_format(export_format):
+    if export_format not in formats:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(formats)}")
+
+    if export_format == "binary" and msgpack is None:
+        raise ImportError("The binary export format needs MessagePack: pip install msgpack")
+
+
+def check_fields(fields):
+    for field in fields:
+        if field not in analysis_fields:
+            raise ValueError(f"Unknown analysis field '{field}', expected some of {', '.join(analysis_fields)}")
+
+
+def get_format(path):
+    # Format of a file, from its extension
+    extension = os.path.splitext(path)[1]
+    for (export_format, format_extension) in formats.items():
+        if extension == format_extension:
+            return export_format
+
+    raise ValueError(f"Unknown format of '{path}', expected one of the extensions {', '.join(set(formats.values()))}")
+
+
+def select_fields(analysis, fields):
+    # The analysis with only the given top level fields, all the
+    # fields if None. The fields of a book are selected in each page
+    if fields is None:
+        return analysis
+
+    if "pages" in analysis:
+        pages = {}
+        for (key, page) in analysis["pages"].items():
+            if "analysis" in page:
+                page = {**page, "analysis": select_fields(page["analysis"], fields)}
+            pages[key] = page
+
+        return {**analysis, "pages": pages}
+
+    # Only the selected fields of an analysis result are built
+    return {field: analysis[field] for field in analysis if field in fields}
+
+
+def write_analysis(analysis, path, export_format=default_format, fields=None):
+    # Write the analysis of a blueprint or book in the file
+    # fields: top level fields of the analysis to write, all if None
+    check_format(export_format)
+    analysis = select_fields(analysis, fields)
+
+    if export_format == "json":
+        with open(path, "w") as f:
+            f.write(json.dumps(analysis, indent=4, default=utils.json_default))
+
+    elif export_format == "compact":
+        with open(path, "wb") as f:
+            f.write(utils.dumps_json(analysis))
+
+    elif export_format == "ndjson":
+        # Written record by record
+        with open(path, "wb") as f:
+            f.writelines(utils.dumps_json(record) + b"\n" for record in get_records(analysis))
+
+    else:
+        with open(path, "wb") as f:
+            f.write(msgpack.packb(analysis, default=utils.json_default))
+
+
+def read_analysis(path, export_format=None):
+    # Read an analysis written by write_analysis
+    # export_format: the format of the file extension if None
+    if export_format is None:
+        export_format = get_format(path)
+    check_format(export_format)
+
+    if export_format == "ndjson":
+        with open(path, "rb") as f:
+            return from_records(utils.loads_json(line) for line in f if line.strip() != b"")
+
+    with open(path, "rb") as f:
+        if export_format == "binary":
+            return msgpack.unpackb(f.read(), strict_map_key=False)
+
+        return utils.load_json(f)
+
+
+def get_records(analysis):
+    # NDJSON records of an analysis, the entities of the
+    # blueprints are given one by one after their analysis
+    # Blueprint:
+    #   {"analysis": {"blueprint": {"label": "beltFac1", ...}, "items_output": [...], ...}}
+    #   {"entity": {"entity_number": 1, "name": "transport-belt", ...}}
+    #   {"entity": {"entity_number": 2, ...}}
+    # Book:
+    #   {"book": {"blueprint_book": {...}, "nb_pages": 2, ...}}
+    #   {"page": "0", "label": "Gears", "analysis": {...}}
+    #   {"page": "0", "entity": {...}}
+    #   {"page": "1.0", "label": "Plates", "error": "..."}
+    if "pages" not in analysis:
+        yield from _get_blueprint_records(analysis, {})
+        return
+
+    yield {"book": {key: value for (key, value) in analysis.items() if key != "pages"}}
+
+    for (key, page) in analysis["pages"].items():
+        if "analysis" not in page:
+            yield {"page": key, **page}
+            continue
+
+        page_info = {name: value for (name, value) in page.items() if name != "analysis"}
+        yield from _get_blueprint_records(page["analysis"], {"page": key, **page_info})
+
+
+def _get_blueprint_records(analysis, page_info):
+    # The entities list of the blueprint is written empty
+    # The entities of an analysis result are built one by one
+    entities = []
+    if isinstance(analysis, analysis_result.AnalysisResult) and "blueprint" in analysis.computed:
+        entities = analysis.iter_entities()
+        analysis = {field: analysis.get_blueprint(entities=[]) if field == "blueprint" else analysis[field]
+                    for field in analysis}
+
+    elif "blueprint" in analysis and "entities" in analysis["blueprint"]:
+        entities = analysis["blueprint"]["entities"]
+        analysis = {**analysis, "blueprint": {**analysis["blueprint"], "entities": []}}
+
+    yield {**page_info, "analysis": analysis}
+
+    page_key = {"page": page_info["page"]} if "page" in page_info else {}
+    for entity in entities:
+        yield {**page_key, "entity": entity}
+
+
+def from_records(records):
+    # Analysis of its NDJSON records, see get_records
+    analysis = None
+
+    for record in records:
+        if "book" in record:
+            analysis = {**record["book"], "pages": {}}
+
+        elif "entity" in record:
+            blueprint = analysis if "page" not in record else analysis["pages"][record["page"]]["analysis"]
+            blueprint["blueprint"]["entities"].append(record["entity"])
+
+        elif "page" in record:
+            page = {name: value for (name, value) in record.items() if name != "page"}
+            analysis["pages"][record["page"]] = page
+
+        else:
+            analysis = record["analysis"]
+
+    return analysis
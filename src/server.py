@@ -0,0 +1,307 @@
+import os
+import json
+import stat
+import time
+import signal
+import threading
+import collections
+import socketserver
+import multiprocessing
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import blueprint, blueprint_analyser, config, utils
+
+# -----------------------------------------------------------
+# Local analysis server
+# The config and the Factorio data are loaded once, by the
+# server and by a pool of worker processes analysing the
+# requests. The server listens over HTTP on a TCP address or
+# on a Unix socket
+#
+# Requests:
+#   POST /analyse   body: blueprint string or JSON, blueprint
+#                   or book, answers the analysis JSON
+#   GET /health     server metrics
+#
+# Errors are answered as {"error": "..."} with the status:
+#   400 the body is not a blueprint
+#   422 the analysis failed
+#   503 too many requests are pending
+#   504 the analysis took longer than the timeout
+#
+# Usage:
+#   with AnalysisServer(("127.0.0.1", 8000), jobs=4) as server:
+#       server.serve_forever()
+# -----------------------------------------------------------
+
+default_address = "127.0.0.1:8000"
+
+# Number of analyses the latency percentiles are measured on
+latency_window = 1000
+
+
+def parse_address(address):
+    # Returns the (host, port) of a "host:port" address, or the
+    # socket path of a "unix:/run/analyser.sock" address
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+
+    (host, separator, port) = address.rpartition(":")
+    if separator == "" or not port.isdigit():
+        raise ValueError(f"Invalid server address '{address}', expected host:port or unix:path")
+
+    return (host or "127.0.0.1", int(port))
+
+
+def decode_body(body):
+    # Decoded blueprint of a request body, JSON or exported string
+    body = body.strip()
+    if body.startswith(b"{"):
+        return utils.loads_json(body)
+
+    return utils.decode(body.decode("ascii"))
+
+
+def analyse_request(body):
+    # Analyse the body of a request, in a worker process
+    # Returns (HTTP status, JSON bytes)
+    try:
+        bp_json = decode_body(body)
+    except Exception as e:
+        return (400, dump_error(f"Invalid blueprint, {type(e).__name__}: {e}"))
+
+    if not isinstance(bp_json, dict) or \
+            ("blueprint" not in bp_json and not blueprint.is_blueprint_book(bp_json)):
+        return (400, dump_error("Invalid blueprint, no blueprint or blueprint book found"))
+
+    try:
+        analysis = blueprint_analyser.analyse_blueprint(bp_json)
+    except Exception as e:
+        return (422, dump_error(f"{type(e).__name__}: {e}"))
+
+    return (200, json.dumps(analysis, default=utils.json_default).encode("utf8"))
+
+
+def dump_error(message):
+    return json.dumps({"error": message}).encode("utf8")
+
+
+def serve(address=default_address, jobs=None):
+    # Run the server until it is interrupted
+    # address: "host:port" or "unix:path", see parse_address
+    with AnalysisServer(parse_address(address), jobs) as server:
+        utils.success(f"Analysis server listening on {address} with {server.jobs} workers")
+
+        # Stopped like with Ctrl+C, the workers are already started
+        # and keep the default handler
+        signal.signal(signal.SIGTERM, _interrupt)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+class AnalysisServer:
+    # address: (host, port) or Unix socket path
+    # jobs: number of worker processes, all the cores are used if None
+    # timeout: seconds to wait for an analysis, from the config if None
+    # max_pending: requests waiting for a worker, from the config if None
+
+    def __init__(self, address, jobs=None, timeout=None, max_pending=None):
+        settings = config.get_settings()
+        self.timeout = settings.server_timeout if timeout is None else timeout
+        self.max_pending = settings.server_max_pending if max_pending is None else max_pending
+        self.jobs = jobs if jobs is not None else os.cpu_count()
+
+        if isinstance(address, str):
+            _remove_socket(address)
+            self.http_server = UnixHTTPServer(address, RequestHandler)
+        else:
+            self.http_server = ThreadingHTTPServer(address, RequestHandler)
+        self.http_server.analysis_server = self
+
+        self.pool = blueprint_analyser.create_pool(self.jobs)
+
+        # A request holds a slot until its analysis ends, even after
+        # a timeout, so that the pool queue stays bounded
+        self.slots = threading.BoundedSemaphore(self.jobs + self.max_pending)
+
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.pending = 0
+        self.counters = {"requests": 0, "errors": 0, "timeouts": 0, "rejected": 0}
+        self.latencies = collections.deque(maxlen=latency_window)
+
+    @property
+    def address(self):
+        return self.http_server.server_address
+
+    def serve_forever(self):
+        self.http_server.serve_forever()
+
+    def shutdown(self):
+        # Stop serve_forever, from another thread
+        self.http_server.shutdown()
+
+    def close(self):
+        self.http_server.server_close()
+        self.pool.terminate()
+        self.pool.join()
+
+        if isinstance(self.address, str):
+            _remove_socket(self.address)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def analyse(self, body):
+        # Analyse a request body in the pool
+        # Returns (HTTP status, JSON bytes)
+        if not self.slots.acquire(blocking=False):
+            self._record(503)
+            return (503, dump_error("Too many pending requests"))
+
+        with self.lock:
+            self.pending += 1
+
+        start = time.perf_counter()
+        result = self.pool.apply_async(analyse_request, (body,),
+                                       callback=self._release,
+                                       error_callback=self._release)
+        try:
+            (status, data) = result.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            (status, data) = (504, dump_error(f"Analysis longer than {self.timeout} seconds"))
+        except Exception as e:
+            (status, data) = (500, dump_error(f"{type(e).__name__}: {e}"))
+
+        self._record(status, time.perf_counter() - start)
+        return (status, data)
+
+    def _release(self, result):
+        with self.lock:
+            self.pending -= 1
+        self.slots.release()
+
+    def _record(self, status, latency=None):
+        with self.lock:
+            self.counters["requests"] += 1
+            if status == 503:
+                self.counters["rejected"] += 1
+            elif status == 504:
+                self.counters["timeouts"] += 1
+            elif status != 200:
+                self.counters["errors"] += 1
+
+            if latency is not None:
+                self.latencies.append(latency)
+
+    def get_metrics(self):
+        # Format: {
+        #     "status": "ok",
+        #     "uptime": 120.5,       seconds
+        #     "jobs": 4,
+        #     "pending": 1,          requests analysed or waiting for a worker
+        #     "requests": 52,
+        #     "errors": 2,           invalid blueprints and failed analyses
+        #     "timeouts": 0,
+        #     "rejected": 0,
+        #     "latency": {"p50": 0.004, "p95": 0.021, "max": 0.31},
+        # }
+        # The latencies are in seconds, on the last analyses
+        with self.lock:
+            latencies = sorted(self.latencies)
+            metrics = {
+                "status": "ok",
+                "uptime": time.monotonic() - self.start_time,
+                "jobs": self.jobs,
+                "pending": self.pending,
+                **self.counters,
+            }
+
+        metrics["latency"] = {
+            "p50": _percentile(latencies, 0.5),
+            "p95": _percentile(latencies, 0.95),
+            "max": latencies[-1] if len(latencies) > 0 else None,
+        }
+        return metrics
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # The connections are kept alive between the requests
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # The Unix sockets have no Nagle algorithm to disable
+        if not isinstance(self.client_address, tuple):
+            self.disable_nagle_algorithm = False
+        super().setup()
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/health":
+            metrics = self.server.analysis_server.get_metrics()
+            self.send_json(200, json.dumps(metrics).encode("utf8"))
+        else:
+            self.send_json(404, dump_error(f"Unknown path {self.path}"))
+
+    def do_POST(self):
+        length = self.headers.get("Content-Length")
+        if length is None or not length.isdigit():
+            self.close_connection = True
+            self.send_json(411, dump_error("Content-Length expected"))
+            return
+
+        body = self.rfile.read(int(length))
+
+        if urlsplit(self.path).path != "/analyse":
+            self.send_json(404, dump_error(f"Unknown path {self.path}"))
+            return
+
+        self.send_json(*self.server.analysis_server.analyse(body))
+
+    def send_json(self, status, data):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # The clients of a Unix socket have no address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        utils.verbose(f"{self.address_string()} - {format % args}")
+
+
+def _interrupt(signal_number, frame):
+    raise KeyboardInterrupt
+
+
+def _percentile(values, ratio):
+    # Nearest rank percentile of the sorted values
+    if len(values) == 0:
+        return None
+
+    return values[min(len(values) - 1, int(ratio * len(values)))]
+
+
+def _remove_socket(path):
+    # Remove the socket file left by a previous server
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
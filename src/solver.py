@@ -0,0 +1,603 @@
+import heapq
+from collections import deque
+
+from src import utils, instrumentation
+
+# -----------------------------------------------------------
+# Max flow solver of the network flows
+# Alternative to the ask_flow / take_back_flow negotiation of
+# the nodes, selected with the "bottleneck.solver" config key
+#
+# The flow of each item is a maximum flow problem:
+#   - the transport nodes are split in an input and an output
+#     vertex, linked by an arc with the entity speed as capacity
+#   - the inputs (root nodes) and the assembling machines producing
+#     the item are the sources, the outputs (leaf nodes) and the
+#     machines using the item as ingredient are the sinks, the
+#     machines are served before the outputs
+# The problems are solved with Dinic's algorithm, in O(V²E)
+#
+# The recipes ratios link the problems of the different items,
+# the items are solved in the recipes order, ingredients first:
+#   - forward pass: the machines produce what their received
+#     ingredients allow, the transport capacity used by an item
+#     is not available for the next items
+#   - backward pass: the ingredients flows are reduced to what
+#     the machines really use for the items taken by their childs
+# A transport capacity shared by several items is given to them in
+# this order, only the capacity of the inserters feeding a machine
+# is shared between its ingredients, by the recipe ratios
+# -----------------------------------------------------------
+
+UNLIMITED = float("inf")
+
+# Capacity of the outputs without speed (chests), same as the negotiation
+output_capacity_without_speed = 10000
+
+# Flows smaller than this are considered as empty
+epsilon = 1e-9
+
+# Maximum number of forward passes, see MaxFlowSolver.solve
+max_forward_passes = 4
+
+# Usage ratio from which the nodes of a minimum cut are bottlenecks
+saturated_usage_ratio = 1 - 1e-6
+
+
+class FlowGraph:
+    # Directed graph with capacities on the arcs
+    # The arcs are stored in lists, the arc i ^ 1 is the reverse arc
+    # of the arc i, its capacity is the flow sent through the arc i
+    def __init__(self):
+        self.arcs = []  # Format: [[arc_index, ...]] by vertex
+        self.targets = []
+        self.capacities = []  # Residual capacities
+
+        # Number of levels graphs built by max_flow
+        self.nb_phases = 0
+
+    @property
+    def nb_vertices(self):
+        return len(self.arcs)
+
+    def add_vertex(self):
+        self.arcs.append([])
+        return len(self.arcs) - 1
+
+    def add_arc(self, origin, target, capacity):
+        # Returns the arc index
+        arc = len(self.targets)
+
+        self.targets += [target, origin]
+        self.capacities += [capacity, 0]
+        self.arcs[origin].append(arc)
+        self.arcs[target].append(arc + 1)
+
+        return arc
+
+    def set_capacity(self, arc, capacity):
+        # Change the capacity of an arc without flow
+        self.capacities[arc] = capacity
+
+    def get_flow(self, arc):
+        return self.capacities[arc ^ 1]
+
+    def max_flow(self, source, sink):
+        # Dinic's algorithm: the shortest augmenting paths are
+        # saturated by phases, a phase sends a blocking flow
+        # in the levels graph of the residual graph
+        total_flow = 0
+
+        while True:
+            levels = self.get_levels(source)
+            self.nb_phases += 1
+            if levels[sink] < 0:
+                return total_flow
+
+            total_flow += self.send_blocking_flow(source, sink, levels)
+
+    def get_levels(self, source):
+        # Distance from the source in the residual graph, -1 if unreachable
+        levels = [-1] * self.nb_vertices
+        levels[source] = 0
+        queue = deque([source])
+
+        while len(queue) > 0:
+            vertex = queue.popleft()
+
+            for arc in self.arcs[vertex]:
+                target = self.targets[arc]
+                if levels[target] < 0 and self.capacities[arc] > epsilon:
+                    levels[target] = levels[vertex] + 1
+                    queue.append(target)
+
+        return levels
+
+    def send_blocking_flow(self, source, sink, levels):
+        # Send flow through the paths of the levels graph until they
+        # are all saturated, returns the amount of flow sent
+        # The paths are searched without recursion, as they can be
+        # as long as a belt line
+        arcs = self.arcs
+        targets = self.targets
+        capacities = self.capacities
+
+        # Next arc to try for each vertex, the arcs that lead
+        # to a dead end are not tried again
+        next_arcs = [0] * self.nb_vertices
+
+        sent_flow = 0
+        path = []
+        vertex = source
+
+        while True:
+            if vertex == sink:
+                path_flow = min(capacities[arc] for arc in path)
+                if path_flow == UNLIMITED:
+                    raise ValueError("Unlimited flow between the source and the sink")
+
+                saturated_arc_index = None
+                for (i, arc) in enumerate(path):
+                    capacities[arc] -= path_flow
+                    capacities[arc ^ 1] += path_flow
+
+                    if saturated_arc_index is None and capacities[arc] <= epsilon:
+                        saturated_arc_index = i
+
+                sent_flow += path_flow
+
+                # The search continues from the first saturated arc
+                del path[saturated_arc_index:]
+                vertex = targets[path[-1]] if len(path) > 0 else source
+                continue
+
+            vertex_arcs = arcs[vertex]
+            next_level = levels[vertex] + 1
+
+            while next_arcs[vertex] < len(vertex_arcs):
+                arc = vertex_arcs[next_arcs[vertex]]
+                if capacities[arc] > epsilon and levels[targets[arc]] == next_level:
+                    break
+                next_arcs[vertex] += 1
+
+            else:
+                # Dead end, we go back to the previous vertex
+                # and try its next arc
+                if len(path) == 0:
+                    return sent_flow
+
+                arc = path.pop()
+                vertex = targets[arc ^ 1]
+                next_arcs[vertex] += 1
+                continue
+
+            path.append(arc)
+            vertex = targets[arc]
+
+    def get_reachable_vertices(self, source):
+        # Vertices reachable from the source in the residual graph
+        # After a max flow, they are the source side of a minimum cut
+        return [level >= 0 for level in self.get_levels(source)]
+
+
+class ItemFlow:
+    # Solution of the max flow problem of one item
+    def __init__(self, item_name):
+        self.item_name = item_name
+
+        # Format: {node: amount}
+        self.transported = {}  # Transport nodes
+        self.produced = {}  # Machines producing the item
+        self.consumed = {}  # Machines using the item as ingredient
+        self.outputs = {}  # Leaf transport nodes
+
+        # Nodes of the minimum cut, they limit the item flow
+        self.cut_nodes = []
+
+
+class MaxFlowSolver:
+    def __init__(self, network):
+        self.network = network
+
+        # Flow of all the items already solved in each transport node
+        # Format: {node: amount}
+        self.used_capacities = {}
+
+        # Amount of item the machines can produce with their ingredients
+        # Format: {node: amount}
+        self.production_capacities = {}
+
+        # Usage ratio that the machines parents can feed
+        # Format: {node: usage ratio}
+        self.usage_bounds = {}
+
+        # Position of the items in the solve order
+        # Format: {item_name: rank}
+        self.items_rank = {}
+
+        # Format: {item_name: ItemFlow}
+        self.forward_flows = {}
+        self.flows = {}
+
+        self.nb_problems = 0
+        self.nb_phases = 0
+
+    def solve(self):
+        # As for the negotiation, the items of the outputs
+        # are deduced from their parents
+        for node in self.network.leaf_nodes():
+            node.get_materials_output()
+
+        items_order = self.get_items_order()
+
+        self.items_rank = {item_name: rank for (rank, item_name) in enumerate(items_order)}
+
+        # The first forward pass shares the transport capacity between
+        # the items, the next ones give to each item the capacity left
+        # by the others, until the machines do not receive more items
+        consumed_amount = None
+        for _ in range(max_forward_passes):
+            self.production_capacities = {}
+
+            for item_name in items_order:
+                self.forward_flows[item_name] = self.solve_forward(
+                    item_name, share_capacity=consumed_amount is None)
+
+            previous_consumed_amount = consumed_amount
+            consumed_amount = sum(sum(item_flow.consumed.values())
+                                  for item_flow in self.forward_flows.values())
+
+            if previous_consumed_amount is not None and\
+                    consumed_amount <= previous_consumed_amount + epsilon:
+                break
+
+        for item_name in reversed(items_order):
+            self.flows[item_name] = self.solve_backward(item_name)
+
+        self.set_nodes_flow(items_order)
+        self.network.bottleneck_nodes = self.get_bottleneck_nodes()
+
+        instrumentation.count("max_flow_problems", self.nb_problems)
+        instrumentation.count("max_flow_phases", self.nb_phases)
+
+    def get_items_order(self):
+        # Items sorted so that the ingredients of a recipe come before
+        # its result, by name when they are independent
+        # The items of recipes loops are added at the end
+        items = set()
+        ingredients_of = {}
+
+        for node in self.network.nodes:
+            if node.node_type == "transport_node":
+                if node.transported_items is not None:
+                    items.update(item.name for item in node.transported_items)
+
+            elif node.entity.recipe is not None:
+                result_name = node.entity.recipe.result.name
+                items.add(result_name)
+
+                for ingredient in node.entity.recipe.ingredients:
+                    items.add(ingredient.name)
+                    ingredients_of.setdefault(result_name, set()).add(ingredient.name)
+
+        results_of = {item_name: set() for item_name in items}
+        nb_ingredients = {item_name: 0 for item_name in items}
+
+        for (result_name, ingredients) in ingredients_of.items():
+            for ingredient_name in ingredients:
+                if ingredient_name != result_name:
+                    results_of[ingredient_name].add(result_name)
+                    nb_ingredients[result_name] += 1
+
+        ready_items = [item_name for item_name in items if nb_ingredients[item_name] == 0]
+        heapq.heapify(ready_items)
+
+        items_order = []
+        while len(ready_items) > 0:
+            item_name = heapq.heappop(ready_items)
+            items_order.append(item_name)
+
+            for result_name in results_of[item_name]:
+                nb_ingredients[result_name] -= 1
+                if nb_ingredients[result_name] == 0:
+                    heapq.heappush(ready_items, result_name)
+
+        ordered_items = set(items_order)
+        items_order += sorted(item_name for item_name in items
+                              if item_name not in ordered_items)
+
+        return items_order
+
+    def solve_forward(self, item_name, share_capacity=False):
+        # Maximum flow of the item with its previous flow and
+        # the transport capacity left by the other items
+        # With share_capacity, the capacity left is shared between
+        # the items of the node not solved yet
+        previous_flow = self.forward_flows.get(item_name, ItemFlow(item_name))
+
+        def node_capacity(node):
+            capacity_left = self.get_capacity_left(node, node.entity.speed)
+            if share_capacity:
+                capacity_left /= self.count_items_left(node, item_name)
+
+            return previous_flow.transported.get(node, 0) + capacity_left
+
+        def output_capacity(node):
+            if node.entity.speed is None:
+                return previous_flow.outputs.get(node, 0) +\
+                    self.get_capacity_left(node, output_capacity_without_speed)
+            return UNLIMITED
+
+        def production_capacity(node):
+            if node not in self.production_capacities:
+                self.production_capacities[node] = \
+                    self.get_production_usage(node) * node.entity.items_per_second
+            return self.production_capacities[node]
+
+        def consumption_capacity(node):
+            return self.get_usage_bound(node) * node.entity.required_items_per_second[item_name]
+
+        item_flow = self.solve_item(item_name, node_capacity, output_capacity,
+                                    production_capacity, consumption_capacity,
+                                    find_cut=True)
+
+        self.update_used_capacities(previous_flow, item_flow)
+        return item_flow
+
+    def count_items_left(self, node, item_name):
+        # Number of items of the node not solved yet, with the given one
+        rank = self.items_rank[item_name]
+        return len({transported_item.name for transported_item in node.transported_items
+                    if self.items_rank[transported_item.name] >= rank})
+
+    def update_used_capacities(self, previous_flow, item_flow):
+        for node in previous_flow.transported.keys() | item_flow.transported.keys():
+            self.used_capacities[node] = self.used_capacities.get(node, 0) +\
+                item_flow.transported.get(node, 0) - previous_flow.transported.get(node, 0)
+
+    def solve_backward(self, item_name):
+        # The flow of the item given to the machines is reduced to what
+        # they really use, the items left can go to the outputs
+        forward_flow = self.forward_flows[item_name]
+
+        demands = {}
+        for (node, consumed_amount) in forward_flow.consumed.items():
+            demands[node] = min(consumed_amount,
+                                self.get_final_usage(node) * node.entity.required_items_per_second[item_name])
+
+        if all(consumed_amount - demands[node] <= epsilon
+               for (node, consumed_amount) in forward_flow.consumed.items()):
+            return forward_flow
+
+        # The item can use its forward flow and the capacity that no
+        # item used in the forward pass, so the reduced demands can be
+        # given and the flows of the other items stay possible
+
+        def node_capacity(node):
+            return forward_flow.transported.get(node, 0) +\
+                self.get_capacity_left(node, node.entity.speed)
+
+        def output_capacity(node):
+            if node.entity.speed is None:
+                return forward_flow.outputs.get(node, 0) +\
+                    self.get_capacity_left(node, output_capacity_without_speed)
+            return UNLIMITED
+
+        item_flow = self.solve_item(item_name, node_capacity, output_capacity,
+                                    lambda node: self.production_capacities[node],
+                                    lambda node: demands[node])
+
+        for (node, amount) in item_flow.transported.items():
+            added_amount = amount - forward_flow.transported.get(node, 0)
+            if added_amount > 0:
+                self.used_capacities[node] += added_amount
+
+        return item_flow
+
+    def get_capacity_left(self, node, capacity):
+        if capacity is None:
+            return UNLIMITED
+        return max(0, capacity - self.used_capacities.get(node, 0))
+
+    def get_production_usage(self, node):
+        # Usage ratio of the machine allowed by the ingredients it received
+        if len(node.parents) == 0:
+            # If no parents, we are an input,
+            # so we supose that we have all the elements we need
+            return 1
+
+        usage = 1
+        for ingredient in node.entity.recipe.ingredients:
+            ingredient_flow = self.forward_flows.get(ingredient.name)
+            if ingredient_flow is None:
+                # Ingredient of a recipes loop, not solved yet
+                return 0
+
+            received_amount = ingredient_flow.consumed.get(node, 0)
+            usage = min(usage, received_amount /
+                        node.entity.required_items_per_second[ingredient.name])
+
+        return usage
+
+    def get_usage_bound(self, node):
+        # Upper bound of the machine usage ratio: all the ingredients
+        # are brought by the parents, so the machine cannot use more
+        # than their capacity. The ingredients ask for their share of
+        # it instead of the first solved one taking all of it
+        if node not in self.usage_bounds:
+            parents_capacity = 0
+            for parent in dict.fromkeys(node.parents):
+                if parent.node_type != "transport_node" or parent.entity.speed is None:
+                    parents_capacity = UNLIMITED
+                    break
+                parents_capacity += parent.entity.speed
+
+            required_amount = sum(node.entity.required_items_per_second[ingredient.name]
+                                  for ingredient in node.entity.recipe.ingredients)
+
+            self.usage_bounds[node] = min(1, parents_capacity / required_amount)
+
+        return self.usage_bounds[node]
+
+    def get_final_usage(self, node):
+        # Usage ratio of the machine for the items taken by its childs
+        result_name = node.entity.recipe.result.name
+        result_flow = self.flows.get(result_name, self.forward_flows.get(result_name))
+
+        if result_flow is None:
+            return 0
+
+        return result_flow.produced.get(node, 0) / node.entity.items_per_second
+
+    def solve_item(self, item_name, node_capacity, output_capacity,
+                   production_capacity, consumption_capacity, find_cut=False):
+        # Build and solve the max flow problem of the item
+        graph = FlowGraph()
+        source = graph.add_vertex()
+        sink = graph.add_vertex()
+
+        # Format: {node: (input vertex, output vertex, capacity arc)}
+        transport_vertices = {}
+        # Format: {node: (vertex, source or sink arc)}
+        producer_vertices = {}
+        consumer_vertices = {}
+
+        # The sinks are served by stages: the machines using the item,
+        # those making the first items of the solve order first, as they
+        # make the intermediate products of the other machines, then
+        # the outputs
+        # Format: {node: arc}, {stage: [(arc, capacity)]}
+        output_arcs = {}
+        sinks_stages = {}
+        outputs_stage = len(self.items_rank)
+
+        for node in self.network.nodes:
+            if node.node_type == "transport_node":
+                if not node.is_item_transported(item_name):
+                    continue
+
+                input_vertex = graph.add_vertex()
+                output_vertex = graph.add_vertex()
+                arc = graph.add_arc(input_vertex, output_vertex, node_capacity(node))
+                transport_vertices[node] = (input_vertex, output_vertex, arc)
+
+                if len(node.parents) == 0:
+                    graph.add_arc(source, input_vertex, UNLIMITED)
+
+                if len(node.childs) == 0:
+                    output_arcs[node] = graph.add_arc(output_vertex, sink, 0)
+                    sinks_stages.setdefault(outputs_stage, []).append(
+                        (output_arcs[node], output_capacity(node)))
+
+            elif node.entity.recipe is not None:
+                recipe = node.entity.recipe
+
+                if recipe.result.name == item_name:
+                    vertex = graph.add_vertex()
+                    arc = graph.add_arc(source, vertex, production_capacity(node))
+                    producer_vertices[node] = (vertex, arc)
+
+                    # The machines without childs are outputs
+                    if len(node.childs) == 0:
+                        sinks_stages.setdefault(outputs_stage, []).append(
+                            (graph.add_arc(vertex, sink, 0), UNLIMITED))
+
+                elif len(node.parents) > 0 and\
+                        any(ingredient.name == item_name for ingredient in recipe.ingredients):
+                    vertex = graph.add_vertex()
+                    arc = graph.add_arc(vertex, sink, 0)
+                    consumer_vertices[node] = (vertex, arc)
+
+                    stage = self.items_rank.get(recipe.result.name, outputs_stage)
+                    sinks_stages.setdefault(stage, []).append(
+                        (arc, consumption_capacity(node)))
+
+        # Links between the nodes
+        for (node, (_, output_vertex, _)) in transport_vertices.items():
+            for child in node.childs:
+                if child in transport_vertices:
+                    graph.add_arc(output_vertex, transport_vertices[child][0], UNLIMITED)
+                elif child in consumer_vertices:
+                    graph.add_arc(output_vertex, consumer_vertices[child][0], UNLIMITED)
+
+        for (node, (vertex, _)) in producer_vertices.items():
+            for child in node.childs:
+                if child in transport_vertices:
+                    graph.add_arc(vertex, transport_vertices[child][0], UNLIMITED)
+
+        # The flow given to the sinks of a stage is kept by the next
+        # stages, the augmenting paths never take back the flow of
+        # the sink arcs
+        for stage in sorted(sinks_stages):
+            for (arc, capacity) in sinks_stages[stage]:
+                graph.set_capacity(arc, capacity)
+
+            graph.max_flow(source, sink)
+
+        self.nb_problems += 1
+        self.nb_phases += graph.nb_phases
+
+        # Read the solution
+        item_flow = ItemFlow(item_name)
+
+        for (node, (_, _, arc)) in transport_vertices.items():
+            item_flow.transported[node] = graph.get_flow(arc)
+
+        for (node, arc) in output_arcs.items():
+            item_flow.outputs[node] = graph.get_flow(arc)
+
+        for (node, (_, arc)) in producer_vertices.items():
+            item_flow.produced[node] = graph.get_flow(arc)
+
+        for (node, (_, arc)) in consumer_vertices.items():
+            item_flow.consumed[node] = graph.get_flow(arc)
+
+        if find_cut:
+            reachable = graph.get_reachable_vertices(source)
+
+            # Transport nodes with their capacity arc in the cut
+            for (node, (input_vertex, output_vertex, _)) in transport_vertices.items():
+                if reachable[input_vertex] and not reachable[output_vertex]:
+                    item_flow.cut_nodes.append(node)
+
+            # Machines producing at full speed, the machines limited
+            # by their ingredients have their cut in the ingredients flows
+            for (node, (vertex, _)) in producer_vertices.items():
+                if not reachable[vertex] and\
+                        production_capacity(node) >= node.entity.items_per_second - epsilon:
+                    item_flow.cut_nodes.append(node)
+
+        return item_flow
+
+    def set_nodes_flow(self, items_order):
+        for item_name in items_order:
+            item_flow = self.flows[item_name]
+
+            for (node, amount) in item_flow.transported.items():
+                if amount > epsilon:
+                    node.flow.add_item(item_name, amount)
+
+            for (node, amount) in item_flow.produced.items():
+                if amount > epsilon:
+                    node.flow.add_item(item_name, amount)
+
+    def get_bottleneck_nodes(self):
+        # Nodes of the minimum cuts still saturated by the final flows
+        bottleneck_nodes = set()
+
+        for item_flow in self.forward_flows.values():
+            for node in item_flow.cut_nodes:
+                if node.usage_ratio is not None and node.usage_ratio >= saturated_usage_ratio:
+                    bottleneck_nodes.add(node)
+
+        return bottleneck_nodes
+
+
+def solve(network):
+    # Set the flow of the network nodes
+    solver = MaxFlowSolver(network)
+    solver.solve()
+
+    utils.verbose(f"{solver.nb_problems} max flow problems solved")
+
+    return solver
@@ -0,0 +1,65 @@
+# -----------------------------------------------------------
+# Sparse 2D storage of the blueprint entities and nodes
+# The grid is split in square chunks, like the Factorio map,
+# only the chunks containing something are allocated so the
+# memory depends on the number of entities and not on the
+# blueprint size
+# -----------------------------------------------------------
+
+CHUNK_SIZE = 32
+
+
+class ChunkedGrid:
+    def __init__(self, width, heigth):
+        self.width = width
+        self.heigth = heigth
+
+        # Format: {
+        #    (chunk_x, chunk_y): [cell_0_0, cell_1_0, ..., cell_31_31]
+        # }
+        self.chunks = {}
+
+    def get(self, x, y):
+        # Returns the content of the cell or None
+        chunk = self.chunks.get((x // CHUNK_SIZE, y // CHUNK_SIZE))
+
+        if chunk is None:
+            return None
+
+        return chunk[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE]
+
+    def set(self, x, y, value):
+        chunk_key = (x // CHUNK_SIZE, y // CHUNK_SIZE)
+        chunk = self.chunks.get(chunk_key)
+
+        if chunk is None:
+            if value is None:
+                return
+
+            chunk = [None] * (CHUNK_SIZE * CHUNK_SIZE)
+            self.chunks[chunk_key] = chunk
+
+        chunk[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE] = value
+
+    def cells(self):
+        # Iterate over the filled cells as (x, y, content) tuples
+        # in the same order as a row by row scan of the whole grid
+
+        chunk_rows = {}
+        for (chunk_x, chunk_y) in self.chunks:
+            chunk_rows.setdefault(chunk_y, []).append(chunk_x)
+
+        for chunk_y in sorted(chunk_rows):
+            chunks_x = sorted(chunk_rows[chunk_y])
+
+            for local_y in range(CHUNK_SIZE):
+                y = chunk_y * CHUNK_SIZE + local_y
+                row_start = local_y * CHUNK_SIZE
+
+                for chunk_x in chunks_x:
+                    chunk = self.chunks[(chunk_x, chunk_y)]
+
+                    for local_x in range(CHUNK_SIZE):
+                        cell = chunk[row_start + local_x]
+                        if cell is not None:
+                            yield (chunk_x * CHUNK_SIZE + local_x, y, cell)
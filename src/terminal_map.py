@@ -0,0 +1,123 @@
+import math
+import shutil
+
+# -----------------------------------------------------------
+# Map of a blueprint for the terminal
+# The map is built row by row in memory and returned as one
+# string, to be written at once. The glyph of an entity only
+# depends on its class, name, direction, recipe and on the
+# tile of the entity, each glyph is colored once per map
+#
+# The map can be cropped to a viewport of the blueprint, and
+# large blueprints are downsampled to fit a maximum size: each
+# character is then a square block of tiles, showing its first
+# large entity (machine, splitter) or else its first entity
+# -----------------------------------------------------------
+
+# Characters before each row of the map
+row_prefix = "    "
+
+
+def get_glyph_key(entity_obj, x, y):
+    # The values of the entity the glyph depends on
+    recipe = getattr(entity_obj, "recipe", None)
+    offset = (x - entity_obj.position[0], y - entity_obj.position[1]) if entity_obj.large else None
+
+    return (type(entity_obj), entity_obj.name, entity_obj.direction,
+            getattr(entity_obj, "belt_type", None),
+            recipe.name if recipe is not None else None, offset)
+
+
+def get_viewport(bp, viewport=None):
+    # Part of the blueprint inside its bounds, as (x, y, width, heigth)
+    # viewport: (x, y, width, heigth) in the blueprint tiles, the
+    # whole blueprint if None
+    if viewport is None:
+        return (0, 0, bp.width, bp.heigth)
+
+    (x, y, width, heigth) = viewport
+    min_x = min(max(x, 0), bp.width)
+    min_y = min(max(y, 0), bp.heigth)
+    max_x = min(max(x + width, min_x), bp.width)
+    max_y = min(max(y + heigth, min_y), bp.heigth)
+
+    return (min_x, min_y, max_x - min_x, max_y - min_y)
+
+
+def get_max_size():
+    # Number of map columns fitting in the terminal, the rows are not limited
+    # Each tile takes two characters
+    columns = shutil.get_terminal_size().columns
+    return (max(1, (columns - len(row_prefix)) // 2), None)
+
+
+def get_step(width, heigth, max_size):
+    # Side of the square block of tiles of each character
+    (max_columns, max_rows) = max_size
+    step = 1
+    if max_columns is not None and width > max_columns:
+        step = math.ceil(width / max_columns)
+    if max_rows is not None and heigth > max_rows:
+        step = max(step, math.ceil(heigth / max_rows))
+
+    return step
+
+
+def render_map(bp, viewport=None, max_size=None):
+    # Returns the map of the blueprint grid, one line per row
+    # viewport: (x, y, width, heigth), the whole blueprint if None
+    # max_size: (columns, rows) of the map, None for no limit, the
+    # blueprint is downsampled to fit it. Fits the terminal width if None
+    (min_x, min_y, width, heigth) = get_viewport(bp, viewport)
+
+    if max_size is None:
+        max_size = get_max_size()
+    step = get_step(width, heigth, max_size)
+
+    nb_columns = math.ceil(width / step)
+    rows = [[" "] * nb_columns for _ in range(math.ceil(heigth / step))]
+
+    # Format: {glyph_key: glyph}
+    glyphs = {}
+
+    # Downsampled blocks showing a large entity
+    # Format: {(column, row)}
+    large_blocks = set()
+
+    for (x, y, entity_obj) in bp.grid.cells():
+        column = (x - min_x) // step
+        row = (y - min_y) // step
+        if x < min_x or y < min_y or column >= nb_columns or row >= len(rows):
+            continue
+
+        line = rows[row]
+        if step > 1:
+            # The large entities are shown by their center
+            if (column, row) in large_blocks or \
+                    (line[column] != " " and not entity_obj.large):
+                continue
+            if entity_obj.large:
+                large_blocks.add((column, row))
+                (x, y) = entity_obj.position
+
+        key = get_glyph_key(entity_obj, x, y)
+        glyph = glyphs.get(key)
+
+        if glyph is None:
+            if entity_obj.large:
+                glyph = entity_obj.to_char([x, y])
+            else:
+                glyph = entity_obj.to_char()
+            glyphs[key] = glyph
+
+        line[column] = glyph
+
+    lines = []
+    if (width, heigth) != (bp.width, bp.heigth) or step > 1:
+        lines.append(f"{row_prefix}tiles [{min_x}, {min_y}] to [{min_x + width - 1}, {min_y + heigth - 1}]"
+                     + (f", one character for {step}x{step} tiles" if step > 1 else ""))
+
+    for line in rows:
+        lines.append(row_prefix + " ".join(line) + " ")
+
+    return "\n".join(lines)
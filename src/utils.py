@@ -1,11 +1,36 @@
 import zlib
 import json
+import codecs
 import sys
 import base64
 from termcolor import colored
 
 from src import config
 
+# Optional JSON backends
+# orjson parses the JSON text faster than the json module and shares
+# the dictionary keys, it is used when it is installed
+# Otherwise, ijson parses the JSON while it is decompressed, without
+# holding the whole JSON text in memory. Its dictionaries don't share
+# their keys, the decoded blueprint takes more memory than with orjson
+#
+# The decoding by chunks only saves the memory of the decompression:
+# the whole base64 and compressed strings are not decoded at once. The
+# peak memory is mostly the decoded blueprint, with orjson the JSON
+# text is held once in memory while it is parsed
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Size of the chunks read from the blueprint strings and files
+decode_chunk_size = 1 << 20
+
 
 def verbose(content, end="\n", level=3):
     # Verbose level
@@ -13,7 +38,7 @@ def verbose(content, end="\n", level=3):
     # 1: only errors
     # 2: errors and warnings
     # 3: errors, warnings and info
-    if config.config.verbose_level >= level:
+    if config.get_settings().verbose_level >= level:
         print(content, end=end, file=sys.stderr, flush=True)
 
 
@@ -26,8 +51,158 @@ def success(content):
 
 
 def decode(string):
-    return json.loads(zlib.decompress(
-        base64.b64decode(string[1:])).decode('utf8'))
+    # Decode an exported blueprint string
+    chunks = (string[i:i + decode_chunk_size]
+              for i in range(0, len(string), decode_chunk_size))
+
+    return parse_json_chunks(decompress_chunks(chunks))
+
+
+def decode_file(file):
+    # Decode the exported blueprint string of an opened text file
+    # The file is read by chunks
+    chunks = iter(lambda: file.read(decode_chunk_size), "")
+
+    return parse_json_chunks(decompress_chunks(chunks))
+
+
+def decompress_chunks(chunks):
+    # Iterate over the JSON bytes of a blueprint string given by chunks
+    # Blueprint string format: version character + base64(zlib(JSON))
+    decompressor = zlib.decompressobj()
+    version_read = False
+
+    # Base64 characters not decoded yet, they are decoded by groups of 4
+    remainder = ""
+
+    for chunk in chunks:
+        # Remove the line breaks of the files
+        chunk = "".join(chunk.split())
+
+        if not version_read and chunk:
+            chunk = chunk[1:]
+            version_read = True
+
+        chunk = remainder + chunk
+        decoded_length = len(chunk) - len(chunk) % 4
+        remainder = chunk[decoded_length:]
+
+        if decoded_length > 0:
+            yield decompressor.decompress(base64.b64decode(chunk[:decoded_length]))
+
+    if remainder:
+        yield decompressor.decompress(base64.b64decode(remainder))
+
+    yield decompressor.flush()
+
+    if not decompressor.eof:
+        raise zlib.error("Incomplete or truncated blueprint string")
+
+
+def use_ijson():
+    return orjson is None and ijson is not None
+
+
+def parse_json_chunks(chunks):
+    # Parse the JSON given by bytes chunks
+    if use_ijson():
+        return load_json(ChunksReader(chunks))
+
+    if orjson is not None:
+        # The chunks are added to a single buffer, not joined at the end,
+        # so the JSON text is in memory only once
+        data = bytearray()
+        for chunk in chunks:
+            data += chunk
+
+        return loads_json(data)
+
+    # The json module parses str, the chunks are decoded one by one
+    # and released before the parsing
+    decoder = codecs.getincrementaldecoder("utf8")()
+    texts = [decoder.decode(chunk) for chunk in chunks]
+    texts.append(decoder.decode(b"", final=True))
+
+    text = "".join(texts)
+    del texts
+
+    return json.loads(text)
+
+
+def load_json(file):
+    # Parse the JSON of a file opened in binary mode
+    if use_ijson():
+        # The JSON is parsed by chunks
+        # The whole file is read to check that nothing follows the JSON
+        (value,) = ijson.items(file, "", use_float=True)
+        return value
+
+    if orjson is None:
+        # The bytes are released before the parsing
+        return json.loads(file.read().decode("utf8"))
+
+    return loads_json(file.read())
+
+
+def loads_json(data):
+    # Parse the JSON bytes with orjson if it is installed
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson does not support all the JSON accepted by the json
+            # module, for example integers bigger than 64 bits
+            pass
+
+    return json.loads(data)
+
+
+def json_default(value):
+    # Serializable value of the objects not supported by the JSON
+    # and MessagePack encoders, like the analysis results
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_json(value):
+    # Compact JSON bytes, with orjson if it is installed
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=json_default)
+        except TypeError:
+            # Integers bigger than 64 bits
+            pass
+
+    return json.dumps(value, separators=(",", ":"), default=json_default).encode("utf8")
+
+
+class ChunksReader:
+    # Read only binary file reading the bytes given by an iterator
+    # A read returns at most the rest of the current chunk
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.chunk = b""
+        self.offset = 0
+
+    def read(self, size=-1):
+        if size < 0:
+            data = self.chunk[self.offset:] + b"".join(self.chunks)
+            self.chunk = b""
+            self.offset = 0
+            return data
+
+        while self.offset >= len(self.chunk):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return b""
+            self.chunk = chunk
+            self.offset = 0
+
+        data = self.chunk[self.offset:self.offset + size]
+        self.offset += len(data)
+        return data
 
 
 def encode(dict):
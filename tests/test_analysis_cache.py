@@ -0,0 +1,157 @@
+from src import blueprint_analyser, blueprint, config, analysis_cache, analysis_result, async_analyser, utils
+from src.instrumentation import Instrumentation
+import asyncio
+import pytest
+import copy
+import os
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    # Enable the analysis cache for the test, it is disabled after it
+    path = str(tmp_path / "analyses.sqlite")
+    config.config.set_config_value(path, "cache", "path")
+    yield path
+
+    config.config.set_config_value(None, "cache", "path")
+    if analysis_cache.opened_cache is not None:
+        analysis_cache.opened_cache[2].close()
+        analysis_cache.opened_cache = None
+
+
+def read_blueprint(blueprint_file):
+    return blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+
+@pytest.mark.parametrize("blueprint_file", ["beltFac8.txt", "circuitFac1.json", "starter_base"])
+def test_cached_analysis(blueprint_file, cache_path):
+    analysis = blueprint_analyser.analyse_blueprint(read_blueprint(blueprint_file))
+
+    recorder = Instrumentation()
+    cached_analysis = blueprint_analyser.analyse_blueprint(
+        read_blueprint(blueprint_file), instrumentation=recorder)
+    measures = cached_analysis.pop("instrumentation")
+
+    assert cached_analysis == analysis
+    assert measures["counters"]["cache_hit"] == 1
+
+    # The cached analysis is read as an analysis result
+    assert isinstance(cached_analysis, analysis_result.AnalysisResult)
+    for i in range(analysis.nb_entities):
+        assert cached_analysis.usage_rate(i) == analysis.usage_rate(i)
+        assert cached_analysis.is_bottleneck(i) == analysis.is_bottleneck(i)
+        assert cached_analysis.transported_items(i) == analysis.transported_items(i)
+    assert "flow" not in measures["phases"]
+
+    statistics = analysis_cache.get_cache().statistics()
+    assert (statistics["entries"], statistics["hits"], statistics["misses"]) == (1, 1, 1)
+
+
+def test_cached_book(cache_path, tmp_path):
+    book = {"blueprint_book": {"item": "blueprint-book", "blueprints": [
+        {**read_blueprint("beltFac1.json"), "index": 0},
+        {**read_blueprint("fur1"), "index": 1},
+    ]}}
+    book_path = tmp_path / "book.txt"
+    book_path.write_text(utils.encode(book))
+
+    analysis = blueprint_analyser.calculate_blueprint_bottleneck(str(book_path), jobs=1)
+    assert analysis["nb_analysed_pages"] == 2
+    cached_analysis = blueprint_analyser.calculate_blueprint_bottleneck(str(book_path), jobs=1)
+    assert cached_analysis == analysis
+    assert analysis_cache.get_cache().statistics()["hits"] == 1
+
+    for page in cached_analysis["pages"].values():
+        assert isinstance(page["analysis"], analysis_result.AnalysisResult)
+
+
+def test_key():
+    bp_json = read_blueprint("beltFac8.txt")
+    key = analysis_cache.get_key(bp_json)
+
+    # The order of the JSON keys does not matter
+    reordered_json = dict(reversed(list(bp_json.items())))
+    reordered_json["blueprint"] = dict(reversed(list(bp_json["blueprint"].items())))
+    assert analysis_cache.get_key(reordered_json) == key
+
+    # The settings of the analysis change the key
+    previous_bonus = config.config.inserter_capacity_bonus
+    config.config.set_config_value(previous_bonus + 1, "factorio", "inserter_capacity_bonus")
+    try:
+        assert analysis_cache.get_key(bp_json) != key
+    finally:
+        config.config.set_config_value(previous_bonus, "factorio", "inserter_capacity_bonus")
+
+    previous_solver = config.config.flow_solver
+    config.config.set_config_value(
+        "maxflow" if previous_solver != "maxflow" else "negotiation", "bottleneck", "solver")
+    try:
+        assert analysis_cache.get_key(bp_json) != key
+    finally:
+        config.config.set_config_value(previous_solver, "bottleneck", "solver")
+
+    assert analysis_cache.get_key(bp_json) == key
+
+
+def test_eviction(tmp_path):
+    cache = analysis_cache.AnalysisCache(str(tmp_path / "analyses.sqlite"), max_size=2000)
+    # Random values, not compressible
+    analyses = {str(i): {"value": os.urandom(250).hex()} for i in range(10)}
+
+    for (key, analysis) in analyses.items():
+        cache.put(key, analysis)
+        # The first analysis is the most recently used
+        assert cache.get("0") == analyses["0"]
+
+    statistics = cache.statistics()
+    assert statistics["size"] <= 2000
+    assert statistics["evictions"] == 10 - statistics["entries"]
+    assert cache.get("9") == analyses["9"]
+    assert cache.get("1") is None
+
+    # An analysis larger than the cache is not stored
+    cache.put("large", {"value": os.urandom(2000).hex()})
+    assert cache.get("large") is None
+
+    cache.clear()
+    assert cache.statistics()["entries"] == 0
+    cache.close()
+
+
+def test_export_bypass(cache_path, tmp_path, monkeypatch):
+    # The network is built when it is displayed or exported
+    bp_json = read_blueprint("beltFac8.txt")
+    blueprint_analyser.analyse_blueprint(copy.deepcopy(bp_json))
+
+    monkeypatch.chdir(tmp_path)
+
+    recorder = Instrumentation()
+    analysis = blueprint_analyser.analyse_blueprint(bp_json, instrumentation=recorder,
+                                                    settings={"network_export": "json"})
+    assert analysis["instrumentation"]["counters"]["cache_hit"] == 0
+
+
+def test_thread_executor(cache_path):
+    # Each thread of the async analyser uses the cache
+    blueprint_files = ["beltFac8.txt", "circuitFac1.json", "starter_base", "fur1"]
+
+    async def analyse():
+        async with async_analyser.AsyncAnalyser("thread", jobs=4) as analyser:
+            return await asyncio.gather(*(analyser.analyse(read_blueprint(blueprint_file))
+                                          for blueprint_file in blueprint_files * 3))
+
+    analyses = asyncio.run(analyse())
+    assert analyses == [blueprint_analyser.analyse_blueprint(read_blueprint(blueprint_file))
+                        for blueprint_file in blueprint_files * 3]
+
+    # Each analysis reads the cache, the ones done at once
+    # by several threads can all be misses
+    statistics = analysis_cache.get_cache().statistics()
+    assert statistics["entries"] == len(blueprint_files)
+    assert statistics["hits"] + statistics["misses"] == len(analyses) * 2
+    assert statistics["hits"] >= len(analyses)
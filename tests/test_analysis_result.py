@@ -0,0 +1,129 @@
+from src import blueprint_analyser, blueprint, network, analysis_result
+import copy
+import json
+import pickle
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+blueprint_files = ["beltFac8.txt", "circuitFac1.json", "starter_base", "fur1", "splitters_suite.json"]
+
+
+def analyse(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    bp.network = network.create_network(bp)
+    bp.network.calculate_bottleneck()
+    return bp
+
+
+@pytest.mark.parametrize("blueprint_file", blueprint_files)
+def test_blueprint_unchanged(blueprint_file):
+    bp_json = blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+    original = copy.deepcopy(bp_json)
+
+    bp = analyse(bp_json)
+    analysis = bp.get_analysis()
+    assert bp_json == original
+
+    # The analysis can be built again, with the same values
+    assert json.dumps(bp.get_analysis()) == json.dumps(analysis)
+
+    for (entity_dic, analysed_entity) in zip(bp_json["blueprint"]["entities"],
+                                             analysis["blueprint"]["entities"]):
+        assert analysed_entity is not entity_dic
+        assert {key: analysed_entity[key] for key in entity_dic} == entity_dic
+
+
+@pytest.mark.parametrize("blueprint_file", blueprint_files)
+def test_result_values(blueprint_file):
+    bp = analyse(blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+    result = bp.get_result()
+    entities = bp.get_analysis()["blueprint"]["entities"]
+
+    assert result.nb_entities == len(entities)
+    for (i, entity_dic) in enumerate(entities):
+        assert result.index(entity_dic["entity_number"]) == i
+        assert result.usage_rate(i) == entity_dic.get("usage_rate")
+        assert result.is_input(i) == entity_dic.get("input", False)
+        assert result.is_output(i) == entity_dic.get("output", False)
+        assert result.transported_items(i) == entity_dic.get("transpoted_items")
+
+        if result.is_bottleneck(i):
+            assert entity_dic["entity_number"] in result.entities_bottleneck
+
+
+def test_result_mapping():
+    bp = analyse(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+    result = bp.get_result()
+    analysis = bp.get_analysis()
+
+    assert list(result) == list(analysis)
+    assert result == analysis
+    assert result["items_output"] == analysis["items_output"]
+    assert "pages" not in result
+
+    # The fields set are kept, in the dictionary too
+    result["instrumentation"] = {"phases": {}}
+    del result["entities_input"]
+    assert result.to_dict() == {**{key: value for (key, value) in analysis.items() if key != "entities_input"},
+                                "instrumentation": {"phases": {}}}
+
+    # The results of the worker processes are pickled
+    assert pickle.loads(pickle.dumps(result)).to_dict() == result.to_dict()
+
+
+@pytest.mark.parametrize("blueprint_file", blueprint_files)
+def test_result_from_dict(blueprint_file):
+    bp = analyse(blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+    result = bp.get_result()
+    read_result = analysis_result.AnalysisResult.from_dict(json.loads(json.dumps(result.to_dict())))
+
+    assert json.dumps(read_result.to_dict()) == json.dumps(result.to_dict())
+    for i in range(result.nb_entities):
+        assert read_result.usage_rate(i) == result.usage_rate(i)
+        assert read_result.flags[i] == result.flags[i]
+        assert read_result.transported_items(i) == result.transported_items(i)
+
+
+def test_result_copies():
+    # The result does not change with the blueprint dictionary, nor with its values
+    bp_json = blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt")
+    result = analyse(bp_json).get_result()
+    analysis = result.to_dict()
+
+    bp_json["blueprint"]["label"] = "Changed"
+    bp_json["blueprint"]["entities"][0]["name"] = "iron-chest"
+    bp_json["blueprint"]["entities"].clear()
+    result["blueprint"]["entities"][0]["position"]["x"] += 1
+    result["items_output"].clear()
+
+    assert result.to_dict() == analysis
+
+
+def test_compacted_entities():
+    # The compacted entities have the values of their node
+    bp = analyse(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+    result = bp.get_result()
+
+    compacted = [(node, compacted_node) for node in bp.network.nodes
+                 for compacted_node in node.compacted_nodes]
+    assert len(compacted) > 0
+
+    for (node, compacted_node) in compacted:
+        index = result.index(node.entity.number)
+        compacted_index = result.index(compacted_node.entity.number)
+
+        assert result.flow_ids[compacted_index] == result.flow_ids[index]
+        assert result.usage_rate(compacted_index) == result.usage_rate(index)
+        assert result.flags[compacted_index] & ~analysis_result.flag_bottleneck \
+            == result.flags[index] & ~analysis_result.flag_bottleneck
+
+
+def test_no_network():
+    bp = blueprint.Blueprint(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+
+    with pytest.raises(Exception):
+        bp.get_result()
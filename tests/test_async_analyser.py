@@ -0,0 +1,134 @@
+from src import blueprint_analyser, blueprint, async_analyser
+import threading
+import asyncio
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+blueprint_files = ["beltFac8.txt", "circuitFac1.json", "starter_base", "fur1"]
+
+
+def read_blueprint(blueprint_file):
+    return blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+
+@pytest.mark.parametrize("executor", async_analyser.executors)
+def test_analyse(executor):
+    async def analyse():
+        async with async_analyser.AsyncAnalyser(executor, jobs=2) as analyser:
+            return await asyncio.gather(
+                analyser.analyse(read_blueprint("beltFac8.txt")),
+                analyser.analyse_file(f"{blueprints_path}/circuitFac1.json"))
+
+    (analysis, file_analysis) = asyncio.run(analyse())
+
+    assert analysis == blueprint_analyser.analyse_blueprint(read_blueprint("beltFac8.txt"))
+    assert file_analysis == blueprint_analyser.calculate_blueprint_bottleneck(
+        f"{blueprints_path}/circuitFac1.json")
+
+
+def test_as_completed():
+    async def get_items():
+        # Paths, a decoded blueprint and a missing file
+        for blueprint_file in blueprint_files:
+            yield f"{blueprints_path}/{blueprint_file}"
+            await asyncio.sleep(0)
+        yield read_blueprint("beltFac8.txt")
+        yield f"{blueprints_path}/missing.json"
+
+    async def analyse():
+        async with async_analyser.AsyncAnalyser("process", jobs=2, max_in_flight=3) as analyser:
+            return [result async for result in analyser.as_completed(get_items())]
+
+    results = dict(asyncio.run(analyse()))
+
+    assert sorted(results) == list(range(len(blueprint_files) + 2))
+    for (index, blueprint_file) in enumerate(blueprint_files):
+        assert results[index] == blueprint_analyser.calculate_blueprint_bottleneck(
+            f"{blueprints_path}/{blueprint_file}")
+
+    assert results[len(blueprint_files)] == results[0]
+    assert results[len(blueprint_files) + 1]["error"].startswith("FileNotFoundError")
+
+
+def test_max_in_flight(monkeypatch):
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def analyse_blueprint(bp_json, instrumentation=None, jobs=None, settings=None):
+        # Counts the analyses running at once
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        threading.Event().wait(0.01)
+        with lock:
+            running[0] -= 1
+        return bp_json
+
+    monkeypatch.setattr(blueprint_analyser, "analyse_blueprint", analyse_blueprint)
+
+    async def analyse():
+        async with async_analyser.AsyncAnalyser("thread", jobs=4, max_in_flight=2) as analyser:
+            return await asyncio.gather(*(analyser.analyse({"blueprint": i}) for i in range(10)))
+
+    assert asyncio.run(analyse()) == [{"blueprint": i} for i in range(10)]
+    assert running[1] == 2
+
+
+def test_cancellation(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def analyse_blueprint(bp_json, instrumentation=None, jobs=None, settings=None):
+        started.set()
+        release.wait(10)
+        return bp_json
+
+    monkeypatch.setattr(blueprint_analyser, "analyse_blueprint", analyse_blueprint)
+
+    async def analyse():
+        async with async_analyser.AsyncAnalyser("thread", jobs=1, max_in_flight=1) as analyser:
+            running = asyncio.ensure_future(analyser.analyse({"blueprint": 1}))
+            waiting = asyncio.ensure_future(analyser.analyse({"blueprint": 2}))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+
+            # The waiting analysis is not submitted
+            waiting.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiting
+
+            # The running analysis keeps its slot until it ends
+            running.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await running
+            assert analyser.semaphore.locked()
+
+            release.set()
+            return await analyser.analyse({"blueprint": 3})
+
+    assert asyncio.run(analyse()) == {"blueprint": 3}
+
+
+def test_stopped_iteration():
+    # The analyses not submitted are cancelled when the iteration stops
+    async def analyse():
+        async with async_analyser.AsyncAnalyser("thread", jobs=1, max_in_flight=2) as analyser:
+            results = analyser.as_completed(f"{blueprints_path}/{blueprint_file}"
+                                            for blueprint_file in blueprint_files)
+            async for (index, analysis) in results:
+                break
+            await results.aclose()
+
+            return (index, analysis)
+
+    (index, analysis) = asyncio.run(analyse())
+    assert index in range(len(blueprint_files))
+    assert "error" not in analysis
+
+
+def test_invalid_executor():
+    with pytest.raises(ValueError):
+        async_analyser.AsyncAnalyser("gpu")
@@ -0,0 +1,44 @@
+from src import blueprint_analyser, batch
+import json
+import os
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def test_batch_manifest(tmp_path):
+    manifest_path = tmp_path / "manifest.txt"
+    manifest_path.write_text(
+        "# Test manifest\n"
+        f"{os.path.abspath(blueprints_path)}/beltFac1.json\n"
+        f"{os.path.abspath(blueprints_path)}/furFac1\n"
+        "\n"
+        "unknown_blueprint.json\n")
+
+    output_dir = tmp_path / "results"
+    summary = batch.analyse_batch(str(manifest_path), str(output_dir), jobs=2)
+
+    assert summary["nb_blueprints"] == 3
+    assert summary["nb_analysed"] == 2
+    assert summary["nb_failed"] == 1
+    assert summary["blueprints"][2]["status"] == "error"
+
+    with open(output_dir / "beltFac1.json") as f:
+        analysed_blueprint = json.load(f)
+
+    assert analysed_blueprint == blueprint_analyser.calculate_blueprint_bottleneck(
+        f"{blueprints_path}/beltFac1.json")
+
+    with open(output_dir / batch.summary_file_name) as f:
+        assert json.load(f)["nb_analysed"] == 2
+
+
+def test_batch_glob(tmp_path):
+    summary = batch.analyse_batch(
+        f"{blueprints_path}/beltFac*", str(tmp_path), jobs=2)
+
+    assert summary["nb_blueprints"] == 8
+    assert summary["nb_failed"] == 0
+    assert len(os.listdir(tmp_path)) == 9
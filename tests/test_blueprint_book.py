@@ -0,0 +1,71 @@
+from src import blueprint_analyser, blueprint, utils
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+book_pages = ["beltFac1.json", "furFac1", "fur1", "splitters.json"]
+
+
+def create_book_file(tmp_path):
+    # Book with a nested book and an upgrade planner
+    pages = [blueprint.read_blueprint_file(f"{blueprints_path}/{page}")
+             for page in book_pages]
+
+    book = {
+        "blueprint_book": {
+            "item": "blueprint-book",
+            "label": "Test book",
+            "active_index": 0,
+            "blueprints": [
+                {**pages[0], "index": 0},
+                {**pages[1], "index": 1},
+                {"index": 2, "upgrade_planner": {}},
+                {"index": 3, "blueprint_book": {
+                    "item": "blueprint-book",
+                    "blueprints": [
+                        {**pages[2], "index": 0},
+                        {**pages[3], "index": 1},
+                    ]
+                }},
+            ]
+        }
+    }
+
+    book_path = tmp_path / "book.txt"
+    book_path.write_text(utils.encode(book))
+    return str(book_path)
+
+
+def test_book_pages(tmp_path):
+    book_json = blueprint.read_blueprint_file(create_book_file(tmp_path))
+    pages = blueprint.get_book_pages(book_json)
+
+    assert [key for (key, _, _) in pages] == ["0", "1", "3.0", "3.1"]
+
+    with pytest.raises(Exception):
+        blueprint.Blueprint(book_json)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_book_analysis(tmp_path, jobs):
+    book_analysis = blueprint_analyser.calculate_blueprint_bottleneck(
+        create_book_file(tmp_path), jobs)
+
+    assert book_analysis["blueprint_book"]["label"] == "Test book"
+    assert "blueprints" not in book_analysis["blueprint_book"]
+    assert book_analysis["nb_pages"] == 4
+    assert book_analysis["nb_failed_pages"] == 0
+
+    for (key, page) in zip(["0", "1", "3.0", "3.1"], book_pages):
+        page_analysis = blueprint_analyser.calculate_blueprint_bottleneck(
+            f"{blueprints_path}/{page}")
+
+        # The book index of the exported page is not part of the page
+        page_analysis.pop("index", None)
+
+        assert book_analysis["pages"][key]["analysis"] == page_analysis
+        assert book_analysis["pages"][key]["label"] == page_analysis["blueprint"].get(
+            "label", "No label")
@@ -0,0 +1,132 @@
+from src import blueprint_analyser, blueprint, config
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import asyncio
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def read_blueprint(blueprint_file):
+    return blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+
+def get_items_output(bonus):
+    # Output of beltFac8, limited by its inserters
+    return blueprint_analyser.analyse_blueprint(
+        read_blueprint("beltFac8.txt"), settings={"inserter_capacity_bonus": bonus})["items_output"]
+
+
+def test_settings():
+    settings = config.get_settings()
+
+    assert settings.verbose_level == config.config.verbose_level == 0
+    assert settings.display_network is False
+    assert settings.cache_max_size == 256 * 1024 * 1024
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        settings.verbose_level = 3
+
+    with pytest.raises(ValueError):
+        dataclasses.replace(settings, inserter_capacity_bonus="2")
+
+    with pytest.raises(ValueError):
+        dataclasses.replace(settings, flow_solver="simplex")
+
+    with pytest.raises(ValueError):
+        dataclasses.replace(settings, async_executor="interpreter")
+
+    assert config.config.difficulty == settings.difficulty
+
+
+def test_set_config_value():
+    previous_bonus = config.config.inserter_capacity_bonus
+
+    config.config.set_config_value(previous_bonus + 2, "factorio", "inserter_capacity_bonus")
+    try:
+        assert config.get_settings().inserter_capacity_bonus == previous_bonus + 2
+    finally:
+        config.config.set_config_value(previous_bonus, "factorio", "inserter_capacity_bonus")
+
+    # An invalid value is not set
+    with pytest.raises(ValueError):
+        config.config.set_config_value(-1, "factorio", "inserter_capacity_bonus")
+    assert config.config.get_config_value("factorio", "inserter_capacity_bonus") == previous_bonus
+    assert config.get_settings().inserter_capacity_bonus == previous_bonus
+
+
+def test_use_settings():
+    with config.use_settings(inserter_capacity_bonus=2, flow_solver="maxflow") as settings:
+        assert config.get_settings() is settings
+        assert config.get_overrides() == {"inserter_capacity_bonus": 2, "flow_solver": "maxflow"}
+
+        # Nested overrides
+        with config.use_settings(inserter_capacity_bonus=3):
+            assert config.get_settings().inserter_capacity_bonus == 3
+            assert config.get_settings().flow_solver == "maxflow"
+
+        # The other threads use the config settings
+        with ThreadPoolExecutor(1) as executor:
+            assert executor.submit(config.get_settings).result() is config.config.settings
+
+    assert config.get_settings() is config.config.settings
+    assert config.get_overrides() == {}
+
+    with pytest.raises(TypeError):
+        with config.use_settings(unknown_setting=1):
+            pass
+
+    # The Factorio data and the cache are loaded once per process
+    for name in config.process_settings:
+        with pytest.raises(ValueError):
+            with config.use_settings(**{name: getattr(config.get_settings(), name)}):
+                pass
+
+    with pytest.raises(ValueError):
+        with config.use_settings(flow_solver="simplex"):
+            pass
+
+
+def test_analysis_settings():
+    default_output = get_items_output(0)
+    bonus_output = get_items_output(3)
+    assert bonus_output != default_output
+
+    # Same analysis as with the config value
+    config.config.set_config_value(3, "factorio", "inserter_capacity_bonus")
+    try:
+        assert blueprint_analyser.analyse_blueprint(read_blueprint("beltFac8.txt"))["items_output"] == bonus_output
+    finally:
+        config.config.set_config_value(0, "factorio", "inserter_capacity_bonus")
+
+    # Concurrent analyses with different settings
+    with ThreadPoolExecutor(4) as executor:
+        outputs = list(executor.map(get_items_output, [0, 3] * 4))
+    assert outputs == [default_output, bonus_output] * 4
+
+    # Asyncio tasks have their own settings
+    async def analyse(bonus):
+        with config.use_settings(inserter_capacity_bonus=bonus):
+            await asyncio.sleep(0)
+            return blueprint_analyser.analyse_blueprint(read_blueprint("beltFac8.txt"))["items_output"]
+
+    async def analyse_all():
+        return await asyncio.gather(analyse(3), analyse(0))
+
+    assert asyncio.run(analyse_all()) == [bonus_output, default_output]
+
+
+def test_book_settings():
+    # The pages analysed by worker processes have the same settings
+    book = {"blueprint_book": {"item": "blueprint-book", "blueprints": [
+        {**read_blueprint("beltFac8.txt"), "index": 0},
+        {**read_blueprint("beltFac8.txt"), "index": 1},
+    ]}}
+
+    analysis = blueprint_analyser.analyse_blueprint(book, jobs=2, settings={"inserter_capacity_bonus": 3})
+
+    for page in analysis["pages"].values():
+        assert page["analysis"]["items_output"] == get_items_output(3)
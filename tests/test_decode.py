@@ -0,0 +1,70 @@
+from src import blueprint_analyser, utils
+from os import listdir
+import base64
+import zlib
+import json
+import io
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def read_corpus():
+    # Returns the (file name, content) of the test blueprints
+    corpus = []
+    for blueprint_file in sorted(listdir(blueprints_path)):
+        with open(f"{blueprints_path}/{blueprint_file}") as f:
+            corpus.append((blueprint_file, f.read()))
+    return corpus
+
+
+def reference_decode(string):
+    # Decoding of the whole string at once
+    return json.loads(zlib.decompress(base64.b64decode(string[1:])).decode("utf8"))
+
+
+@pytest.fixture(params=["ijson", "orjson", "json"])
+def json_backend(request, monkeypatch):
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+
+    if request.param in ["ijson", "json"]:
+        # orjson is used before ijson when it is installed
+        monkeypatch.setattr(utils, "orjson", None)
+
+    if request.param in ["orjson", "json"]:
+        monkeypatch.setattr(utils, "ijson", None)
+
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+
+    assert utils.use_ijson() == (request.param == "ijson")
+    return request.param
+
+
+def test_decode(json_backend, monkeypatch):
+    # Small chunks so that the base64 groups are split between the chunks
+    monkeypatch.setattr(utils, "decode_chunk_size", 7)
+
+    for (blueprint_file, content) in read_corpus():
+        if blueprint_file.endswith(".json"):
+            bp_json = json.loads(content)
+            assert utils.load_json(io.BytesIO(content.encode("utf8"))) == bp_json
+            content = utils.encode(bp_json)
+
+        expected = reference_decode(content)
+        assert utils.decode(content) == expected, blueprint_file
+
+        # Exported strings split in several lines
+        lines = "\n".join(content[i:i + 50] for i in range(0, len(content), 50))
+        assert utils.decode_file(io.StringIO(lines + "\n")) == expected, blueprint_file
+
+
+def test_decode_truncated_string(json_backend):
+    content = utils.encode({"blueprint": {"entities": []}})
+
+    with pytest.raises(zlib.error):
+        utils.decode(content[:-8])
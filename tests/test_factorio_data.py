@@ -0,0 +1,52 @@
+from src import blueprint_analyser, config, factorio
+import json
+import os
+
+config_file_path = "config/config_tests.yaml"
+
+blueprint_analyser.init(config_file_path)
+
+
+def load_data_file(data_file_path):
+    default_data_file_path = config.config.data_file_path
+    config.config.set_config_value(
+        str(data_file_path), "factorio", "data_file_path")
+
+    try:
+        factorio.load_data()
+    finally:
+        config.config.set_config_value(
+            default_data_file_path, "factorio", "data_file_path")
+
+
+def test_data_cache(tmp_path):
+    with open(config.config.data_file_path) as f:
+        data = json.load(f)
+
+    data_file_path = tmp_path / "data.json"
+    cache_path = str(data_file_path) + factorio.cache_extension
+    data_file_path.write_text(json.dumps(data))
+
+    # The cache is created on the first load
+    load_data_file(data_file_path)
+    assert os.path.exists(cache_path)
+
+    assert dict(factorio.recipies) == data["recipe"]
+    assert dict(factorio.items) == data["item"]
+    assert factorio.entities["stack-inserter"] == data["inserter"]["stack-inserter"]
+    assert "lab" not in factorio.entities
+
+    # The cache is used on the next loads
+    cache_modification_time = os.path.getmtime(cache_path)
+    load_data_file(data_file_path)
+    assert os.path.getmtime(cache_path) == cache_modification_time
+
+    # The cache is rebuilt when the data changes
+    del data["recipe"]["iron-gear-wheel"]
+    data_file_path.write_text(json.dumps(data))
+
+    load_data_file(data_file_path)
+    assert "iron-gear-wheel" not in factorio.recipies
+
+    factorio.load_data()
+    assert "iron-gear-wheel" in factorio.recipies
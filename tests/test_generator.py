@@ -0,0 +1,96 @@
+from src import blueprint_analyser, blueprint, network, generator, factorio, utils, config
+import copy
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+
+blueprint_analyser.init(config_file_path)
+
+
+@pytest.mark.parametrize("shape", list(generator.shapes))
+def test_shapes(shape):
+    for nb_entities in [100, 1000]:
+        bp_json = generator.generate(shape, nb_entities)
+        entities = bp_json["blueprint"]["entities"]
+
+        assert abs(len(entities) - nb_entities) <= nb_entities * 0.1
+        assert [e["entity_number"] for e in entities] == list(range(1, len(entities) + 1))
+
+        for entity in entities:
+            assert entity["name"] in factorio.entities
+            if "recipe" in entity:
+                assert entity["recipe"] in factorio.recipies
+
+        # No tiles used twice
+        bp = blueprint.Blueprint(copy.deepcopy(bp_json))
+        nb_tiles = sum(1 for _ in bp.grid.cells())
+        nb_expected_tiles = sum(9 if e.data["type"] == "assembling-machine" else
+                                2 if e.data["type"] == "splitter" else 1
+                                for e in bp.entities)
+        assert nb_tiles == nb_expected_tiles
+
+        # The negotiation is exponential on the splitter chain
+        if shape == "splitter-chain":
+            config.config.set_config_value("maxflow", "bottleneck", "solver")
+
+        try:
+            analysis = blueprint_analyser.analyse_blueprint(copy.deepcopy(bp_json))
+        finally:
+            config.config.set_config_value("negotiation", "bottleneck", "solver")
+
+        assert len(analysis["entities_output"]) > 0
+
+
+def test_belt_shapes_networks():
+    # The belts line is compacted in a single node
+    bp = blueprint.Blueprint(generator.belt_snake(1000))
+    nw = network.create_network(bp)
+    assert len(nw.nodes) == 1
+
+    # All the underground belts are linked
+    bp = blueprint.Blueprint(generator.underground_chain(1000))
+    nw = network.create_network(bp)
+    assert len(nw.root_nodes()) == 1
+    assert len(nw.leaf_nodes()) == 1
+
+    bp = blueprint.Blueprint(generator.splitter_tree(1000, nb_outputs=16))
+    nw = network.create_network(bp)
+    assert len(nw.root_nodes()) == 1
+    assert len(nw.leaf_nodes()) == 16
+
+
+def test_assembler_cells_production():
+    for (nb_ingredients, recipe_name) in generator.default_recipes.items():
+        bp_json = generator.assembler_cells(200, nb_ingredients=nb_ingredients)
+        analysis = blueprint_analyser.analyse_blueprint(bp_json)
+
+        produced = sum(items.get(recipe_name, 0) for items in analysis["items_output"])
+        assert produced > 0, recipe_name
+
+
+def test_find_recipes():
+    for nb_ingredients in [1, 2, 3]:
+        recipes = generator.find_recipes(nb_ingredients)
+        assert len(recipes) > 0
+
+        for recipe_name in recipes:
+            assert len(generator.get_solid_ingredients(recipe_name)) == nb_ingredients
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        generator.generate("unknown", 100)
+
+    with pytest.raises(ValueError):
+        generator.splitter_tree(100, nb_outputs=6)
+
+    with pytest.raises(ValueError):
+        generator.belt_snake(100, belt="not-a-belt")
+
+    with pytest.raises(ValueError):
+        generator.belt_snake(100, belt="splitter")
+
+
+def test_generate_string():
+    bp_string = generator.generate_string("snake", 100)
+    assert utils.decode(bp_string) == generator.generate("snake", 100)
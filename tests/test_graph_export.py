@@ -0,0 +1,131 @@
+from src import blueprint_analyser, blueprint, network, generator, graph_export, config
+import json
+import subprocess
+import sys
+import time
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def calculate_network(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    nw = network.create_network(bp)
+    nw.calculate_bottleneck()
+    return nw
+
+
+def read_html_graph(html):
+    # The graph JSON written in the page
+    start = html.index('<script id="graph" type="application/json">')
+    start = html.index(">", start) + 1
+    return json.loads(html[start:html.index("</script>", start)])
+
+
+@pytest.mark.parametrize("blueprint_file", ["beltFac8.txt", "circuitFac1.json", "starter_base"])
+def test_json_export(blueprint_file, tmp_path):
+    nw = calculate_network(blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+    analysis = nw.blueprint.get_analysis()
+
+    graph_path = tmp_path / "graph.json"
+    graph_export.export_network(nw, str(graph_path))
+    with open(graph_path) as f:
+        graph = json.load(f)
+
+    assert graph["format"] == graph_export.graph_format
+    assert graph["fields"] == graph_export.fields
+    field = {name: i for (i, name) in enumerate(graph["fields"])}
+
+    nodes = graph["nodes"]
+    assert [node[field["entity"]] for node in nodes] == [node.entity.number for node in nw.nodes]
+    assert len(graph["edges"]) == 2 * sum(len(node.childs) for node in nw.nodes)
+
+    # The nodes are placed in the blueprint
+    for node in nodes:
+        assert 0 <= node[field["x"]] <= graph["width"]
+        assert 0 <= node[field["y"]] <= graph["height"]
+
+    # The flags give the inputs, outputs and bottlenecks of the analysis
+    def flagged(flag):
+        return [node[field["entity"]] for node in nodes
+                if node[field["flags"]] & graph_export.node_flags[flag]]
+
+    assert flagged("input") == analysis["entities_input"]
+    assert flagged("output") == analysis["entities_output"]
+
+    entities_bottleneck = set(flagged("bottleneck"))
+    for node in nodes:
+        if node[field["entity"]] in entities_bottleneck:
+            entities_bottleneck.update(node[field["compacted"]])
+    assert entities_bottleneck == set(analysis["entities_bottleneck"])
+
+
+def test_html_export(tmp_path):
+    bp_json = blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt")
+    bp_json["blueprint"]["label"] = "Gears </script> & <plates>"
+    nw = calculate_network(bp_json)
+
+    graph_path = tmp_path / "graph.html"
+    graph_export.export_network(nw, str(graph_path))
+    html = graph_path.read_text()
+
+    # A static page, without remote resources
+    assert "http" not in html
+    assert "<title>Gears &lt;/script&gt; &amp; &lt;plates&gt;</title>" in html
+
+    graph = read_html_graph(html)
+    assert graph["label"] == bp_json["blueprint"]["label"]
+    assert len(graph["nodes"]) == len(nw.nodes)
+
+
+def test_icons(tmp_path):
+    icons_dir = tmp_path / "icons"
+    icons_dir.mkdir()
+    (icons_dir / "transport-belt.png").write_bytes(b"")
+
+    nw = calculate_network(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+    graph_path = tmp_path / "graph.json"
+    graph_export.export_network(nw, str(graph_path), icons_dir=str(icons_dir))
+
+    with open(graph_path) as f:
+        assert json.load(f)["icons"] == {"transport-belt": "icons/transport-belt.png"}
+
+
+def test_analysis_export(tmp_path, monkeypatch):
+    bp_json = blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt")
+    bp_json["blueprint"]["label"] = "Gears"
+    monkeypatch.chdir(tmp_path)
+
+    config.config.set_config_value("html", "network", "export")
+    try:
+        blueprint_analyser.analyse_blueprint(bp_json)
+    finally:
+        config.config.set_config_value(None, "network", "export")
+
+    assert len(read_html_graph((tmp_path / "Gears.graph.html").read_text())["nodes"]) > 0
+
+
+def test_large_network(tmp_path):
+    nw = calculate_network(generator.generate("inserter-chain", 100000))
+    assert len(nw.nodes) >= 100000
+
+    start = time.perf_counter()
+    graph_export.export_network(nw, str(tmp_path / "graph.json"))
+    assert time.perf_counter() - start < 10
+
+
+def test_no_pyvis_import():
+    # pyvis is only imported to display a network
+    subprocess.run([sys.executable, "-c",
+                    "import sys; from src import blueprint_analyser; "
+                    "assert 'pyvis' not in sys.modules"], check=True)
+
+
+def test_unknown_format(tmp_path):
+    nw = calculate_network(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+
+    with pytest.raises(ValueError):
+        graph_export.export_network(nw, str(tmp_path / "graph.svg"), "svg")
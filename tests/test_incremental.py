@@ -0,0 +1,153 @@
+from src import blueprint_analyser, blueprint, network, generator, incremental, config
+import copy
+import json
+import random
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+@pytest.fixture
+def flow_solver():
+    # Select a flow solver for the test, the negotiation is restored after it
+    def set_flow_solver(name):
+        config.config.set_config_value(name, "bottleneck", "solver")
+
+    yield set_flow_solver
+    set_flow_solver("negotiation")
+
+
+def read_blueprint(blueprint_file):
+    return blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+
+def create_editor(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    nw = network.create_network(bp)
+    nw.calculate_bottleneck()
+    return incremental.NetworkEditor(nw)
+
+
+def get_analysis(nw):
+    return json.dumps(nw.blueprint.get_analysis(), sort_keys=True)
+
+
+def get_full_analysis(bp_json):
+    # Analysis of a copy of the edited blueprint, from the start
+    return get_analysis(create_editor(copy.deepcopy(bp_json)).network)
+
+
+def random_edits(bp_json, nb_edits, seed):
+    # Rotate, remove and add back entities, change the machines recipes
+    rand = random.Random(seed)
+    removed = []
+    next_number = 100000
+
+    for _ in range(nb_edits):
+        entity_dic = rand.choice(bp_json["blueprint"]["entities"])
+        action = rand.choice(["rotate", "remove", "add", "recipe"])
+
+        if action == "add" and len(removed) > 0:
+            entity_dic = removed.pop()
+            entity_dic["entity_number"] = next_number
+            next_number += 1
+            yield incremental.add_entity(entity_dic)
+
+        elif action == "remove":
+            removed.append(copy.deepcopy(entity_dic))
+            yield incremental.remove_entity(entity_dic["entity_number"])
+
+        elif action == "recipe" and entity_dic["name"].startswith("assembling-machine"):
+            recipe_name = rand.choice(["iron-gear-wheel", "copper-cable", "electronic-circuit", None])
+            yield incremental.set_recipe(entity_dic["entity_number"], recipe_name)
+
+        else:
+            yield incremental.rotate_entity(entity_dic["entity_number"], rand.choice([0, 2, 4, 6]))
+
+
+@pytest.mark.parametrize("blueprint_file", [
+    "beltFac8.txt", "circuitFac1.json", "fur3", "starter_base"])
+def test_same_analysis(blueprint_file, monkeypatch):
+    # After each edit, the analysis is the same as a full analysis
+    # The small blueprints are analysed again from the start by
+    # default, the region is edited up to the whole blueprint
+    monkeypatch.setattr(incremental, "max_region_ratio", 1)
+    bp_json = read_blueprint(blueprint_file)
+    editor = create_editor(bp_json)
+
+    for edit in random_edits(bp_json, 20, 0):
+        nw = editor.apply(edit)
+        assert get_analysis(nw) == get_full_analysis(bp_json), str(edit)
+
+
+def test_region():
+    # A recipe change only creates again the nodes of its row of cells
+    bp_json = generator.generate("cells", 1000)
+    editor = create_editor(bp_json)
+    old_nodes = list(editor.network.nodes)
+
+    machine = next(entity_dic for entity_dic in bp_json["blueprint"]["entities"]
+                   if entity_dic["name"].startswith("assembling-machine"))
+    nw = editor.apply(incremental.set_recipe(machine["entity_number"], "copper-cable"))
+
+    assert nw is editor.network
+    assert 0 < len(editor.rebuilt_nodes) < len(nw.nodes) / 2
+    assert all(node in old_nodes for node in nw.nodes if node not in editor.rebuilt_nodes)
+    assert get_analysis(nw) == get_full_analysis(bp_json)
+    assert "copper-cable" in nw.blueprint.get_analysis()["items_output"][0]
+
+
+def test_large_region():
+    # The belt of a snake links all its entities, it is analysed from the start
+    bp_json = generator.generate("snake", 200)
+    editor = create_editor(bp_json)
+
+    entity_dic = bp_json["blueprint"]["entities"][100]
+    editor.apply(incremental.rotate_entity(entity_dic["entity_number"], 4))
+
+    assert editor.rebuilt_nodes is None
+    assert get_analysis(editor.network) == get_full_analysis(bp_json)
+
+
+def test_full_analysis():
+    # Removing the entity of a border changes the blueprint origin
+    bp_json = read_blueprint("beltFac8.txt")
+    editor = create_editor(bp_json)
+    old_network = editor.network
+
+    corner = min(bp_json["blueprint"]["entities"],
+                 key=lambda entity_dic: (entity_dic["position"]["x"], entity_dic["position"]["y"]))
+    nw = editor.apply(incremental.remove_entity(corner["entity_number"]))
+
+    assert editor.rebuilt_nodes is None
+    assert nw is not old_network
+    assert get_analysis(nw) == get_full_analysis(bp_json)
+
+
+def test_max_flow(flow_solver, monkeypatch):
+    flow_solver("maxflow")
+    monkeypatch.setattr(incremental, "max_region_ratio", 1)
+    bp_json = read_blueprint("circuitFac1.json")
+    editor = create_editor(bp_json)
+
+    for edit in random_edits(bp_json, 20, 1):
+        nw = editor.apply(edit)
+        assert get_analysis(nw) == get_full_analysis(bp_json), str(edit)
+
+
+def test_invalid_edits():
+    bp_json = read_blueprint("beltFac8.txt")
+    editor = create_editor(bp_json)
+    entity_dic = bp_json["blueprint"]["entities"][0]
+
+    with pytest.raises(ValueError):
+        incremental.Edit("move", entity_dic["entity_number"])
+
+    with pytest.raises(ValueError):
+        editor.apply(incremental.remove_entity(-1))
+
+    with pytest.raises(ValueError):
+        editor.apply(incremental.add_entity(copy.deepcopy(entity_dic)))
@@ -0,0 +1,105 @@
+from src import blueprint_analyser, blueprint, config, instrumentation
+from src.instrumentation import Instrumentation
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+config_file_path = "config/config_tests.yaml"
+blueprint_path = "tests/blueprints/beltFac1.json"
+
+blueprint_analyser.init(config_file_path)
+
+analysis_phases = ["blueprint", "virtual_chests", "create_network",
+                   "optimize", "purpose", "flow", "analysis"]
+
+
+def test_analysis_instrumentation():
+    recorder = Instrumentation()
+    analysis = blueprint_analyser.calculate_blueprint_bottleneck(
+        blueprint_path, instrumentation=recorder)
+
+    assert instrumentation.current.get() is None
+
+    measures = analysis.pop("instrumentation")
+    assert measures == recorder.to_dict()
+
+    for phase in ["decode"] + analysis_phases:
+        assert measures["phases"][phase]["calls"] == 1
+        assert measures["phases"][phase]["wall_time"] >= 0
+
+    # The phases times don't overlap
+    assert sum(phase["wall_time"] for phase in measures["phases"].values()) <= \
+        measures["wall_time"]
+
+    counters = measures["counters"]
+    bp = blueprint.load_blueprint(blueprint_path)
+    assert counters["entities"] == len(bp.entities)
+    assert counters["nodes"] <= counters["nodes_before_optimization"]
+    assert counters["edges"] <= counters["edges_before_optimization"]
+    assert counters["nodes"] > 0
+
+    # The instrumentation does not change the analysis
+    assert analysis == blueprint_analyser.calculate_blueprint_bottleneck(blueprint_path)
+
+
+def test_config_instrumentation():
+    config.config.set_config_value(True, "instrumentation")
+
+    try:
+        analysis = blueprint_analyser.calculate_blueprint_bottleneck(blueprint_path)
+    finally:
+        config.config.set_config_value(False, "instrumentation")
+
+    assert list(analysis["instrumentation"]["phases"]) == \
+        ["decode", "blueprint", "virtual_chests", "display", "create_network",
+         "optimize", "purpose", "flow", "analysis"]
+
+    assert "instrumentation" not in blueprint_analyser.calculate_blueprint_bottleneck(
+        blueprint_path)
+
+
+def test_nested_phases():
+    # The time of the inner phase is not counted in the outer phase
+    with Instrumentation() as recorder:
+        with instrumentation.phase("outer"):
+            time.sleep(0.01)
+            with instrumentation.phase("inner"):
+                time.sleep(0.05)
+            with instrumentation.phase("inner"):
+                pass
+
+    assert recorder.phases["inner"].calls == 2
+    assert recorder.phases["inner"].wall_time >= 0.05
+    assert 0.01 <= recorder.phases["outer"].wall_time < 0.05
+    assert recorder.wall_time >= 0.06
+
+
+def test_no_instrumentation():
+    # Nothing is recorded outside of an instrumented analysis
+    with instrumentation.phase("phase"):
+        instrumentation.count("counter", 1)
+
+    assert not instrumentation.is_active()
+
+
+def test_concurrent_analyses():
+    # The analyses of several threads record their own measures
+    blueprint_files = ["beltFac1.json", "beltFac8.txt", "circuitFac1.json", "starter_base"] * 4
+
+    def analyse(blueprint_file):
+        path = f"tests/blueprints/{blueprint_file}"
+        measures = blueprint_analyser.calculate_blueprint_bottleneck(
+            path, settings={"instrumentation": True})["instrumentation"]
+
+        assert instrumentation.current.get() is None
+        return (measures, len(blueprint.load_blueprint(path).entities))
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(analyse, blueprint_files))
+
+        # The threads don't keep the instrumentation of their analyses
+        assert list(executor.map(lambda _: instrumentation.is_active(), range(8))) == [False] * 8
+
+    for (measures, nb_entities) in results:
+        assert measures["counters"]["entities"] == nb_entities
+        assert measures["phases"]["decode"]["calls"] == 1
+        assert measures["phases"]["flow"]["calls"] == 1
@@ -0,0 +1,158 @@
+from src import blueprint_analyser, blueprint, network, generator
+from os import listdir
+import hashlib
+import json
+import sys
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+fingerprints_path = "tests/network_fingerprints.json"
+
+blueprint_analyser.init(config_file_path)
+
+
+def get_network_fingerprint(nw):
+    # Hash of the network nodes and links, in the order they are stored
+    nodes = []
+    for node in nw.nodes:
+        nodes.append([
+            str(node.entity.number),
+            node.type,
+            [str(parent.entity.number) for parent in node.parents],
+            [str(child.entity.number) for child in node.childs],
+            [str(compacted.entity.number) for compacted in node.compacted_nodes]
+        ])
+
+    return hashlib.sha1(json.dumps(nodes).encode("utf8")).hexdigest()
+
+
+def create_belt_line_blueprint(length, direction):
+    entities = []
+    for i in range(length):
+        x = i if direction == 2 else length - i
+        entities.append({
+            "entity_number": i + 1,
+            "name": "transport-belt",
+            "position": {"x": x + 0.5, "y": 0.5},
+            "direction": direction
+        })
+
+    return {"blueprint": {"entities": entities}}
+
+
+def test_corpus_networks():
+    # The networks of the test blueprints must stay the same
+    with open(fingerprints_path) as f:
+        fingerprints = json.load(f)
+
+    for blueprint_file in listdir(blueprints_path):
+        bp = blueprint.load_blueprint(f"{blueprints_path}/{blueprint_file}")
+        nw = network.create_network(bp)
+
+        assert get_network_fingerprint(nw) == fingerprints[blueprint_file], blueprint_file
+
+
+def test_long_belt_line():
+    # A belt line is compacted in a single node, whatever its length
+    length = 20 * sys.getrecursionlimit()
+
+    for direction in [2, 6]:
+        bp = blueprint.Blueprint(create_belt_line_blueprint(length, direction))
+        nw = network.create_network(bp)
+
+        assert len(nw.nodes) == 1
+        assert len(nw.nodes[0].compacted_nodes) == length - 1
+
+
+def create_scaling_blueprint(nb_entities):
+    # Half of the entities in a single belt line (one node with many
+    # compacted nodes), the other half in separated chests (many nodes)
+    length = nb_entities // 2
+    bp_json = create_belt_line_blueprint(length, 2)
+
+    for i in range(nb_entities - length):
+        bp_json["blueprint"]["entities"].append({
+            "entity_number": length + i + 1,
+            "name": "wooden-chest",
+            "position": {"x": 2 * (i % length) + 0.5, "y": 2 * (i // length) + 2.5}
+        })
+
+    return bp_json
+
+
+def count_calls(function):
+    # Number of Python and built-in function calls made by the function,
+    # the same on every run unlike its duration
+    nb_calls = [0]
+
+    def profile(frame, event, arg):
+        if event in ["call", "c_call"]:
+            nb_calls[0] += 1
+
+    sys.setprofile(profile)
+    try:
+        function()
+    finally:
+        sys.setprofile(None)
+
+    return nb_calls[0]
+
+
+def test_analysis_scaling():
+    # Network creation and analysis export must stay linear
+    # in the number of entities
+    # The durations are compared in benchmarks/bench_network_scaling.py
+    calls_per_entity = {}
+
+    for nb_entities in [2000, 20000]:
+        bp = blueprint.Blueprint(create_scaling_blueprint(nb_entities))
+
+        def analyse():
+            bp.network = network.create_network(bp)
+            bp.network.calculate_bottleneck()
+
+        calls_per_entity[nb_entities] = count_calls(analyse) / nb_entities
+        calls_per_entity[nb_entities] += count_calls(bp.get_analysis) / nb_entities
+
+        analysis = bp.get_analysis()
+        assert len(analysis["entities_input"]) == nb_entities - nb_entities // 2 + 1
+        assert analysis["blueprint"]["entities"][-1]["input"]
+
+    # A quadratic algorithm would make 10 times more calls per entity
+    assert calls_per_entity[20000] < 2 * calls_per_entity[2000]
+
+
+def create_splitter_chain_blueprint(nb_splitters):
+    # Input belts -> chain of splitters -> inserter -> assembling machine
+    # Each splitter is linked twice to the next one, the number of paths
+    # from the input to the machine doubles with each splitter
+    builder = generator.BlueprintBuilder("Splitter chain")
+    builder.add_belt_line("transport-belt", 0, 0, 2)
+    builder.add_belt_line("transport-belt", 0, 1, 2)
+
+    for i in range(nb_splitters):
+        builder.add_splitter("splitter", 2 + i, 1, generator.EAST)
+
+    x = 2 + nb_splitters
+    builder.add("transport-belt", x, 1, generator.EAST)
+    builder.add("inserter", x + 1, 1, generator.WEST)
+    builder.add("assembling-machine-1", x + 3, 1, recipe="iron-gear-wheel")
+    builder.add("inserter", x + 5, 1, generator.WEST)
+    builder.add_belt_line("transport-belt", x + 6, 1, 3)
+
+    return builder.get_blueprint()
+
+
+def test_splitter_chain_purpose():
+    # The purpose estimation visits each node a bounded number of times
+    bp = blueprint.Blueprint(create_splitter_chain_blueprint(60))
+    nw = network.create_network(bp)
+    nw.calculate_bottleneck()
+
+    splitters = [node for node in nw.nodes if node.type == "splitter"]
+    assert len(splitters) == 60
+    for splitter in splitters:
+        assert [item.name for item in splitter.transported_items] == ["iron-plate"]
+
+    leaf_node = nw.leaf_nodes()[0]
+    assert leaf_node.flow.items["iron-gear-wheel"] > 0
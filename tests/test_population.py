@@ -0,0 +1,72 @@
+from src import blueprint_analyser, blueprint, generator, population
+from os import listdir
+import copy
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def read_blueprint(blueprint_file):
+    return blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+
+def read_blueprints():
+    bp_jsons = [read_blueprint(blueprint_file) for blueprint_file in sorted(listdir(blueprints_path))]
+    return [bp_json for bp_json in bp_jsons if not blueprint.is_blueprint_book(bp_json)]
+
+
+@pytest.mark.parametrize("blueprint_file", [
+    "beltFac8.txt", "boilerFac1.json", "circuitFac1.json", "starter_base"])
+def test_same_as_analysis(blueprint_file):
+    # The fitness record sums up the analysis of the blueprint
+    record = population.evaluate_blueprint(read_blueprint(blueprint_file))
+    analysis = blueprint_analyser.analyse_blueprint(read_blueprint(blueprint_file))
+
+    items_output = {}
+    for items in analysis["items_output"]:
+        for (item_name, amount) in items.items():
+            items_output[item_name] = items_output.get(item_name, 0) + amount
+
+    usage_rates = [entity_dic["usage_rate"] for entity_dic in analysis["blueprint"]["entities"]
+                   if "usage_rate" in entity_dic]
+
+    assert record["items_output"] == pytest.approx(items_output)
+    assert record["output"] == pytest.approx(sum(items_output.values()))
+    assert record["nb_bottlenecks"] == len(analysis["entities_bottleneck"])
+    assert record["mean_usage"] == pytest.approx(sum(usage_rates) / len(usage_rates))
+
+
+def test_blueprint_not_analysed():
+    # The analysis keys are not added to the evaluated blueprints
+    bp_json = read_blueprint("beltFac8.txt")
+    original_json = copy.deepcopy(bp_json)
+    population.evaluate_population([bp_json])
+
+    assert bp_json == original_json
+
+
+def test_errors():
+    records = population.evaluate_population([{"blueprint": {"entities": []}}, {"foo": 1}])
+
+    assert records[0]["output"] == 0
+    assert records[0]["mean_usage"] == 0
+    assert "error" in records[1]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_evaluator(jobs):
+    # The pool gives the records of an evaluation in this process
+    bp_jsons = read_blueprints() + [generator.generate("cells", 100)]
+    records = population.evaluate_population(copy.deepcopy(bp_jsons))
+
+    with population.PopulationEvaluator(jobs) as evaluator:
+        assert (evaluator.pool is None) == (jobs == 1)
+
+        # The pool is kept between the generations
+        for _ in range(2):
+            assert evaluator.evaluate(copy.deepcopy(bp_jsons)) == records
+
+    assert evaluator.pool is None
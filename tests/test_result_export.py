@@ -0,0 +1,145 @@
+from src import blueprint_analyser, blueprint, batch, result_export, analysis_result, utils
+import json
+import os
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+def get_analysis(blueprint_file):
+    # Analysis as read from a JSON file
+    analysis = blueprint_analyser.calculate_blueprint_bottleneck(f"{blueprints_path}/{blueprint_file}")
+    return json.loads(json.dumps(analysis, default=utils.json_default))
+
+
+def get_book_analysis():
+    book = {"blueprint_book": {"item": "blueprint-book", "label": "Book", "blueprints": [
+        {**blueprint.read_blueprint_file(f"{blueprints_path}/beltFac1.json"), "index": 0},
+        {**blueprint.read_blueprint_file(f"{blueprints_path}/fur1"), "index": 1},
+        {"index": 2, "blueprint": {"item": "blueprint", "entities": [{"entity_number": 1}]}},
+    ]}}
+    return json.loads(json.dumps(blueprint_analyser.analyse_blueprint(book, jobs=1), default=utils.json_default))
+
+
+def check_format(export_format):
+    if export_format == "binary":
+        pytest.importorskip("msgpack")
+
+
+@pytest.mark.parametrize("export_format", list(result_export.formats))
+@pytest.mark.parametrize("blueprint_file", ["beltFac8.txt", "circuitFac1.json", "starter_base", None])
+def test_round_trip(tmp_path, export_format, blueprint_file):
+    check_format(export_format)
+    analysis = get_analysis(blueprint_file) if blueprint_file is not None else get_book_analysis()
+
+    path = str(tmp_path / f"analysis{result_export.formats[export_format]}")
+    result_export.write_analysis(analysis, path, export_format)
+
+    assert result_export.read_analysis(path, export_format) == analysis
+
+
+def test_json_format(tmp_path):
+    # The default format is unchanged
+    analysis = get_analysis("beltFac8.txt")
+    result_export.write_analysis(analysis, str(tmp_path / "analysis.json"))
+
+    assert (tmp_path / "analysis.json").read_text() == json.dumps(analysis, indent=4)
+
+
+def test_ndjson_records(tmp_path):
+    analysis = get_analysis("beltFac8.txt")
+    path = tmp_path / "analysis.ndjson"
+    result_export.write_analysis(analysis, str(path), "ndjson")
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    entities = analysis["blueprint"]["entities"]
+
+    assert len(records) == 1 + len(entities)
+    assert records[0]["analysis"]["blueprint"]["entities"] == []
+    assert records[0]["analysis"]["entities_bottleneck"] == analysis["entities_bottleneck"]
+    assert [record["entity"] for record in records[1:]] == entities
+
+
+def test_book_records():
+    analysis = get_book_analysis()
+    records = list(result_export.get_records(analysis))
+
+    assert records[0] == {"book": {key: value for (key, value) in analysis.items() if key != "pages"}}
+    assert {record["page"] for record in records[1:]} == set(analysis["pages"])
+    assert sum(1 for record in records if "error" in record) == analysis["nb_failed_pages"] == 1
+
+
+def test_select_fields(tmp_path):
+    fields = ["items_output", "entities_bottleneck"]
+    analysis = get_analysis("beltFac8.txt")
+
+    path = str(tmp_path / "analysis.json")
+    result_export.write_analysis(analysis, path, "compact", fields)
+    assert result_export.read_analysis(path) == {field: analysis[field] for field in fields}
+
+    book_analysis = result_export.select_fields(get_book_analysis(), fields)
+    for page in book_analysis["pages"].values():
+        assert "error" in page or list(page["analysis"]) == fields
+
+    # Without the blueprint, no entity record is written
+    records = list(result_export.get_records(result_export.select_fields(analysis, fields)))
+    assert records == [{"analysis": {field: analysis[field] for field in fields}}]
+
+
+@pytest.mark.parametrize("export_format", list(result_export.formats))
+def test_analysis_result(tmp_path, export_format):
+    # The analysis result is written as its dictionary
+    check_format(export_format)
+    result = blueprint_analyser.calculate_blueprint_bottleneck(f"{blueprints_path}/beltFac8.txt")
+    assert isinstance(result, analysis_result.AnalysisResult)
+
+    path = str(tmp_path / f"analysis{result_export.formats[export_format]}")
+    result_export.write_analysis(result, path, export_format)
+
+    assert result_export.read_analysis(path, export_format) == get_analysis("beltFac8.txt")
+
+
+def test_select_result_fields(tmp_path, monkeypatch):
+    # The entities of the analysis result are not built without the blueprint field
+    fields = ["items_output", "entities_bottleneck"]
+    result = blueprint_analyser.calculate_blueprint_bottleneck(f"{blueprints_path}/beltFac8.txt")
+    analysis = get_analysis("beltFac8.txt")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The analysis dictionary is built")
+
+    monkeypatch.setattr(analysis_result.AnalysisResult, "to_dict", fail)
+    monkeypatch.setattr(analysis_result.AnalysisResult, "iter_entities", fail)
+
+    for export_format in ["compact", "ndjson"]:
+        path = str(tmp_path / f"analysis{result_export.formats[export_format]}")
+        result_export.write_analysis(result, path, export_format, fields)
+        assert result_export.read_analysis(path) == {field: analysis[field] for field in fields}
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError):
+        result_export.check_format("xml")
+
+    with pytest.raises(ValueError):
+        result_export.check_fields(["items_output", "transpoted_items"])
+
+    with pytest.raises(ValueError):
+        result_export.get_format("analysis.txt")
+
+
+def test_batch_format(tmp_path):
+    output_dir = tmp_path / "results"
+    summary = batch.analyse_batch(f"{blueprints_path}/beltFac*", str(output_dir), jobs=1,
+                                  export_format="ndjson", fields=["items_output"])
+
+    for record in summary["blueprints"]:
+        assert record["output"].endswith(".ndjson")
+        analysis = result_export.read_analysis(record["output"])
+        assert analysis == {"items_output": record["items_output"]}
+
+    assert sorted(os.listdir(output_dir)) == sorted(
+        [os.path.basename(record["output"]) for record in summary["blueprints"]] + [batch.summary_file_name])
@@ -0,0 +1,153 @@
+from src import blueprint_analyser, blueprint, generator, server, utils
+from contextlib import contextmanager
+import http.client
+import threading
+import socket
+import json
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+@contextmanager
+def run_server(address, **kwargs):
+    # Server answering in a thread, with one worker process
+    with server.AnalysisServer(address, jobs=1, **kwargs) as analysis_server:
+        thread = threading.Thread(target=analysis_server.serve_forever)
+        thread.start()
+        try:
+            yield analysis_server
+        finally:
+            analysis_server.shutdown()
+            thread.join()
+
+
+@pytest.fixture(scope="module")
+def connection():
+    with run_server(("127.0.0.1", 0)) as analysis_server:
+        connection = http.client.HTTPConnection(*analysis_server.address)
+        yield connection
+        connection.close()
+
+
+def request(connection, method, path, body=None):
+    # Returns the status and the JSON of the response
+    connection.request(method, path, body)
+    response = connection.getresponse()
+    return (response.status, json.loads(response.read()))
+
+
+def read_file(blueprint_file):
+    with open(f"{blueprints_path}/{blueprint_file}", "rb") as f:
+        return f.read()
+
+
+def get_analysis(bp_json):
+    # Analysis as read from a response
+    return json.loads(json.dumps(blueprint_analyser.analyse_blueprint(bp_json), default=utils.json_default))
+
+
+@pytest.mark.parametrize("blueprint_file", ["beltFac8.txt", "circuitFac1.json", "starter_base"])
+def test_analysis(connection, blueprint_file):
+    (status, analysis) = request(connection, "POST", "/analyse", read_file(blueprint_file))
+
+    assert status == 200
+    assert analysis == get_analysis(blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+
+
+def test_book(connection):
+    book = {"blueprint_book": {"item": "blueprint-book", "blueprints": [
+        {**blueprint.read_blueprint_file(f"{blueprints_path}/beltFac1.json"), "index": 0},
+        {**blueprint.read_blueprint_file(f"{blueprints_path}/fur1"), "index": 1},
+    ]}}
+
+    (status, analysis) = request(connection, "POST", "/analyse", utils.encode(book))
+    assert status == 200
+    assert analysis["nb_analysed_pages"] == 2
+
+
+def test_errors(connection):
+    (status, response) = request(connection, "POST", "/analyse", b"not a blueprint")
+    assert status == 400
+    assert response["error"].startswith("Invalid blueprint")
+
+    (status, response) = request(connection, "POST", "/analyse", b'{"upgrade_planner": {}}')
+    assert status == 400
+
+    (status, response) = request(connection, "POST", "/unknown", b"")
+    assert status == 404
+
+    (status, response) = request(connection, "GET", "/unknown")
+    assert status == 404
+
+    # The connection is still usable
+    (status, response) = request(connection, "POST", "/analyse", read_file("beltFac8.txt"))
+    assert status == 200
+
+
+def test_health(connection):
+    (_, before) = request(connection, "GET", "/health")
+    request(connection, "POST", "/analyse", read_file("beltFac8.txt"))
+    request(connection, "POST", "/analyse", b"not a blueprint")
+    (status, after) = request(connection, "GET", "/health")
+
+    assert status == 200
+    assert after["status"] == "ok"
+    assert after["jobs"] == 1
+    assert after["pending"] == 0
+    assert after["requests"] == before["requests"] + 2
+    assert after["errors"] == before["errors"] + 1
+    assert 0 < after["latency"]["p50"] <= after["latency"]["p95"] <= after["latency"]["max"]
+
+
+def test_timeout():
+    # A timed out analysis keeps its worker until it ends, the
+    # next requests are rejected when no request can be pending
+    body = json.dumps(generator.generate("cells", 20000))
+
+    with run_server(("127.0.0.1", 0), timeout=0.01, max_pending=0) as analysis_server:
+        connection = http.client.HTTPConnection(*analysis_server.address)
+
+        (status, response) = request(connection, "POST", "/analyse", body)
+        assert status == 504
+
+        (status, response) = request(connection, "POST", "/analyse", read_file("beltFac8.txt"))
+        assert status == 503
+
+        (status, metrics) = request(connection, "GET", "/health")
+        assert (metrics["timeouts"], metrics["rejected"]) == (1, 1)
+        connection.close()
+
+
+def test_unix_socket(tmp_path):
+    socket_path = str(tmp_path / "analyser.sock")
+
+    with run_server(server.parse_address(f"unix:{socket_path}")):
+        connection = UnixHTTPConnection(socket_path)
+        (status, analysis) = request(connection, "POST", "/analyse", read_file("beltFac8.txt"))
+        connection.close()
+
+    assert status == 200
+    assert analysis == get_analysis(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+
+
+def test_parse_address():
+    assert server.parse_address("127.0.0.1:8000") == ("127.0.0.1", 8000)
+    assert server.parse_address(":8000") == ("127.0.0.1", 8000)
+    assert server.parse_address("unix:/run/analyser.sock") == "/run/analyser.sock"
+
+    with pytest.raises(ValueError):
+        server.parse_address("localhost")
@@ -0,0 +1,141 @@
+from src import blueprint_analyser, blueprint, network, generator, solver, config
+from src.instrumentation import Instrumentation
+from os import listdir
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+@pytest.fixture
+def flow_solver():
+    # Select a flow solver for the test, the negotiation is restored after it
+    def set_flow_solver(name):
+        config.config.set_config_value(name, "bottleneck", "solver")
+
+    yield set_flow_solver
+    set_flow_solver("negotiation")
+
+
+def calculate_network(bp_json):
+    bp = blueprint.Blueprint(bp_json)
+    bp.network = network.create_network(bp)
+    bp.network.calculate_bottleneck()
+    return bp
+
+
+def get_items_output(bp):
+    items_output = {}
+    for items in bp.get_analysis()["items_output"]:
+        for (item_name, amount) in items.items():
+            items_output[item_name] = items_output.get(item_name, 0) + amount
+
+    return {item_name: round(amount, 6) for (item_name, amount) in items_output.items()
+            if amount > solver.epsilon}
+
+
+def test_flow_graph():
+    #       4       3
+    #   s ----> a ----> t
+    #   |       |1      ^
+    #   | 2     v   2   |
+    #   +-----> b ------+
+    graph = solver.FlowGraph()
+    (s, a, b, t) = [graph.add_vertex() for _ in range(4)]
+    graph.add_arc(s, a, 4)
+    a_t = graph.add_arc(a, t, 3)
+    graph.add_arc(a, b, 1)
+    graph.add_arc(s, b, 2)
+    b_t = graph.add_arc(b, t, 2)
+
+    assert graph.max_flow(s, t) == 5
+    assert graph.get_flow(a_t) == 3
+    assert graph.get_flow(b_t) == 2
+
+    # The min cut separates the source from the saturated arcs
+    assert graph.get_reachable_vertices(s) == [True, True, True, False]
+
+    # The flow is kept when a closed arc is opened
+    s_t = graph.add_arc(s, t, 0)
+    assert graph.max_flow(s, t) == 0
+
+    graph.set_capacity(s_t, 1)
+    assert graph.max_flow(s, t) == 1
+    assert graph.get_flow(a_t) == 3
+    assert graph.get_flow(s_t) == 1
+
+
+def test_unlimited_flow():
+    graph = solver.FlowGraph()
+    (s, t) = [graph.add_vertex() for _ in range(2)]
+    graph.add_arc(s, t, solver.UNLIMITED)
+
+    with pytest.raises(ValueError):
+        graph.max_flow(s, t)
+
+
+@pytest.mark.parametrize("blueprint_file", [
+    "beltFac8.txt", "boilerFac1.json", "circuitFac1.json", "circuitFac3.json",
+    "fur4", "mulOut1", "pipesFac.json", "starter_base"])
+def test_same_output(blueprint_file, flow_solver):
+    # Both solvers find the same production on these blueprints
+    bp_json = blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}")
+
+    outputs = {}
+    for name in ["negotiation", "maxflow"]:
+        flow_solver(name)
+        outputs[name] = get_items_output(calculate_network(bp_json))
+
+    assert len(outputs["maxflow"]) > 0
+    assert outputs["maxflow"] == outputs["negotiation"]
+
+
+def test_capacities(flow_solver):
+    # No entity is used above its speed or its crafting speed
+    flow_solver("maxflow")
+
+    for blueprint_file in listdir(blueprints_path):
+        bp = calculate_network(
+            blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+
+        for node in bp.network.nodes:
+            if node.usage_ratio is not None:
+                assert node.usage_ratio <= 1 + 1e-6, (blueprint_file, node)
+
+        for node in bp.network.bottleneck_nodes:
+            assert node.usage_ratio >= solver.saturated_usage_ratio, blueprint_file
+
+
+def test_splitter_chain(flow_solver):
+    # The negotiation time doubles with each splitter of the chain,
+    # the max flow solver only visits each link a few times
+    flow_solver("maxflow")
+    bp_json = generator.splitter_chain(20)
+    assert get_items_output(calculate_network(bp_json)) == {"iron-gear-wheel": 0.84}
+
+    flow_solver("negotiation")
+    assert get_items_output(calculate_network(bp_json)) == {"iron-gear-wheel": 0.84}
+
+    # The number of Dinic phases does not grow with the chain
+    flow_solver("maxflow")
+    counters = {}
+    for nb_splitters in [20, 1000]:
+        with Instrumentation() as recorder:
+            bp = calculate_network(generator.splitter_chain(nb_splitters))
+        counters[nb_splitters] = recorder.counters
+
+    assert counters[1000]["max_flow_problems"] == counters[20]["max_flow_problems"]
+    assert counters[1000]["max_flow_phases"] == counters[20]["max_flow_phases"]
+
+    assert get_items_output(bp) == {"iron-gear-wheel": 0.84}
+    assert len([node for node in bp.network.nodes if node.type == "splitter"]) == 986
+
+
+def test_unknown_solver(flow_solver):
+    # An unknown solver is not set in the config
+    with pytest.raises(ValueError):
+        flow_solver("simplex")
+
+    assert config.get_settings().flow_solver == "negotiation"
@@ -0,0 +1,93 @@
+from src import blueprint_analyser, blueprint, generator, terminal_map, config
+import pytest
+
+config_file_path = "config/config_tests.yaml"
+blueprints_path = "tests/blueprints"
+
+blueprint_analyser.init(config_file_path)
+
+
+@pytest.fixture
+def verbose_level():
+    # Set the verbose level for the test, the tests config level is restored after it
+    previous_level = config.config.verbose_level
+
+    def set_verbose_level(level):
+        config.config.set_config_value(level, "verbose_level")
+
+    yield set_verbose_level
+    set_verbose_level(previous_level)
+
+
+def get_tile_map(bp):
+    # The map drawn tile by tile
+    lines = []
+    for y in range(bp.heigth):
+        line = terminal_map.row_prefix
+        for x in range(bp.width):
+            entity_obj = bp.grid.get(x, y)
+            if entity_obj is None:
+                line += "  "
+            elif entity_obj.large:
+                line += entity_obj.to_char([x, y]) + " "
+            else:
+                line += entity_obj.to_char() + " "
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("blueprint_file", ["beltFac8.txt", "circuitFac1.json", "starter_base"])
+def test_same_map(blueprint_file):
+    bp = blueprint.Blueprint(blueprint.read_blueprint_file(f"{blueprints_path}/{blueprint_file}"))
+    assert terminal_map.render_map(bp, max_size=(None, None)) == get_tile_map(bp)
+
+
+def test_viewport():
+    bp = blueprint.Blueprint(generator.generate("cells", 300))
+    lines = terminal_map.render_map(bp, viewport=(3, 2, 6, 4), max_size=(None, None)).split("\n")
+
+    assert lines[0] == f"{terminal_map.row_prefix}tiles [3, 2] to [8, 5]"
+    assert len(lines) == 1 + 4
+
+    # Each tile takes two characters
+    start = len(terminal_map.row_prefix) + 2 * 3
+    assert lines[1:] == [terminal_map.row_prefix + line[start:start + 2 * 6]
+                         for line in get_tile_map(bp).split("\n")[2:6]]
+
+    # The viewport is clipped to the blueprint
+    lines = terminal_map.render_map(bp, viewport=(-5, bp.heigth - 2, 10, 10), max_size=(None, None))
+    assert lines.split("\n")[0] == f"{terminal_map.row_prefix}tiles [0, {bp.heigth - 2}] to [4, {bp.heigth - 1}]"
+
+
+def test_downsampling():
+    bp = blueprint.Blueprint(generator.generate("cells", 5000))
+    lines = terminal_map.render_map(bp, max_size=(40, 30)).split("\n")
+
+    assert "one character for" in lines[0]
+    assert len(lines) - 1 <= 30
+    assert all(len(line) <= len(terminal_map.row_prefix) + 2 * 40 for line in lines[1:])
+
+    # The machines are shown by their recipe
+    assert any("i" in line for line in lines[1:])
+
+
+def test_display(capsys, verbose_level):
+    bp = blueprint.Blueprint(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+
+    verbose_level(3)
+    bp.display(max_size=(None, None))
+    assert get_tile_map(bp) in capsys.readouterr().err
+
+
+def test_no_display(capsys, verbose_level, monkeypatch):
+    # The map is not built when it would not be displayed
+    bp = blueprint.Blueprint(blueprint.read_blueprint_file(f"{blueprints_path}/beltFac8.txt"))
+
+    def render_map(*args):
+        raise AssertionError("The map should not be rendered")
+
+    monkeypatch.setattr(terminal_map, "render_map", render_map)
+    verbose_level(2)
+    bp.display()
+    assert capsys.readouterr().err == ""